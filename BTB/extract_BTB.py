@@ -1,42 +1,39 @@
-import re
-import matplotlib.pyplot as plt
+import os
+import sys
 
-# Hardcoded log file name (change this to your actual log file name)
+# make the shared sweep package (repository root) importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from sweep.cost import storage_bytes
+from sweep.logparse import successful_runs
+from sweep.report import finish_figure
+
+# Default log file name (change this, or pass the log as the first argument; .runs and .gz logs work too)
 LOGFILE = "log_BTB_entries.txt"
 
 def parse_log_file(filename):
     """
     Parses the log file to extract numEntries and BTBHitRatio values.
-    It computes the total BTB size as numEntries * 16.
+    It computes the total BTB size as numEntries * 16 (see sweep/cost.py).
     """
-    total_sizes = []
+    entries = []
     hit_ratios = []
-    current_num_entries = None
-
-    with open(filename, 'r') as f:
-        for line in f:
-            # Look for the numEntries in the "RUNNING" line
-            num_match = re.search(r'RUNNING.*numEntries\s*=\s*(\d+)', line)
-            if num_match:
-                current_num_entries = int(num_match.group(1))
-            
-            # Look for the BTB hit ratio line
-            hit_match = re.search(r'system\.cpu\.branchPred\.BTBHitRatio\s+([\d\.]+)', line)
-            if hit_match and current_num_entries is not None:
-                hit_ratio = float(hit_match.group(1))
-                total_size = current_num_entries * 16
-                total_sizes.append(total_size)
-                hit_ratios.append(hit_ratio)
-                # Reset for the next section
-                current_num_entries = None
 
+    for run in successful_runs(filename, "system.cpu.branchPred.BTBHitRatio"):
+        if "numEntries" not in run.params:
+            continue
+        entries.append(run.params["numEntries"])
+        hit_ratios.append(run.stats["system.cpu.branchPred.BTBHitRatio"])
+
+    total_sizes = storage_bytes("btb", {"btbNumEntries": entries}).tolist()
     return total_sizes, hit_ratios
 
-def plot_btb(total_sizes, hit_ratios):
+def plot_btb(total_sizes, hit_ratios, out=None):
     """
     Creates a scatter plot of BTB hit ratio vs. total BTB size.
     The x-axis is logarithmic with base 2.
     """
+    import matplotlib.pyplot as plt
+
     # Convert Hit Ratios to percentages
     hit_ratios = [ratio * 100 for ratio in hit_ratios]
 
@@ -47,10 +44,10 @@ def plot_btb(total_sizes, hit_ratios):
     plt.title('BTB Hit Ratio vs. Total BTB Size')
     plt.xscale('log', base=2)
     plt.grid(True, which="both", linestyle="--")
-    plt.show()
+    finish_figure(plt, out)
 
 if __name__ == '__main__':
-    total_sizes, hit_ratios = parse_log_file(LOGFILE)
+    total_sizes, hit_ratios = parse_log_file(sys.argv[1] if len(sys.argv) > 1 else LOGFILE)
     if not total_sizes:
         print("No valid data found in the log file.")
     else:
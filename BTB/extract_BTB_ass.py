@@ -1,56 +1,50 @@
-import re
-import matplotlib.pyplot as plt
+import os
+import sys
 
-# Hardcoded log file name (change this if needed)
+# make the shared sweep package (repository root) importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from sweep.cost import point_bytes
+from sweep.logparse import successful_runs
+from sweep.report import finish_figure
+
+# Default log file name (change this if needed, or pass the log as the first argument)
 LOGFILE = "log_BTB_full.txt"
 
 def parse_log_file(filename):
     """
     Parses the log file and extracts associativity, numEntries, and BTBHitRatio.
-    It searches for lines like:
+    It reads runs with headers like:
       RUNNING associativity=VALUE AND numEntries=VALUE
-    and then captures the corresponding BTBHitRatio (hit rate) value.
+    and captures the corresponding BTBHitRatio (hit rate) value. Runs that
+    crashed (e.g. associativity > numEntries) are skipped.
     
     The data is grouped by numEntries (which determines the Total BTB Size as numEntries × 16).
     Returns a dictionary where each key is numEntries and each value is a list of (associativity, hit_rate) tuples.
     """
     data = {}  # key: numEntries, value: list of (associativity, hit_rate)
-    current_assoc = None
-    current_entries = None
-
-    with open(filename, "r") as f:
-        for line in f:
-            # Look for the RUNNING line that contains associativity and numEntries
-            run_match = re.search(r'RUNNING\s+associativity\s*=\s*(\d+)\s+AND\s+numEntries\s*=\s*(\d+)', line)
-            if run_match:
-                current_assoc = int(run_match.group(1))
-                current_entries = int(run_match.group(2))
-                continue
 
-            # Look for the BTB hit ratio (hit rate) line
-            hit_match = re.search(r'system\.cpu\.branchPred\.BTBHitRatio\s+([\d\.]+)', line)
-            if hit_match and current_assoc is not None and current_entries is not None:
-                hit_rate = float(hit_match.group(1))
-                if current_entries not in data:
-                    data[current_entries] = []
-                data[current_entries].append((current_assoc, hit_rate))
-                # Reset for the next simulation section
-                current_assoc = None
-                current_entries = None
+    for run in successful_runs(filename, "system.cpu.branchPred.BTBHitRatio"):
+        if "associativity" not in run.params or "numEntries" not in run.params:
+            continue
+        hit_rate = run.stats["system.cpu.branchPred.BTBHitRatio"]
+        data.setdefault(run.params["numEntries"], []).append((run.params["associativity"], hit_rate))
     return data
 
-def plot_hit_rate(data):
+def plot_hit_rate(data, out=None):
     """
     Plots the hit rate (BTBHitRatio) versus associativity.
     Each line represents a different total BTB size (Total Size = numEntries × 16).
     The x-axis (associativity) is displayed on a logarithmic scale with base 2.
     """
+    import matplotlib.pyplot as plt
+
     # Convert Hit Ratios to percentages
     for num_entries, pairs in data.items():
         data[num_entries] = [(assoc, hit_rate * 100) for assoc, hit_rate in pairs]
 
     # Drop Values for Total Size > 64KB
-    data = {k: v for k, v in data.items() if k * 16 <= 64 * 1024}  # 64KB is the maximum size in the log file
+    data = {k: v for k, v in data.items()
+            if point_bytes("btb", {"btbNumEntries": k}) <= 64 * 1024}  # 64KB is the maximum size in the log file
 
 
     plt.figure()
@@ -68,10 +62,10 @@ def plot_hit_rate(data):
     plt.xscale("log", base=2)
     plt.grid(True, which="both", linestyle="--")
     plt.legend()
-    plt.show()
+    finish_figure(plt, out)
 
 if __name__ == "__main__":
-    data = parse_log_file(LOGFILE)
+    data = parse_log_file(sys.argv[1] if len(sys.argv) > 1 else LOGFILE)
     if not data:
         print("No valid data found in the log file.")
     else:
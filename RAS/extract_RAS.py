@@ -1,7 +1,13 @@
-import re
-import matplotlib.pyplot as plt
+import os
+import sys
 
-# Hardcoded log file name (update if needed)
+# make the shared sweep package (repository root) importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from sweep.cost import storage_bytes
+from sweep.logparse import successful_runs
+from sweep.report import finish_figure
+
+# Default log file name (update if needed, or pass the log as the first argument)
 LOGFILE = "log_RAS.txt"
 
 def parse_log_file(filename):
@@ -13,65 +19,30 @@ def parse_log_file(filename):
 
     It computes:
       - RAS Hit Rate = correct / used
-      - Total Size = numEntries * 8 (Bytes)
+      - Total Size = numEntries * 8 (Bytes, see sweep/cost.py)
     
     Returns two lists: total_sizes and hit_rates.
     """
-    total_sizes = []
+    entries = []
     hit_rates = []
-    
-    # Regular expressions for the values
-    re_run = re.compile(r'RUNNING\s+numEntries\s*=\s*(\d+)', re.IGNORECASE)
-    re_correct = re.compile(r'system\.cpu\.branchPred\.ras\.correct\s+(\d+)', re.IGNORECASE)
-    re_used = re.compile(r'system\.cpu\.branchPred\.ras\.used\s+(\d+)', re.IGNORECASE)
-    
-    current_numEntries = None
-    current_correct = None
-    current_used = None
 
-    with open(filename, "r") as f:
-        for line in f:
-            # Look for the simulation run line (numEntries)
-            run_match = re_run.search(line)
-            if run_match:
-                # Start of a new simulation block; store numEntries.
-                current_numEntries = int(run_match.group(1))
-                # Reset previous values
-                current_correct = None
-                current_used = None
-            
-            # Look for the ras.correct value
-            correct_match = re_correct.search(line)
-            if correct_match:
-                current_correct = int(correct_match.group(1))
-            
-            # Look for the ras.used value
-            used_match = re_used.search(line)
-            if used_match:
-                current_used = int(used_match.group(1))
-            
-            # Once we have both values and a valid numEntries, compute and store the data.
-            if (current_numEntries is not None and 
-                current_correct is not None and 
-                current_used is not None and current_used != 0):
-                
-                hit_rate = current_correct / current_used
-                total_size = current_numEntries * 8  # in Bytes
-                
-                total_sizes.append(total_size)
-                hit_rates.append(hit_rate)
-                
-                # Reset the current values for the next simulation run.
-                current_numEntries = None
-                current_correct = None
-                current_used = None
+    for run in successful_runs(filename, "system.cpu.branchPred.ras.correct",
+                               "system.cpu.branchPred.ras.used"):
+        used = run.stats["system.cpu.branchPred.ras.used"]
+        if "numEntries" not in run.params or used == 0:
+            continue
+        hit_rates.append(run.stats["system.cpu.branchPred.ras.correct"] / used)
+        entries.append(run.params["numEntries"])
 
+    total_sizes = storage_bytes("ras", {"rasNumEntries": entries}).tolist()  # in Bytes
     return total_sizes, hit_rates
 
-def plot_hit_rate_vs_total_size(total_sizes, hit_rates):
+def plot_hit_rate_vs_total_size(total_sizes, hit_rates, out=None):
     """
     Plots RAS hit rate versus Total Size.
     """
+    import matplotlib.pyplot as plt
+
     # Optionally sort the data by Total Size if not already sorted.
     combined = sorted(zip(total_sizes, hit_rates), key=lambda x: x[0])
     sorted_sizes, sorted_hit_rates = zip(*combined)
@@ -83,10 +54,10 @@ def plot_hit_rate_vs_total_size(total_sizes, hit_rates):
     plt.xscale("log", base=2)
     plt.title("RAS Hit Rate vs Total Size")
     plt.grid(True, which="both", linestyle="--")
-    plt.show()
+    finish_figure(plt, out)
 
 if __name__ == '__main__':
-    sizes, rates = parse_log_file(LOGFILE)
+    sizes, rates = parse_log_file(sys.argv[1] if len(sys.argv) > 1 else LOGFILE)
     if not sizes:
         print("No valid data found in the log file.")
     else:
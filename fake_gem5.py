@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Stand-in for gem5.opt running old/ooo_core.py, for trying the sweep tools
+(and running tests/) on a box without gem5:
+
+    python -m sweep.runner btb --gem5 ./fake_gem5.py --no-preflight
+
+It takes gem5's command line (--outdir=DIR, the config script, --name=value
+options of ooo_core.py, the workload binary), prints gem5's banner and
+writes a stats.txt whose branch-predictor stats depend on the options, one
+system<i>. block per configuration with --predictorConfigs. Like gem5, it
+aborts with the floorLog2 assertion when btbAssociativity > btbNumEntries.
+
+Environment variables:
+
+    FAKE_GEM5_SLEEP=S      seconds to "simulate" before writing the stats (default 0.1)
+    FAKE_GEM5_CRASH=TEXT   print TEXT as the error after simulating and exit 1 without stats
+"""
+
+import json
+import math
+import os
+import sys
+import time
+
+COMMITTED = 1770620
+CLOCK = 1000  # ticks per cycle
+FREQ = 10 ** 12
+
+
+def system_stats(prefix, config):
+    """
+    Stat lines of one System of ooo_core.py with config's options.
+    """
+    size = int(config.get("localPredictorSize", 2048))
+    bits = int(config.get("localCtrBits", 2))
+    entries = int(config.get("btbNumEntries", 4096))
+    assoc = int(config.get("btbAssociativity", 1))
+    ras = int(config.get("rasNumEntries", 16))
+    mispredicted = int(COMMITTED * (0.05 + 0.2 / math.log2(size + 1) + bits % 7 / 10000))
+    lookups = 2000000
+    hits = int(lookups * min(0.99, 0.2 + 0.05 * math.log2(entries) + 0.01 * math.log2(assoc)))
+    cycles = 5000000 + mispredicted
+    return [
+        (f"{prefix}.clk_domain.clock", CLOCK, "Clock period in ticks (Tick)"),
+        (f"{prefix}.cpu.numCycles", cycles, "Number of cpu cycles simulated (Cycle)"),
+        (f"{prefix}.cpu.commitStats0.numInsts", 9046553, "Number of instructions committed (thread level) (Count)"),
+        (f"{prefix}.cpu.commitStats0.numOps", 9046553, "Number of ops (including micro ops) committed (Count)"),
+        (f"{prefix}.cpu.branchPred.committed_0::DirectCond", COMMITTED,
+         "Number of branches finally committed  (Count)"),
+        (f"{prefix}.cpu.branchPred.mispredicted_0::DirectCond", mispredicted,
+         "Number of committed branches that were mispredicted. (Count)"),
+        (f"{prefix}.cpu.branchPred.BTBLookups", lookups, "Number of BTB lookups (Count)"),
+        (f"{prefix}.cpu.branchPred.BTBHits", hits, "Number of BTB hits (Count)"),
+        (f"{prefix}.cpu.branchPred.BTBHitRatio", hits / lookups, "BTB Hit Ratio (Ratio)"),
+        (f"{prefix}.cpu.branchPred.ras.correct", min(32743, 24973 + 500 * ras),
+         "Number of times the RAS is the provider and the prediction is correct (Count)"),
+        (f"{prefix}.cpu.branchPred.ras.used", 32743, "Number of times the RAS is the provider (Count)"),
+    ]
+
+
+def stat_line(name, value, description):
+    text = f"{value:.6f}" if isinstance(value, float) else str(value)
+    return f"{name:<40} {text:>12}                       # {description}\n"
+
+
+def main(argv):
+    outdir, options = "m5out", {}
+    for arg in argv:
+        if arg.startswith("--outdir="):
+            outdir = arg.split("=", 1)[1]
+        elif arg.startswith("--") and "=" in arg:
+            name, value = arg[2:].split("=", 1)
+            options[name] = value
+    print("gem5 Simulator System.  https://www.gem5.org")
+    print("command line: " + " ".join([sys.argv[0]] + argv))
+    print("Global frequency set at 1000000000000 ticks per second", flush=True)
+
+    if "predictorConfigs" in options:
+        with open(options["predictorConfigs"]) as f:
+            configs = json.load(f)
+        prefixes = [f"system{i}" for i in range(len(configs))]
+    else:
+        configs, prefixes = [options], ["system"]
+    for config in configs:
+        if int(config.get("btbAssociativity", 1)) > int(config.get("btbNumEntries", 4096)):
+            print("gem5.opt: src/base/intmath.hh:61: constexpr int gem5::floorLog2(T) [with T = unsigned int]: "
+                  "Assertion `x > 0' failed.")
+            print("Program aborted at tick 0", flush=True)
+            return 134
+
+    time.sleep(float(os.environ.get("FAKE_GEM5_SLEEP", "0.1")))
+    if os.environ.get("FAKE_GEM5_CRASH"):
+        print(os.environ["FAKE_GEM5_CRASH"])
+        return 1
+    systems = [system_stats(prefix, config) for prefix, config in zip(prefixes, configs)]
+    ticks = max(stats[1][1] for stats in systems) * CLOCK
+    os.makedirs(outdir, exist_ok=True)
+    with open(os.path.join(outdir, "stats.txt"), "w") as f:
+        f.write("\n---------- Begin Simulation Statistics ----------\n")
+        f.write(stat_line("simSeconds", ticks / FREQ, "Number of seconds simulated (Second)"))
+        f.write(stat_line("simTicks", ticks, "Number of ticks simulated (Tick)"))
+        f.write(stat_line("finalTick", ticks, "Number of ticks from beginning of simulation (Tick)"))
+        f.write(stat_line("simFreq", FREQ, "The number of ticks per simulated second ((Tick/Second))"))
+        f.write(stat_line("simInsts", 9046553 * len(configs), "Number of instructions simulated (Count)"))
+        f.write(stat_line("hostSeconds", 0.1, "Real time elapsed on the host (Second)"))
+        for stats in systems:
+            for line in stats:
+                f.write(stat_line(*line))
+        f.write("\n---------- End Simulation Statistics   ----------\n")
+    print(f"Exiting @ tick {ticks} because exiting with last active thread context")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,90 +1,104 @@
-import re
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
+import os
+import sys
 
-def extract_branch_pred_stats(log_file):
-    data = []
-    with open(log_file, 'r') as file:
-        lines = file.readlines()
-    
-    predictor_size, counter = None, None
-    for line in lines:
-        # Detect predictor size and counter
-        match = re.search(r'RUNNING LOCAL PREDICTOR WITH SIZE=(\d+) AND COUNTER=(\d+)', line)
-        if match:
-            predictor_size = int(match.group(1))
-            counter = int(match.group(2))
-        
-        # Extract committed branches
-        match_committed = re.search(r'system\.cpu\.branchPred\.committed_0::DirectCond\s+(\d+)', line)
-        if match_committed and predictor_size is not None and counter is not None:
-            committed = int(match_committed.group(1))
-        
-        # Extract mispredicted branches
-        match_mispred = re.search(r'system\.cpu\.branchPred\.mispredicted_0::DirectCond\s+(\d+)', line)
-        if match_mispred and predictor_size is not None and counter is not None:
-            mispredicted = int(match_mispred.group(1))
-            data.append((predictor_size, counter, committed, mispredicted))
-            # Reset predictor size and counter for next block
-            predictor_size, counter = None, None
+# make the shared sweep package (repository root) importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from sweep.cost import storage_bytes
+from sweep.logparse import successful_runs
+from sweep.report import finish_figure
 
-    df = pd.DataFrame(data, columns=["Local Predictor Size", "Counter", "Committed Branches", "Mispredicted Branches"])
-    return df
+COMMITTED = "system.cpu.branchPred.committed_0::DirectCond"
+MISPREDICTED = "system.cpu.branchPred.mispredicted_0::DirectCond"
+COLUMNS = ["Local Predictor Size", "Counter", "Committed Branches", "Mispredicted Branches"]
 
-# Define your log file path
-log_file_path = "log_local_bfs.txt"  # Update with your actual log file path
-df = extract_branch_pred_stats(log_file_path)
+def parse_log(log_file):
+    """
+    (predictor size, counter, committed, mispredicted) of every successful run.
+    """
+    data = []
+    for run in successful_runs(log_file, COMMITTED, MISPREDICTED):
+        # Predictor size and counter come from the RUNNING header
+        predictor_size = run.params.get("localPredictorSize")
+        counter = run.params.get("localCtrBits")
+        if predictor_size is None or counter is None:
+            continue
+        data.append((predictor_size, counter, run.stats[COMMITTED], run.stats[MISPREDICTED]))
+    return data
 
-# Save the DataFrame to an Excel file
-output_excel = "branch_pred_stats.xlsx"
-df.to_excel(output_excel, index=False)
-print(f"Data stored in {output_excel}")
+def make_dataframe(data):
+    import pandas as pd
 
-# Compute Miss Rate (%) = (Mispredicted Branches / Committed Branches) * 100
-df['Miss Rate (%)'] = df['Mispredicted Branches'] / df['Committed Branches'] * 100
+    df = pd.DataFrame(data, columns=COLUMNS)
+    # Compute Miss Rate (%) = (Mispredicted Branches / Committed Branches) * 100
+    df['Miss Rate (%)'] = df['Mispredicted Branches'] / df['Committed Branches'] * 100
+    # Compute total size in Bytes as (Local Predictor Size * Counter) / 8
+    df['Total Size (Bytes)'] = storage_bytes("local", {"localPredictorSize": df['Local Predictor Size'],
+                                                       "localCtrBits": df['Counter']})
+    return df
+
+def extract_branch_pred_stats(log_file):
+    return make_dataframe(parse_log(log_file))
 
 # --- Graph 1: Miss Rate vs Local Predictor Size ---
-plt.figure(figsize=(10, 6))
-for counter, group in df.groupby("Counter"):
-    group = group.sort_values("Local Predictor Size")
-    plt.plot(group["Local Predictor Size"], group["Miss Rate (%)"],
-             marker='o', label=f"Control Bits = {counter}")
+def plot_miss_rate_vs_size(df, out=None):
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(10, 6))
+    for counter, group in df.groupby("Counter"):
+        group = group.sort_values("Local Predictor Size")
+        plt.plot(group["Local Predictor Size"], group["Miss Rate (%)"],
+                 marker='o', label=f"Control Bits = {counter}")
 
-plt.xlabel("Local Predictor Size (Bits)")
-plt.ylabel("Miss Rate (%)")
-plt.title("Miss Rate by Local Predictor Size and Control Bits")
-plt.xscale('log', base=2)  # Log scale with base 2
-# Set x ticks to be the predictor sizes (which are powers of 2)
-sizes = sorted(df["Local Predictor Size"].unique())
-plt.xticks(sizes, sizes)
-plt.legend()
-plt.grid(True, which="both", ls="--")
-plt.show()
+    plt.xlabel("Local Predictor Size (Bits)")
+    plt.ylabel("Miss Rate (%)")
+    plt.title("Miss Rate by Local Predictor Size and Control Bits")
+    plt.xscale('log', base=2)  # Log scale with base 2
+    # Set x ticks to be the predictor sizes (which are powers of 2)
+    sizes = sorted(df["Local Predictor Size"].unique())
+    plt.xticks(sizes, sizes)
+    plt.legend()
+    plt.grid(True, which="both", ls="--")
+    finish_figure(plt, out)
 
 # --- Graph 2: Miss Rate vs Total Size in Bytes ---
-# Compute total size in Bytes as (Local Predictor Size * Counter) / 8
-df['Total Size (Bytes)'] = (df['Local Predictor Size'] * df['Counter']) / 8
+def plot_miss_rate_vs_total_size(df, out=None):
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    plt.figure(figsize=(10, 6))
+    for counter, group in df.groupby("Counter"):
+        group = group.sort_values("Total Size (Bytes)")
+        plt.plot(group["Total Size (Bytes)"], group["Miss Rate (%)"],
+                 marker='o', label=f"Control Bits = {counter}")
+
+    plt.xlabel("Total Size (Bytes)")
+    plt.ylabel("Miss Rate (%)")
+    plt.title("Miss Rate by Total Predictor Storage Size and Control Bits")
+    plt.xscale('log', base=2)
+    # Set x ticks as powers of 2 within the range of total sizes
+    min_total = df['Total Size (Bytes)'].min()
+    max_total = df['Total Size (Bytes)'].max()
+    ticks = []
+    current = 2**int(np.floor(np.log2(min_total)))
+    while current <= max_total:
+        ticks.append(current)
+        current *= 2
+    plt.xticks(ticks, ticks)
+    plt.legend()
+    plt.grid(True, which="both", ls="--")
+    finish_figure(plt, out)
+
+if __name__ == "__main__":
+    # Define your log file path (a .runs or .gz log works too; or pass it as the first argument)
+    log_file_path = sys.argv[1] if len(sys.argv) > 1 else "log_local_bfs.txt"  # Update with your actual log file path
+    df = extract_branch_pred_stats(log_file_path)
 
-plt.figure(figsize=(10, 6))
-for counter, group in df.groupby("Counter"):
-    group = group.sort_values("Total Size (Bytes)")
-    plt.plot(group["Total Size (Bytes)"], group["Miss Rate (%)"],
-             marker='o', label=f"Control Bits = {counter}")
+    # Optional Excel export (e.g. branch_pred_stats.xlsx as the second argument);
+    # the runs themselves live in the results store, see sweep/store.py
+    if len(sys.argv) > 2:
+        output_excel = sys.argv[2]
+        df[COLUMNS].to_excel(output_excel, index=False)
+        print(f"Data stored in {output_excel}")
 
-plt.xlabel("Total Size (Bytes)")
-plt.ylabel("Miss Rate (%)")
-plt.title("Miss Rate by Total Predictor Storage Size and Control Bits")
-plt.xscale('log', base=2)
-# Set x ticks as powers of 2 within the range of total sizes
-min_total = df['Total Size (Bytes)'].min()
-max_total = df['Total Size (Bytes)'].max()
-ticks = []
-current = 2**int(np.floor(np.log2(min_total)))
-while current <= max_total:
-    ticks.append(current)
-    current *= 2
-plt.xticks(ticks, ticks)
-plt.legend()
-plt.grid(True, which="both", ls="--")
-plt.show()
+    plot_miss_rate_vs_size(df)
+    plot_miss_rate_vs_total_size(df)
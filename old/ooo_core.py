@@ -136,22 +136,6 @@ default_binary = os.path.join(
 # Binary to execute
 SimpleOpts.add_option("binary", nargs="?", default=default_binary)
 
-# Finalize the arguments and grab the args so we can pass it on to our objects
-# create the system we are going to simulate
-system = System()
-
-# Set the clock frequency of the system (and all of its children)
-system.clk_domain = SrcClockDomain()
-system.clk_domain.clock = "2GHz"
-system.clk_domain.voltage_domain = VoltageDomain()
-
-# Set up the system
-system.mem_mode = "timing"  # Use timing accesses
-system.mem_ranges = [AddrRange("512MiB")]  # Create an address range
-
-# Create a simple CPU
-system.cpu = O3CPU()
-
 #######################################################################################
 # DEFINE EXTRA OPTIONS BEFORE THE ARGS COMMAND
 # this example illustrates the procedure to create optional arguments to be passed
@@ -179,6 +163,69 @@ SimpleOpts.add_option("--localPredictorSize", help=f"Local BP size. Default: {lo
 localHistoryTableSize = 8
 SimpleOpts.add_option("--localHistoryTableSize", help=f"Local history table size. Default: {localHistoryTableSize}")
 
+predictor = "tournament"
+SimpleOpts.add_option("--predictor", choices=["local", "tournament", "ltage"], help=f"Branch predictor to simulate. Default: {predictor}")
+
+btbAssociativity = 1
+SimpleOpts.add_option("--btbAssociativity", help=f"BTB associativity. Default: {btbAssociativity}")
+
+btbNumEntries = 4096
+SimpleOpts.add_option("--btbNumEntries", help=f"Number of BTB entries. Default: {btbNumEntries}")
+
+rasNumEntries = 16
+SimpleOpts.add_option("--rasNumEntries", help=f"Number of RAS entries (minimum supported value is 1). Default: {rasNumEntries}")
+
+branchTrace = ""
+SimpleOpts.add_option("--branchTrace", help="Record the committed branches to this binary trace file (see sweep/trace.py). Default: off")
+
+fastForward = 0
+SimpleOpts.add_option("--fastForward", help=f"Run this many instructions on an atomic CPU, write a checkpoint to --checkpointDir and exit. Default: {fastForward} (off)")
+
+checkpointDir = "ckpt"
+SimpleOpts.add_option("--checkpointDir", help=f"Where --fastForward and --simpoints write their checkpoints (relative to --outdir). Default: {checkpointDir}")
+
+restoreCheckpoint = ""
+SimpleOpts.add_option("--restoreCheckpoint", help="Restore this checkpoint and simulate from there with the O3 CPU. Default: off")
+
+warmupInsts = 0
+SimpleOpts.add_option("--warmupInsts", help=f"Instructions simulated after restoring before the stats are reset (also the SimPoint warmup). Default: {warmupInsts}")
+
+maxInsts = 0
+SimpleOpts.add_option("--maxInsts", help=f"Stop after this many (measured) instructions. Default: {maxInsts} (run to completion)")
+
+simpointInterval = 0
+SimpleOpts.add_option("--simpointInterval", help=f"SimPoint interval length. Alone: profile basic block vectors to simpoint.bb.gz on an atomic CPU. Default: {simpointInterval} (off)")
+
+simpoints = ""
+SimpleOpts.add_option("--simpoints", help="SIMPTS,WEIGHTS files from SimPoint: write one checkpoint per simulation point to --checkpointDir (needs --simpointInterval). Default: off")
+
+graph = ""
+SimpleOpts.add_option("--graph", help="Serialized gapbs graph (.sg) the workload loads with -f instead of generating one (see sweep/graph.py). Default: off")
+
+workloadArgs = ""
+SimpleOpts.add_option("--workloadArgs", help="Extra arguments of the workload binary, e.g. \"-n 4\" for the number of gapbs trials. Default: none")
+
+statsInterval = 0
+SimpleOpts.add_option("--statsInterval", help=f"Dump the stats every this many instructions and stop once --convergeStat has converged (see sweep/converge.py). Default: {statsInterval} (off)")
+
+convergeStat = "missRate"
+SimpleOpts.add_option("--convergeStat", choices=["missRate", "btbHitRatio", "rasHitRate"], help=f"Metric whose convergence ends the simulation in interval mode. Default: {convergeStat}")
+
+convergeTolerance = 0.0005
+SimpleOpts.add_option("--convergeTolerance", help=f"Relative 95%% confidence half-width at which the metric has converged. Default: {convergeTolerance}")
+
+convergeMinIntervals = 10
+SimpleOpts.add_option("--convergeMinIntervals", help=f"Intervals simulated before checking convergence. Default: {convergeMinIntervals}")
+
+memSize = "512MiB"
+SimpleOpts.add_option("--memSize", help=f"Size of the simulated memory. Default: {memSize}")
+
+batch = 0
+SimpleOpts.add_option("--batch", help=f"Lean run for packing one gem5 per core: no GDB listener, no config.ini/config.json, DRAM device sized to --memSize. Default: {batch} (off)")
+
+predictorConfigs = ""
+SimpleOpts.add_option("--predictorConfigs", help="JSON file with a list of {option: value} predictor/BTB/RAS configurations, each simulated by its own System in this one process (see sweep/multi.py). Default: off")
+
 args = SimpleOpts.parse_args() # do not change this line
 
 if args.choicePredictorSize:
@@ -202,113 +249,357 @@ if args.localPredictorSize:
 if args.localHistoryTableSize:
     localHistoryTableSize=args.localHistoryTableSize
 
-#######################################################################################
-# DEFINE THE BRANCH PREDICTOR AND PARAMETERS
-# first select the predictor. Run once to observe the config options in file
-# m5out/config.ini under section [system.cpu.branchPred]
-#######################################################################################
+if args.predictor:
+    predictor=args.predictor
 
-#-------------------------------------
-# Activate the Local Branch Predictor
-#-------------------------------------
-# local branch predictor is a table of size localPredictorSize x localCtrBits
-# system.cpu.branchPred = LocalBP()
-# system.cpu.branchPred.localCtrBits = localCtrBits
-# system.cpu.branchPred.localPredictorSize = localPredictorSize
+if args.btbAssociativity:
+    btbAssociativity=args.btbAssociativity
 
-#-------------------------------------
-# Activate the Tournament Predictor
-#-------------------------------------
-# size of the tournament predictor is the sum of bits from the following tables:
-# - choice table: size choicePredictorSize x choiceCtrBits
-# - globalhistory table: size globalPredictorSize x globalCtrBits
-# - localhistory table: size localHistoryTableSize x log2(localPredictorSize)
-# - localpredictor table: size localPredictorSize x localCtrBits
-
-system.cpu.branchPred = TournamentBP()
-system.cpu.branchPred.choiceCtrBits=choiceCtrBits 
-system.cpu.branchPred.choicePredictorSize=choicePredictorSize # Default: 16
-system.cpu.branchPred.globalCtrBits=globalCtrBits # Default: 2
-system.cpu.branchPred.globalPredictorSize=globalPredictorSize # Default: 16
-system.cpu.branchPred.localCtrBits=localCtrBits # Default: 2
-system.cpu.branchPred.localPredictorSize=localPredictorSize # Default: 16
-system.cpu.branchPred.localHistoryTableSize=localHistoryTableSize # Default: 8
+if args.btbNumEntries:
+    btbNumEntries=args.btbNumEntries
 
-#-------------------------------------
-# Activate the LTAGE Predictor
-#-------------------------------------
-#system.cpu.branchPred = LTAGE()
+if args.rasNumEntries:
+    rasNumEntries=args.rasNumEntries
 
-#-------------------------------------
-# Change the parameters of the BTB
-#-------------------------------------
-# system.cpu.branchPred.btb.associativity = 1 # BTB (cache) associativity (default: 1)
-# system.cpu.branchPred.btb.numEntries = 4096 # number of entries (default: 4096)
+if args.branchTrace:
+    branchTrace=args.branchTrace
 
-#-------------------------------------
-# Change the parameters of the RAS
-#-------------------------------------
-#system.cpu.branchPred.ras.numEntries = 16 # number of RAS entries (default: 16; minimum supported value is 1)
+if args.fastForward:
+    fastForward=int(args.fastForward)
 
-#######################################################################################
+if args.checkpointDir:
+    checkpointDir=args.checkpointDir
 
-# Create an L1 instruction and data cache
-system.cpu.icache = L1ICache(args)
-system.cpu.dcache = L1DCache(args)
+if args.restoreCheckpoint:
+    restoreCheckpoint=args.restoreCheckpoint
 
-# Connect the instruction and data caches to the CPU
-system.cpu.icache.connectCPU(system.cpu)
-system.cpu.dcache.connectCPU(system.cpu)
+if args.warmupInsts:
+    warmupInsts=int(args.warmupInsts)
 
-# Create a memory bus, a coherent crossbar, in this case
-system.l2bus = L2XBar()
+if args.maxInsts:
+    maxInsts=int(args.maxInsts)
 
-# Hook the CPU ports up to the l2bus
-system.cpu.icache.connectBus(system.l2bus)
-system.cpu.dcache.connectBus(system.l2bus)
+if args.simpointInterval:
+    simpointInterval=int(args.simpointInterval)
 
-# Create an L2 cache and connect it to the l2bus
-system.l2cache = L2Cache(args)
-system.l2cache.connectCPUSideBus(system.l2bus)
+if args.simpoints:
+    simpoints=args.simpoints
 
-# Create a memory bus
-system.membus = SystemXBar()
+if args.graph:
+    graph=args.graph
 
-# Connect the L2 cache to the membus
-system.l2cache.connectMemSideBus(system.membus)
+if args.workloadArgs:
+    workloadArgs=args.workloadArgs
 
-# create the interrupt controller for the CPU
-system.cpu.createInterruptController()
+if args.memSize:
+    memSize=args.memSize
 
-# Connect the system up to the membus
-system.system_port = system.membus.cpu_side_ports
+if args.batch:
+    batch=int(args.batch)
 
-# Create a DDR3 memory controller
-system.mem_ctrl = MemCtrl()
-system.mem_ctrl.dram = DDR3_1600_8x8()
-#system.mem_ctrl.dram.range = system.mem_ranges[0]
-system.mem_ctrl.port = system.membus.mem_side_ports
+if args.statsInterval:
+    statsInterval=int(args.statsInterval)
 
-system.workload = SEWorkload.init_compatible(args.binary)
+if args.convergeStat:
+    convergeStat=args.convergeStat
+
+if args.convergeTolerance:
+    convergeTolerance=float(args.convergeTolerance)
+
+if args.convergeMinIntervals:
+    convergeMinIntervals=int(args.convergeMinIntervals)
+
+if args.predictorConfigs:
+    import json
+    with open(args.predictorConfigs) as f:
+        predictorConfigs=json.load(f)
+
+# fast-forwarding and SimPoint profiling/checkpointing only need the
+# architectural state, so they run on an atomic CPU
+atomic = bool(fastForward or simpointInterval) and not restoreCheckpoint
+
+if predictorConfigs and (atomic or restoreCheckpoint or branchTrace or statsInterval or maxInsts):
+    m5.util.fatal("--predictorConfigs runs every configuration to completion and cannot be combined "
+                  "with checkpoints, SimPoints, --branchTrace, --statsInterval or --maxInsts")
 
-# Create a process for a simple "Hello World" application
-process = Process()
-# Set the command
-# cmd is a list which begins with the executable (like argv)
-#######################################################################################
-# Define the parameters of the executable
 #######################################################################################
-process.cmd = [args.binary]
+# BUILD THE SYSTEM
+# build_system creates one System running the workload; its predictor, BTB and
+# RAS options come from the command line, or from one entry of --predictorConfigs
 #######################################################################################
-# Set the cpu to use the process as its workload and create thread contexts
-system.cpu.workload = process
-system.cpu.createThreads()
+PREDICTOR_OPTIONS = [
+    "predictor", "choicePredictorSize", "choiceCtrBits", "globalPredictorSize", "globalCtrBits",
+    "localCtrBits", "localPredictorSize", "localHistoryTableSize",
+    "btbAssociativity", "btbNumEntries", "rasNumEntries",
+]
+
+def build_system(overrides):
+    cfg = {name: overrides.get(name, globals()[name]) for name in PREDICTOR_OPTIONS}
+
+    # create the system we are going to simulate
+    system = System()
+
+    # Set the clock frequency of the system (and all of its children)
+    system.clk_domain = SrcClockDomain()
+    system.clk_domain.clock = "2GHz"
+    system.clk_domain.voltage_domain = VoltageDomain()
+
+    # Set up the system
+    system.mem_mode = "timing"  # Use timing accesses
+    # (the address range is created with the memory controller, see --memSize)
+
+    # Create a simple CPU
+    system.cpu = O3CPU()
+
+    #######################################################################################
+    # DEFINE THE BRANCH PREDICTOR AND PARAMETERS
+    # first select the predictor. Run once to observe the config options in file
+    # m5out/config.ini under section [system.cpu.branchPred]
+    #######################################################################################
+
+    #-------------------------------------
+    # Activate the Local Branch Predictor
+    #-------------------------------------
+    # local branch predictor is a table of size localPredictorSize x localCtrBits
+    if cfg["predictor"] == "local":
+        system.cpu.branchPred = LocalBP()
+        system.cpu.branchPred.localCtrBits = cfg["localCtrBits"]
+        system.cpu.branchPred.localPredictorSize = cfg["localPredictorSize"]
+
+    #-------------------------------------
+    # Activate the Tournament Predictor
+    #-------------------------------------
+    # size of the tournament predictor is the sum of bits from the following tables:
+    # - choice table: size choicePredictorSize x choiceCtrBits
+    # - globalhistory table: size globalPredictorSize x globalCtrBits
+    # - localhistory table: size localHistoryTableSize x log2(localPredictorSize)
+    # - localpredictor table: size localPredictorSize x localCtrBits
+
+    if cfg["predictor"] == "tournament":
+        system.cpu.branchPred = TournamentBP()
+        system.cpu.branchPred.choiceCtrBits=cfg["choiceCtrBits"] 
+        system.cpu.branchPred.choicePredictorSize=cfg["choicePredictorSize"] # Default: 16
+        system.cpu.branchPred.globalCtrBits=cfg["globalCtrBits"] # Default: 2
+        system.cpu.branchPred.globalPredictorSize=cfg["globalPredictorSize"] # Default: 16
+        system.cpu.branchPred.localCtrBits=cfg["localCtrBits"] # Default: 2
+        system.cpu.branchPred.localPredictorSize=cfg["localPredictorSize"] # Default: 16
+        system.cpu.branchPred.localHistoryTableSize=cfg["localHistoryTableSize"] # Default: 8
+
+    #-------------------------------------
+    # Activate the LTAGE Predictor
+    #-------------------------------------
+    if cfg["predictor"] == "ltage":
+        system.cpu.branchPred = LTAGE()
+
+    #-------------------------------------
+    # Change the parameters of the BTB
+    #-------------------------------------
+    system.cpu.branchPred.btb.associativity = cfg["btbAssociativity"] # BTB (cache) associativity (default: 1)
+    system.cpu.branchPred.btb.numEntries = cfg["btbNumEntries"] # number of entries (default: 4096)
+
+    #-------------------------------------
+    # Change the parameters of the RAS
+    #-------------------------------------
+    system.cpu.branchPred.ras.numEntries = cfg["rasNumEntries"] # number of RAS entries (default: 16; minimum supported value is 1)
+
+    #-------------------------------------
+    # Fast-forward / SimPoint CPU
+    #-------------------------------------
+    # replaces the O3 CPU (and its branch predictor) by an atomic CPU; the
+    # checkpoints it writes are restored into the O3 CPU with --restoreCheckpoint
+    if atomic:
+        system.cpu = AtomicSimpleCPU()
+        system.mem_mode = "atomic"
+
+    #######################################################################################
+
+    # Create an L1 instruction and data cache
+    system.cpu.icache = L1ICache(args)
+    system.cpu.dcache = L1DCache(args)
+
+    # Connect the instruction and data caches to the CPU
+    system.cpu.icache.connectCPU(system.cpu)
+    system.cpu.dcache.connectCPU(system.cpu)
+
+    # Create a memory bus, a coherent crossbar, in this case
+    system.l2bus = L2XBar()
+
+    # Hook the CPU ports up to the l2bus
+    system.cpu.icache.connectBus(system.l2bus)
+    system.cpu.dcache.connectBus(system.l2bus)
+
+    # Create an L2 cache and connect it to the l2bus
+    system.l2cache = L2Cache(args)
+    system.l2cache.connectCPUSideBus(system.l2bus)
+
+    # Create a memory bus
+    system.membus = SystemXBar()
+
+    # Connect the L2 cache to the membus
+    system.l2cache.connectMemSideBus(system.membus)
+
+    # create the interrupt controller for the CPU
+    system.cpu.createInterruptController()
+
+    # Connect the system up to the membus
+    system.system_port = system.membus.cpu_side_ports
+
+    # Create an address range
+    system.mem_ranges = [AddrRange(memSize)]
+
+    # Create a DDR3 memory controller
+    system.mem_ctrl = MemCtrl()
+    system.mem_ctrl.dram = DDR3_1600_8x8()
+    if batch:
+        # size the DRAM to the address range instead of an 8 GiB device
+        # (DDR3_1600_8x8: 8 devices per rank, 2 ranks)
+        system.mem_ctrl.dram.range = system.mem_ranges[0]
+        system.mem_ctrl.dram.device_size = m5.util.convert.toMemorySize(memSize) // 16
+    system.mem_ctrl.port = system.membus.mem_side_ports
+
+    system.workload = SEWorkload.init_compatible(args.binary)
+
+    # Create a process for a simple "Hello World" application
+    process = Process()
+    # Set the command
+    # cmd is a list which begins with the executable (like argv)
+    #######################################################################################
+    # Define the parameters of the executable
+    #######################################################################################
+    # with --graph the kernel reads the serialized graph instead of generating it
+    import shlex
+    process.cmd = [args.binary]
+    if graph:
+        process.cmd += ["-f", os.path.abspath(graph)]
+    process.cmd += shlex.split(workloadArgs)
+    #######################################################################################
+    # Set the cpu to use the process as its workload and create thread contexts
+    system.cpu.workload = process
+    system.cpu.createThreads()
+    return system
+
+
+if predictorConfigs:
+    # one independent System per configuration under a single Root, all
+    # running the same workload; configuration i's stats are under system<i>.
+    systems = [build_system(overrides) for overrides in predictorConfigs]
+    root = Root(full_system=False, **{f"system{i}": s for i, s in enumerate(systems)})
+else:
+    system = build_system({})
+    # set up the root SimObject and start the simulation
+    root = Root(full_system=False, system=system)
+
+#-------------------------------------
+# Record a branch trace
+#-------------------------------------
+# the committed-instruction trace (ExecEnable) goes through a pipe into
+# sweep/trace.py, which keeps only the branches in its compact binary format.
+# The converter finishes on its own once gem5 exits and closes the pipe.
+if branchTrace:
+    import subprocess
+    repo = os.path.dirname(thispath)
+    fifo = os.path.join(os.path.abspath(m5.options.outdir), "exec_trace.fifo")
+    if not os.path.exists(fifo):
+        os.mkfifo(fifo)
+    env = dict(os.environ, PYTHONPATH=repo + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    converter = subprocess.Popen(["python3", "-m", "sweep.trace", "convert", fifo, os.path.abspath(branchTrace)],
+                                 cwd=repo, env=env)
+    m5.debug.flags["ExecEnable"].enable()
+    m5.trace.output(fifo)
+    m5.trace.enable()
+
+#-------------------------------------
+# Region of interest
+#-------------------------------------
+simpoint_names = []
+if restoreCheckpoint:
+    if maxInsts:
+        system.cpu.max_insts_any_thread = warmupInsts + maxInsts
+elif fastForward:
+    system.cpu.max_insts_any_thread = fastForward
+elif simpointInterval and simpoints:
+    # one checkpoint per simulation point, warmupInsts before its interval,
+    # named as in gem5's configs/common/Simulation.py
+    simpts_file, weights_file = simpoints.split(",")
+    with open(simpts_file) as f:
+        intervals = {int(line.split()[1]): int(line.split()[0]) for line in f if line.strip()}
+    with open(weights_file) as f:
+        weights = {int(line.split()[1]): float(line.split()[0]) for line in f if line.strip()}
+    for number, (sid, interval) in enumerate(sorted(intervals.items(), key=lambda x: x[1])):
+        start = max(interval * simpointInterval - warmupInsts, 0)
+        warmup = interval * simpointInterval - start
+        simpoint_names.append((start, f"cpt.simpoint_{number:02d}_inst_{start}_weight_{weights[sid]}"
+                                      f"_interval_{simpointInterval}_warmup_{warmup}"))
+    system.cpu.simpoint_start_insts = [start for start, _ in simpoint_names]
+elif simpointInterval:
+    system.cpu.addSimPointProbe(simpointInterval)
+elif maxInsts:
+    system.cpu.max_insts_any_thread = maxInsts
+
+#-------------------------------------
+# Batch mode
+#-------------------------------------
+# concurrent runs would all try to listen on the same GDB port, and the
+# config dumps are never read by the sweeps
+if batch:
+    m5.disableAllListeners()
+    m5.options.dump_config = False
+    m5.options.json_config = False
+    m5.options.dot_config = False
 
-# set up the root SimObject and start the simulation
-root = Root(full_system=False, system=system)
 # instantiate all of the objects we've created above
-m5.instantiate()
+m5.instantiate(restoreCheckpoint or None)
+
+if restoreCheckpoint and warmupInsts:
+    # warm the predictor and caches up, then measure from a clean slate
+    system.cpu.scheduleInstStop(0, warmupInsts, "warmup done")
+    exit_event = m5.simulate()
+    if exit_event.getCause() == "warmup done":
+        m5.stats.reset()
 
 print(f"Beginning simulation!")
-exit_event = m5.simulate()
-print(f"Exiting @ tick {m5.curTick()} because {exit_event.getCause()}")
+if statsInterval and not atomic:
+    #-------------------------------------
+    # Interval mode
+    #-------------------------------------
+    # dump the (cumulative) stats every statsInterval instructions and stop
+    # as soon as the tracked metric has converged; see sweep/converge.py
+    import sys
+    sys.path.insert(0, os.path.dirname(thispath))
+    from sweep.converge import INTERVALS_FILE, Tracker, read_dump
+    tracker = Tracker(convergeStat, convergeTolerance, convergeMinIntervals)
+    stats_file = os.path.join(m5.options.outdir, "stats.txt")
+    offset = 0
+    while True:
+        system.cpu.scheduleInstStop(0, statsInterval, "stats interval")
+        exit_event = m5.simulate()
+        cause = exit_event.getCause()
+        if cause != "stats interval":
+            break
+        m5.stats.dump()
+        stats, offset = read_dump(stats_file, offset)
+        if tracker.add(stats, (tracker.n + 1) * statsInterval):
+            cause = f"{convergeStat} converged"
+            break
+    tracker.save(os.path.join(m5.options.outdir, INTERVALS_FILE))
+    estimate, half_width = tracker.estimate()
+    if estimate is not None and tracker.n > 1:
+        print(f"{convergeStat} = {estimate:.6f} +/- {half_width:.6f} after {tracker.n} intervals")
+    print(f"Exiting @ tick {m5.curTick()} because {cause}")
+else:
+    # with --predictorConfigs this still returns once: SE mode only exits
+    # when no thread of any System is left running
+    exit_event = m5.simulate()
+    print(f"Exiting @ tick {m5.curTick()} because {exit_event.getCause()}")
+
+checkpointDir = os.path.join(m5.options.outdir, checkpointDir)
+if fastForward and exit_event.getCause() == "a thread reached the max instruction count":
+    m5.checkpoint(checkpointDir)
+    print(f"Checkpoint written to {checkpointDir}")
+
+for start, name in simpoint_names:
+    if exit_event.getCause() != "simpoint starting point found":
+        break
+    m5.checkpoint(os.path.join(checkpointDir, name))
+    print(f"Checkpoint written to {os.path.join(checkpointDir, name)}")
+    exit_event = m5.simulate()
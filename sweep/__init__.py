@@ -0,0 +1,9 @@
+"""
+Sweep tooling for the branch predictor experiments.
+
+The modules in this package drive gem5 over grids of ooo_core.py parameters
+and produce the logs read by the extract_* scripts in BTB/, RAS/, localBP/
+and tournamentBP/. Run them from the repository root, e.g.
+
+    python -m sweep.runner local --jobs 32
+"""
@@ -0,0 +1,289 @@
+"""
+Throughput benchmarks of log parsing and of every extractor.
+
+Generates synthetic logs (see sweep/synthlog.py) of --size for each sweep
+once, in --workdir, and times on them
+
+    parse:<sweep>      sweep.logparse.iter_runs over the text log
+    parse-runs:<sweep> the same over the log packed as .runs (sweep/logstore.py)
+    extract:<figure>   the extractor's own functions from the log to the data
+                       it plots (parse and DataFrame building, no drawing)
+
+Every case runs in a fresh interpreter, --repeat times; the best time and
+the largest peak RSS are kept, so the numbers are not polluted by earlier
+cases. Throughput is in MB/s of uncompressed log.
+
+Results are appended to --history (one JSON line per benchmark run, with
+the git commit and host) and compared with a baseline: per case, the median
+throughput and peak RSS of the last --baseline-runs runs on the same host
+and log size. A case that got slower or bigger than --tolerance is reported
+as a regression and the exit status is 1. A run with regressions is saved
+marked as such and left out of later baselines, so a slowdown keeps being
+reported until it is fixed, or accepted as the new normal with --accept.
+
+    python -m sweep.bench --size 64M
+    python -m sweep.bench --size 1G --case parse:btb --case extract:btb_hit_ratio_vs_size
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from sweep.report import REPO_ROOT, load_extractor
+from sweep.synthlog import SWEEPS, generate, parse_size
+
+HISTORY_FILE = "benchmarks.jsonl"
+WORKDIR = "bench_data"
+# runs whose median is the baseline of a case
+BASELINE_RUNS = 5
+
+
+def extract_local(path):
+    module = load_extractor("localBP/extract_LBP.py")
+    return module.make_dataframe(module.parse_log(path))
+
+
+def extract_tourney(path):
+    from sweep.store import ResultStore
+    module = load_extractor("tournamentBP/extract_tourney.py")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "results.db")
+        with ResultStore(db) as store:
+            store.import_log(path, {"predictor": "tournament"})
+        return module.load_runs(db)
+
+
+def extract_script(script):
+    def extract(path):
+        return load_extractor(script).parse_log_file(path)
+    return extract
+
+
+# figure -> (sweep of its log, function from the log to the plotted data)
+EXTRACTS = {
+    "local_miss_rate": ("local", extract_local),
+    "tourney_miss_rate": ("tourney", extract_tourney),
+    "btb_hit_ratio_vs_size": ("btb", extract_script("BTB/extract_BTB.py")),
+    "btb_hit_rate_vs_associativity": ("btb", extract_script("BTB/extract_BTB_ass.py")),
+    "ras_hit_rate_vs_size": ("ras", extract_script("RAS/extract_RAS.py")),
+}
+
+
+def cases():
+    """
+    {case name: sweep whose log it reads}.
+    """
+    found = {}
+    for sweep in SWEEPS:
+        found[f"parse:{sweep}"] = sweep
+        found[f"parse-runs:{sweep}"] = sweep
+    for name, (sweep, _) in EXTRACTS.items():
+        found[f"extract:{name}"] = sweep
+    return found
+
+
+def run_case(name, path):
+    """
+    Runs one case in this process. Returns its time, runs seen and memory.
+    """
+    from sweep.logparse import iter_runs
+    kind, _, target = name.partition(":")
+    # import what the case needs before the baseline so only the work is measured
+    if kind == "extract":
+        import pandas  # noqa: F401
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if kind == "extract":
+        data = EXTRACTS[target][1](path)
+        runs = len(data[0]) if isinstance(data, tuple) else len(data)
+    else:
+        runs = sum(1 for _ in iter_runs(path))
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"seconds": seconds, "runs": runs, "peak_rss_kb": peak, "work_rss_kb": peak - base}
+
+
+def measure(name, path, size, repeat):
+    """
+    Runs a case repeat times, each in a new interpreter.
+    """
+    best = None
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-m", "sweep.bench", "--run-case", name, path],
+                             capture_output=True, text=True, cwd=REPO_ROOT,
+                             env={**os.environ, "PYTHONPATH": REPO_ROOT})
+        if out.returncode != 0:
+            raise RuntimeError(f"{name} failed:\n{out.stderr}")
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        if best is None:
+            best = result
+        else:
+            best["seconds"] = min(best["seconds"], result["seconds"])
+            best["peak_rss_kb"] = max(best["peak_rss_kb"], result["peak_rss_kb"])
+            best["work_rss_kb"] = max(best["work_rss_kb"], result["work_rss_kb"])
+    best["mb_s"] = size / (1 << 20) / best["seconds"]
+    return best
+
+
+def prepare_logs(workdir, sweeps, size, seed, packed):
+    """
+    Generates (once) the text log, and the .runs copy if packed, of every
+    sweep. Returns {sweep: (text log, .runs log or None, size)}.
+    """
+    from sweep.logstore import RunLogWriter, split_blocks
+    os.makedirs(workdir, exist_ok=True)
+    logs = {}
+    for sweep in sweeps:
+        path = os.path.abspath(os.path.join(workdir, f"{sweep}_{size}_{seed}.txt"))
+        if not os.path.exists(path):
+            print(f"generating {path}")
+            generate(path + ".part", sweep, size, crash_rate=0.05, seed=seed)
+            os.replace(path + ".part", path)
+        runs = path[:-4] + ".runs" if sweep in packed else None
+        if runs and not os.path.exists(runs):
+            print(f"packing {runs}")
+            with open(path) as f, RunLogWriter(runs + ".part") as writer:
+                for block in split_blocks(f):
+                    writer.write_block(block)
+            os.replace(runs + ".part", runs)
+        logs[sweep] = (path, runs, os.path.getsize(path))
+    return logs
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=REPO_ROOT).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def history_records(history, host, size):
+    """
+    Saved runs on host with logs of size, oldest first.
+    """
+    if not os.path.exists(history):
+        return []
+    found = []
+    with open(history) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("host") == host and record.get("size") == size:
+                found.append(record)
+    return found
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def baseline(records, runs=BASELINE_RUNS):
+    """
+    {case: {"mb_s", "peak_rss_kb", "runs"}}: the medians over the last runs
+    records with the case, leaving out the runs saved with regressions.
+    """
+    accepted = [r for r in records if not r.get("regression")]
+    found = {}
+    for name in {name for record in accepted for name in record["cases"]}:
+        last = [r["cases"][name] for r in accepted if name in r["cases"]][-runs:]
+        found[name] = {"mb_s": median(c["mb_s"] for c in last),
+                       "peak_rss_kb": median(c["peak_rss_kb"] for c in last), "runs": len(last)}
+    return found
+
+
+def regressions(results, base, tolerance):
+    """
+    [(case, message)] for the cases slower or bigger than their baseline.
+    """
+    found = []
+    for name, result in results.items():
+        old = base.get(name)
+        if not old:
+            continue
+        if result["mb_s"] < old["mb_s"] * (1 - tolerance):
+            found.append((name, f"{old['mb_s']:.1f} -> {result['mb_s']:.1f} MB/s"))
+        if result["peak_rss_kb"] > old["peak_rss_kb"] * (1 + tolerance):
+            found.append((name, f"peak RSS {old['peak_rss_kb'] / 1024:.0f} -> "
+                                f"{result['peak_rss_kb'] / 1024:.0f} MiB"))
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark log parsing and the extractors on synthetic logs.")
+    parser.add_argument("--size", default="64M", help="synthetic log size per sweep. Default: 64M")
+    parser.add_argument("--case", action="append", default=None,
+                        help="case to run (repeatable; default: all). See --list")
+    parser.add_argument("--list", action="store_true", help="list the cases")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, best time kept. Default: 3")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=WORKDIR, help=f"where the synthetic logs are kept. Default: {WORKDIR}")
+    parser.add_argument("--history", default=HISTORY_FILE, help=f"results history. Default: {HISTORY_FILE}")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="relative slowdown / memory growth reported as a regression. Default: 0.15")
+    parser.add_argument("--baseline-runs", type=int, default=BASELINE_RUNS,
+                        help=f"earlier runs whose median is the baseline. Default: {BASELINE_RUNS}")
+    parser.add_argument("--accept", action="store_true",
+                        help="save this run as part of the baseline even if it has regressions")
+    parser.add_argument("--no-save", action="store_true", help="do not append the results to --history")
+    parser.add_argument("--run-case", nargs=2, metavar=("CASE", "LOG"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        print(json.dumps(run_case(*args.run_case)))
+        return 0
+    available = cases()
+    if args.list:
+        print("\n".join(available))
+        return 0
+    selected = args.case or list(available)
+    for name in selected:
+        if name not in available:
+            parser.error(f"unknown case '{name}', see --list")
+
+    size = parse_size(args.size)
+    packed = {available[n] for n in selected if n.startswith("parse-runs:")}
+    logs = prepare_logs(args.workdir, sorted({available[n] for n in selected}), size, args.seed, packed)
+
+    results = {}
+    print(f"{'case':<40} {'MB/s':>8} {'seconds':>8} {'runs':>8} {'peak MiB':>9} {'work MiB':>9}")
+    for name in selected:
+        text, runs, log_size = logs[available[name]]
+        result = measure(name, runs if name.startswith("parse-runs:") else text, log_size, args.repeat)
+        results[name] = result
+        print(f"{name:<40} {result['mb_s']:>8.1f} {result['seconds']:>8.2f} {result['runs']:>8} "
+              f"{result['peak_rss_kb'] / 1024:>9.1f} {result['work_rss_kb'] / 1024:>9.1f}")
+
+    host = platform.node()
+    base = baseline(history_records(args.history, host, size), args.baseline_runs)
+    found = regressions(results, base, args.tolerance)
+    if any(name in base for name in results):
+        print(f"\ncompared with the median of up to {args.baseline_runs} earlier runs:")
+        for name, message in found:
+            print(f"  REGRESSION {name}: {message}")
+        if not found:
+            print("  no regressions")
+
+    if not args.no_save:
+        record = {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "commit": git_commit(), "host": host,
+                  "python": platform.python_version(), "size": size, "repeat": args.repeat, "cases": results}
+        if found and not args.accept:
+            record["regression"] = True
+            print("saved as a regression, left out of the baseline (--accept keeps it)")
+        with open(args.history, "a") as f:
+            f.write(json.dumps(record) + "\n")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+BTB hit-ratio surface from one pass over a branch trace.
+
+gem5's BTB is a set-associative cache with LRU replacement, indexed by
+(PC >> instShiftAmt) & (sets - 1). For a fixed number of sets, an access hits
+in an A-way BTB exactly when fewer than A distinct branches were looked up in
+its set since its previous lookup (its LRU stack distance is < A). Keeping
+one LRU stack per set and a histogram of stack distances therefore gives the
+hit ratio of every associativity at once (Mattson et al.). Doing this for
+every power-of-two set count while reading the trace once yields the whole
+(associativity, numEntries) surface that log_BTB_full.txt needed 289 gem5
+runs for.
+
+Lookups are the taken, non-return branches of the trace, which is when
+gem5's BPredUnit consults the BTB.
+
+    python -m sweep.btb surface trace.npz --log BTB/log_BTB_trace.txt --out btb.csv
+    python -m sweep.btb check trace.npz BTB/log_BTB_full.txt
+
+The --log output uses the RUNNING/BTBHitRatio format, so extract_BTB.py and
+extract_BTB_ass.py plot it directly.
+"""
+
+import argparse
+import csv
+import sys
+
+from sweep.cost import point_bytes
+from sweep.logparse import successful_runs
+from sweep.replay import INST_SHIFT_AMT, RETURN, read_trace
+
+HIT_RATIO = "system.cpu.branchPred.BTBHitRatio"
+
+# 2^0 .. 2^16, as in log_BTB_full.txt
+MAX_LOG2 = 16
+
+
+def btb_lookups(pc, taken, kind):
+    """
+    PC >> instShiftAmt of every branch that looks up the BTB.
+    """
+    looked_up = taken & (kind != RETURN)
+    return (pc[looked_up] >> INST_SHIFT_AMT).astype("int64").tolist()
+
+
+def stack_distance_histograms(keys, set_counts):
+    """
+    One pass over keys. Returns {sets: (histogram, cold misses, lookups)}
+    where histogram[d] counts lookups with LRU stack distance d in their set.
+    """
+    # stacks[s][set index] is an LRU stack of keys, most recent first
+    stacks = {s: {} for s in set_counts}
+    hists = {s: [] for s in set_counts}
+    cold = dict.fromkeys(set_counts, 0)
+    masks = [(s, s - 1) for s in set_counts]
+
+    for key in keys:
+        for sets, mask in masks:
+            stack = stacks[sets].setdefault(key & mask, [])
+            try:
+                d = stack.index(key)
+            except ValueError:
+                cold[sets] += 1
+                stack.insert(0, key)
+                continue
+            if d:
+                del stack[d]
+                stack.insert(0, key)
+            hist = hists[sets]
+            if d >= len(hist):
+                hist.extend([0] * (d + 1 - len(hist)))
+            hist[d] += 1
+
+    return {s: (hists[s], cold[s], len(keys)) for s in set_counts}
+
+
+def hit_ratio_surface(keys, max_log2=MAX_LOG2):
+    """
+    Returns {(associativity, numEntries): hit ratio} for every power-of-two
+    associativity <= numEntries <= 2^max_log2.
+    """
+    set_counts = [2 ** i for i in range(max_log2 + 1)]
+    histograms = stack_distance_histograms(keys, set_counts)
+    surface = {}
+    for sets, (hist, _, lookups) in histograms.items():
+        # prefix[a] = lookups with stack distance < a
+        prefix = [0]
+        for count in hist:
+            prefix.append(prefix[-1] + count)
+        for i in range(max_log2 + 1):
+            assoc = 2 ** i
+            entries = sets * assoc
+            if entries > 2 ** max_log2:
+                break
+            hits = prefix[min(assoc, len(prefix) - 1)]
+            surface[(assoc, entries)] = hits / lookups if lookups else 0.0
+    return surface
+
+
+def write_log(path, surface):
+    """
+    Writes the surface as RUNNING/BTBHitRatio blocks for the BTB extractors.
+    """
+    with open(path, "w") as f:
+        f.write("\n")
+        for (assoc, entries), ratio in sorted(surface.items(), key=lambda x: (x[0][1], x[0][0])):
+            f.write("#" * 65 + "\n")
+            f.write(f"RUNNING associativity={assoc} AND numEntries={entries}\n")
+            f.write(f"{HIT_RATIO:<40} {ratio:.6f}                       # BTB Hit Ratio (Ratio)\n\n")
+
+
+def write_csv(path, surface):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["associativity", "numEntries", "BTBHitRatio", "Total Size (Bytes)"])
+        for (assoc, entries), ratio in sorted(surface.items(), key=lambda x: (x[0][1], x[0][0])):
+            writer.writerow([assoc, entries, ratio, int(point_bytes("btb", {"btbNumEntries": entries}))])
+
+
+def cross_check(surface, log):
+    """
+    Returns rows of (associativity, numEntries, gem5 ratio, trace ratio)
+    for the successful runs of a gem5 BTB log found in the surface.
+    """
+    rows = []
+    for run in successful_runs(log, HIT_RATIO):
+        assoc = run.params.get("associativity", 1)
+        entries = run.params.get("numEntries")
+        if (assoc, entries) in surface:
+            rows.append((assoc, entries, run.stats[HIT_RATIO], surface[(assoc, entries)]))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BTB hit ratios for every size/associativity from one trace pass.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("surface", help="compute the full hit-ratio surface")
+    p.add_argument("trace")
+    p.add_argument("--out", default="btb_surface.csv", help="CSV table to write")
+    p.add_argument("--log", default=None, help="also write a log readable by the BTB extractors")
+    p.add_argument("--max-log2", type=int, default=MAX_LOG2, help=f"largest numEntries is 2^N. Default: {MAX_LOG2}")
+    p = sub.add_parser("check", help="compare against gem5 BTB logs")
+    p.add_argument("trace")
+    p.add_argument("logs", nargs="+")
+    p.add_argument("--max-log2", type=int, default=MAX_LOG2)
+    args = parser.parse_args(argv)
+
+    keys = btb_lookups(*read_trace(args.trace))
+    print(f"{len(keys)} BTB lookups read from {args.trace}")
+    surface = hit_ratio_surface(keys, args.max_log2)
+
+    if args.command == "surface":
+        write_csv(args.out, surface)
+        print(f"Data stored in {args.out}")
+        if args.log:
+            write_log(args.log, surface)
+            print(f"Log stored in {args.log}")
+        return 0
+
+    for log in args.logs:
+        rows = cross_check(surface, log)
+        print(f"{log}: {len(rows)} runs compared")
+        for assoc, entries, gem5_ratio, ratio in rows:
+            print(f"    associativity={assoc:<6} numEntries={entries:<6} gem5 {gem5_ratio:.6f}  "
+                  f"trace {ratio:.6f}  diff {ratio - gem5_ratio:+.6f}")
+        if rows:
+            errors = [abs(r[3] - r[2]) for r in rows]
+            print(f"    mean |diff| {sum(errors) / len(errors):.6f}, max {max(errors):.6f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
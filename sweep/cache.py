@@ -0,0 +1,314 @@
+"""
+Content-addressed cache of finished sweep points.
+
+A point is keyed by a hash of its fully resolved ooo_core.py configuration
+(the script's defaults overridden by the point's options, plus the script
+itself), the gem5 executable and the workload binary. Re-running or
+extending a sweep only simulates the points that are not in the cache, and
+an interrupted sweep picks up where it stopped because every point is stored
+as soon as it finishes.
+
+Layout of the cache directory:
+
+    <cache>/fingerprints.json        content hashes of gem5/workload/script
+    <cache>/<key[:2]>/<key>/result.json
+    <cache>/<key[:2]>/<key>/stats.txt
+
+Maintenance commands:
+
+    python -m sweep.cache info
+    python -m sweep.cache evict --max-size 2G --max-age 30
+    python -m sweep.cache invalidate --gem5 /home/gem5/build/RISCV/gem5.opt
+    python -m sweep.cache invalidate --all
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+CACHE_DIR = "sweep_cache"
+
+# Matches the "name = value" default that precedes each SimpleOpts.add_option
+# in ooo_core.py
+DEFAULT_RE = re.compile(r'^(\w+)\s*=\s*(.+?)\s*$')
+OPTION_RE = re.compile(r'SimpleOpts\.add_option\("--(\w+)"')
+
+
+def script_defaults(script):
+    """
+    Returns {option: default} for the options declared in ooo_core.py with the
+    "name = value" / SimpleOpts.add_option("--name", ...) pattern.
+    """
+    defaults = {}
+    last = None
+    with open(script, "r") as f:
+        for line in f:
+            m = DEFAULT_RE.match(line)
+            if m:
+                last = m.groups()
+                continue
+            m = OPTION_RE.search(line)
+            if m and last and last[0] == m.group(1):
+                value = last[1].strip('"\'')
+                defaults[m.group(1)] = int(value) if value.isdigit() else value
+            if line.strip():
+                last = None
+    return defaults
+
+
+def resolve_config(point, defaults):
+    """
+    Full configuration of a point: every default, overridden by the point.
+    Values are normalised to strings so 64 and "64" hash the same.
+    """
+    config = {k: str(v) for k, v in defaults.items()}
+    config.update({k: str(v) for k, v in point.items()})
+    return config
+
+
+def file_digest(path):
+    """
+    sha256 of a file's contents, or a marker if it does not exist.
+    """
+    if not os.path.exists(path):
+        return "missing:" + os.path.abspath(path)
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """Persistent store of sweep point results keyed by configuration hash"""
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = os.path.abspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self._fingerprint_file = os.path.join(self.directory, "fingerprints.json")
+
+    # ------------------------------------------------------------------
+    # fingerprints
+    # ------------------------------------------------------------------
+
+    def fingerprint(self, path):
+        """
+        Content hash of path. Hashes are remembered by (size, mtime) so a
+        multi-hundred-MB gem5.opt is only read again after it is rebuilt.
+        """
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return file_digest(path)
+        known = self._load_fingerprints()
+        entry = known.get(path)
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return entry["sha256"]
+        digest = file_digest(path)
+        known[path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        tmp = self._fingerprint_file + f".{os.getpid()}"
+        with open(tmp, "w") as f:
+            json.dump(known, f, indent=1)
+        os.replace(tmp, self._fingerprint_file)
+        return digest
+
+    def _load_fingerprints(self):
+        try:
+            with open(self._fingerprint_file, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    # ------------------------------------------------------------------
+    # entries
+    # ------------------------------------------------------------------
+
+    def key(self, config, gem5_hash, binary_hash, script_hash):
+        """
+        Cache key of a resolved configuration run with the given executables.
+        """
+        blob = json.dumps({"config": config, "gem5": gem5_hash,
+                           "binary": binary_hash, "script": script_hash},
+                          sort_keys=True)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def entry_dir(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        """
+        Returns the stored result dict for key, or None. A hit refreshes the
+        entry's access time, which is what eviction orders by.
+        """
+        path = os.path.join(self.entry_dir(key), "result.json")
+        try:
+            with open(path, "r") as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            return None
+        os.utime(path)
+        return result
+
+    def put(self, key, result, meta, stats_file=None):
+        """
+        Stores result (a runner result dict) under key together with meta
+        (the fingerprints it was computed with) and, if given, a copy of
+        the run's stats.txt. The entry is written to a temporary directory
+        and renamed, so a crash never leaves a half-written entry behind.
+        """
+        final = self.entry_dir(key)
+        tmp = final + f".tmp{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        record = dict(result, key=key, meta=meta, created=time.time())
+        with open(os.path.join(tmp, "result.json"), "w") as f:
+            json.dump(record, f)
+        if stats_file and os.path.exists(stats_file):
+            shutil.copyfile(stats_file, os.path.join(tmp, "stats.txt"))
+        shutil.rmtree(final, ignore_errors=True)
+        os.replace(tmp, final)
+
+    def entries(self):
+        """
+        Yields (key, entry directory, size in bytes, last access time).
+        """
+        for prefix in sorted(os.listdir(self.directory)):
+            sub = os.path.join(self.directory, prefix)
+            if len(prefix) != 2 or not os.path.isdir(sub):
+                continue
+            for key in os.listdir(sub):
+                entry = os.path.join(sub, key)
+                result = os.path.join(entry, "result.json")
+                if ".tmp" in key or not os.path.exists(result):
+                    continue
+                size = sum(os.path.getsize(os.path.join(entry, n)) for n in os.listdir(entry))
+                yield key, entry, size, os.path.getmtime(result)
+
+    def remove(self, key):
+        shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+
+    # ------------------------------------------------------------------
+    # maintenance
+    # ------------------------------------------------------------------
+
+    def evict(self, max_bytes=None, max_age_days=None):
+        """
+        Drops entries not used for max_age_days, then least recently used
+        entries until the cache is at most max_bytes. Returns the number of
+        entries removed.
+        """
+        entries = sorted(self.entries(), key=lambda e: e[3])
+        removed = 0
+        if max_age_days is not None:
+            cutoff = time.time() - max_age_days * 86400
+            keep = []
+            for e in entries:
+                if e[3] < cutoff:
+                    self.remove(e[0])
+                    removed += 1
+                else:
+                    keep.append(e)
+            entries = keep
+        if max_bytes is not None:
+            total = sum(e[2] for e in entries)
+            for e in entries:
+                if total <= max_bytes:
+                    break
+                self.remove(e[0])
+                total -= e[2]
+                removed += 1
+        return removed
+
+    def invalidate(self, gem5=None, binary=None, everything=False):
+        """
+        Removes entries computed with a different build of gem5 / the workload
+        than the file currently at that path (i.e. after a rebuild), or every
+        entry if everything is set. Returns the number of entries removed.
+        """
+        current = {}
+        if gem5:
+            current["gem5"] = (os.path.abspath(gem5), self.fingerprint(gem5))
+        if binary:
+            current["binary"] = (os.path.abspath(binary), self.fingerprint(binary))
+        removed = 0
+        for key, entry, _, _ in list(self.entries()):
+            if everything:
+                self.remove(key)
+                removed += 1
+                continue
+            with open(os.path.join(entry, "result.json"), "r") as f:
+                meta = json.load(f).get("meta", {})
+            for kind, (path, digest) in current.items():
+                if meta.get(kind + "_path") == path and meta.get(kind) != digest:
+                    self.remove(key)
+                    removed += 1
+                    break
+        return removed
+
+
+class SweepKeys:
+    """Computes cache keys for the points of one sweep (one gem5/script/binary)"""
+
+    def __init__(self, cache, gem5, script, binary):
+        self.cache = cache
+        self.defaults = script_defaults(script)
+        self.meta = {
+            "gem5": cache.fingerprint(gem5), "gem5_path": os.path.abspath(gem5),
+            "binary": cache.fingerprint(binary), "binary_path": os.path.abspath(binary),
+            "script": cache.fingerprint(script), "script_path": os.path.abspath(script),
+        }
+
+    def key(self, point):
+        config = resolve_config(point, self.defaults)
+        return self.cache.key(config, self.meta["gem5"], self.meta["binary"], self.meta["script"])
+
+
+def parse_size(text):
+    """
+    Parses sizes like 500M, 2G or 1024 into bytes.
+    """
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+    text = text.strip().upper().rstrip("B").rstrip("I")
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and maintain the sweep result cache.")
+    parser.add_argument("--cache", default=CACHE_DIR, help=f"cache directory. Default: {CACHE_DIR}")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("info", help="print number of entries and total size")
+    evict = sub.add_parser("evict", help="bound the cache by size and/or age (LRU)")
+    evict.add_argument("--max-size", type=parse_size, default=None, help="e.g. 500M, 2G")
+    evict.add_argument("--max-age", type=float, default=None, help="days since last use")
+    inval = sub.add_parser("invalidate", help="drop entries of rebuilt executables")
+    inval.add_argument("--gem5", default=None, help="drop entries built with an older copy of this gem5")
+    inval.add_argument("--binary", default=None, help="drop entries run with an older copy of this workload")
+    inval.add_argument("--all", action="store_true", help="drop every entry")
+    args = parser.parse_args(argv)
+
+    cache = ResultCache(args.cache)
+    if args.command == "info":
+        entries = list(cache.entries())
+        total = sum(e[2] for e in entries)
+        print(f"{len(entries)} entries, {total / (1 << 20):.1f} MiB in {cache.directory}")
+    elif args.command == "evict":
+        if args.max_size is None and args.max_age is None:
+            parser.error("evict needs --max-size and/or --max-age")
+        print(f"Evicted {cache.evict(args.max_size, args.max_age)} entries")
+    elif args.command == "invalidate":
+        if not (args.gem5 or args.binary or args.all):
+            parser.error("invalidate needs --gem5, --binary or --all")
+        print(f"Invalidated {cache.invalidate(args.gem5, args.binary, args.all)} entries")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+Fast-forward once, restore per sweep point.
+
+Every sweep point used to simulate rv64_bfs from tick 0 on the O3 CPU,
+graph generation and build included. Instead, ooo_core.py can run the
+uninteresting prefix once on an atomic CPU and write a checkpoint, and every
+sweep point restores it into the O3 CPU with its own predictor configuration:
+
+    python -m sweep.checkpoint fastforward --insts 2000000000 --dir ckpt/bfs
+    python -m sweep.runner local --checkpoint ckpt/bfs --max-insts 100000000
+
+With SimPoint, only representative intervals are simulated and their stats
+are weighted:
+
+    python -m sweep.checkpoint profile --interval 10000000 --outdir ckpt/profile
+    simpoint -loadFVFile ckpt/profile/simpoint.bb.gz -maxK 10 \\
+             -saveSimpoints bfs.simpts -saveSimpointWeights bfs.weights
+    python -m sweep.checkpoint simpoints bfs.simpts bfs.weights --interval 10000000 \\
+             --warmup 1000000 --dir ckpt/bfs_simpoints
+    python -m sweep.runner local --checkpoint ckpt/bfs_simpoints
+
+For a SimPoint directory the runner restores every cpt.simpoint_* checkpoint
+for each point and writes the weighted mean of their stats to the point's
+stats.txt, so the log, cache and results file see a single run.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+from sweep.cache import file_digest
+from sweep.logparse import read_stats_file
+
+# directory names written by ooo_core.py --simpoints (and gem5's se.py)
+SIMPOINT_RE = re.compile(r"cpt\.simpoint_(\d+)_inst_(\d+)_weight_([\d.eE+-]+)_interval_(\d+)_warmup_(\d+)$")
+
+
+def find_checkpoints(path, max_insts=0):
+    """
+    Returns [(checkpoint dir, weight, warmup, measured instructions)]: the
+    checkpoint in path (m5.cpt) with weight 1, or the SimPoint checkpoints
+    found in path, ordered by their number.
+    """
+    path = os.path.abspath(path)
+    if os.path.exists(os.path.join(path, "m5.cpt")):
+        return [(path, 1.0, 0, max_insts)]
+    found = []
+    for name in os.listdir(path):
+        m = SIMPOINT_RE.match(name)
+        if m and os.path.exists(os.path.join(path, name, "m5.cpt")):
+            number, _, weight, interval, warmup = m.groups()
+            found.append((int(number), (os.path.join(path, name), float(weight), int(warmup), int(interval))))
+    if not found:
+        raise ValueError(f"no m5.cpt or cpt.simpoint_* checkpoints in {path}")
+    return [checkpoint for _, checkpoint in sorted(found)]
+
+
+def restore_options(checkpoint):
+    """
+    ooo_core.py options that restore one checkpoint.
+    """
+    path, _, warmup, insts = checkpoint
+    options = {"restoreCheckpoint": path}
+    if warmup:
+        options["warmupInsts"] = warmup
+    if insts:
+        options["maxInsts"] = insts
+    return options
+
+
+def checkpoint_id(checkpoints):
+    """
+    Identity of a checkpoint set for the result cache: the contents of every
+    m5.cpt and how it is restored.
+    """
+    return ";".join(f"{file_digest(os.path.join(path, 'm5.cpt'))}:{weight}:{warmup}:{insts}"
+                    for path, weight, warmup, insts in checkpoints)
+
+
+def weighted_stats(runs):
+    """
+    Weighted mean of the stats of several runs, given as [(weight, stats)].
+    Only stats present in every run are kept.
+    """
+    total = sum(weight for weight, _ in runs)
+    names = set.intersection(*(set(stats) for _, stats in runs)) if runs else set()
+    return {name: sum(weight * stats[name] for weight, stats in runs) / total for name in names}
+
+
+def write_stats_file(path, stats, note):
+    """
+    Writes stats in gem5's stats.txt layout, so read_stats_file reads it back.
+    """
+    with open(path, "w") as f:
+        f.write("\n---------- Begin Simulation Statistics ----------\n")
+        for name in sorted(stats):
+            value = stats[name]
+            text = str(int(value)) if float(value).is_integer() else f"{value:.6f}"
+            f.write(f"{name:<50} {text:>20}                       # {note}\n")
+        f.write("\n---------- End Simulation Statistics   ----------\n")
+
+
+def merge_simpoint_runs(outdir, runs):
+    """
+    Combines the per-checkpoint runs [(weight, run outdir)] of one sweep point
+    into outdir/stats.txt. Returns the weighted stats.
+    """
+    stats = weighted_stats([(weight, read_stats_file(os.path.join(d, "stats.txt"))[0]) for weight, d in runs])
+    write_stats_file(os.path.join(outdir, "stats.txt"), stats,
+                     f"SimPoint weighted mean over {len(runs)} checkpoints")
+    return stats
+
+
+def run_gem5(args, options):
+    from sweep.runner import build_command
+    outdir = os.path.abspath(args.outdir)
+    os.makedirs(outdir, exist_ok=True)
+    cmd = build_command(args.gem5, os.path.abspath(args.script), args.binary, outdir, options)
+    print(" ".join(cmd))
+    return subprocess.call(cmd, cwd=outdir)
+
+
+def main(argv=None):
+    from sweep.graph import add_workload_arguments, workload_from_args
+    from sweep.runner import BINARY, GEM5, SCRIPT
+
+    parser = argparse.ArgumentParser(description="Create the checkpoints restored by sweep.runner --checkpoint.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("fastforward", help="fast-forward on an atomic CPU and write one checkpoint")
+    p.add_argument("--insts", type=int, required=True, help="instructions to skip")
+    p.add_argument("--dir", required=True, help="checkpoint directory")
+    p = sub.add_parser("profile", help="write SimPoint basic block vectors (simpoint.bb.gz)")
+    p.add_argument("--interval", type=int, required=True, help="instructions per interval")
+    p = sub.add_parser("simpoints", help="write one checkpoint per SimPoint simulation point")
+    p.add_argument("simpts")
+    p.add_argument("weights")
+    p.add_argument("--interval", type=int, required=True, help="instructions per interval (as profiled)")
+    p.add_argument("--warmup", type=int, default=0, help="instructions simulated before each interval")
+    p.add_argument("--dir", required=True, help="directory for the cpt.simpoint_* checkpoints")
+    for p in sub.choices.values():
+        p.add_argument("--gem5", default=GEM5, help=f"gem5 executable. Default: {GEM5}")
+        p.add_argument("--script", default=SCRIPT, help="gem5 config script. Default: old/ooo_core.py")
+        p.add_argument("--binary", default=BINARY, help=f"workload binary. Default: {BINARY}")
+        p.add_argument("--outdir", default="ckpt_m5out", help="gem5 output directory")
+        add_workload_arguments(p)
+    args = parser.parse_args(argv)
+
+    if args.command == "fastforward":
+        options = {"fastForward": args.insts, "checkpointDir": os.path.abspath(args.dir)}
+    elif args.command == "profile":
+        options = {"simpointInterval": args.interval}
+    else:
+        options = {"simpointInterval": args.interval, "warmupInsts": args.warmup,
+                   "simpoints": f"{os.path.abspath(args.simpts)},{os.path.abspath(args.weights)}",
+                   "checkpointDir": os.path.abspath(args.dir)}
+    try:
+        options.update(workload_from_args(args))
+    except (OSError, ValueError, RuntimeError) as e:
+        parser.error(str(e))
+    returncode = run_gem5(args, options)
+    if returncode == 0 and args.command != "profile":
+        for path, weight, warmup, insts in find_checkpoints(args.dir):
+            print(f"{path}: weight {weight}, warmup {warmup}, {insts or 'all'} instructions")
+    return returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main())
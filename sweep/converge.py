@@ -0,0 +1,211 @@
+"""
+End a sweep point once its metric has converged.
+
+ooo_core.py normally simulates the whole workload and only reads the stats
+at exit, although the DirectCond miss rate or the BTB hit ratio usually
+settles to three significant digits long before. In interval mode
+(--statsInterval N) ooo_core.py stops every N committed instructions, dumps
+the stats and hands them to a Tracker, which keeps
+
+  - the running estimate of the metric, a ratio of two counters summed
+    over all intervals so far, and
+  - its confidence interval, from the spread of the per-interval ratios
+    (batch means, normal approximation),
+
+and ends the simulation once the half-width is within --convergeTolerance
+of the estimate (relative), after at least --convergeMinIntervals
+intervals. The gem5 process exits right away, so the runner starts the next
+point on its slot.
+
+Stats are dumped without a reset: the last dump in stats.txt still holds the
+totals of the whole run, so everything reading stats.txt is unchanged, and
+the tracker works on the differences between dumps. The interval series is
+written to intervals.json in the run's outdir and kept with the result:
+
+    python -m sweep.runner local --interval 1000000 --converge missRate --tolerance 0.0005
+    python -m sweep.converge sweep_out/localPredictorSize-64_localCtrBits-1/intervals.json
+"""
+
+import argparse
+import json
+import math
+import sys
+
+from sweep import grids
+from sweep.logparse import STAT_RE, parse_value
+
+INTERVALS_FILE = "intervals.json"
+Z = 1.96  # 95% confidence
+
+COMMITTED, MISPREDICTED = grids.DIRECT_COND_STATS
+RAS_CORRECT, RAS_USED = grids.RAS_STATS
+
+# metric -> (numerator, denominator) counters
+METRICS = {
+    "missRate": (MISPREDICTED, COMMITTED),
+    "btbHitRatio": ("system.cpu.branchPred.BTBHits", "system.cpu.branchPred.BTBLookups"),
+    "rasHitRate": (RAS_CORRECT, RAS_USED),
+}
+
+
+def read_dump(path, offset=0):
+    """
+    Reads the stats dumped to path after offset. Returns ({stat name:
+    value} of the last dump there, new offset).
+    """
+    with open(path, "r", errors="replace") as f:
+        f.seek(offset)
+        text = f.read()
+        offset = f.tell()
+    stats = {}
+    for line in text.splitlines():
+        if line.startswith("---------- Begin"):
+            stats = {}
+        m = STAT_RE.match(line)
+        if m:
+            stats[m.group(1)] = parse_value(m.group(2))
+    return stats, offset
+
+
+class Tracker:
+    """Running ratio estimate and confidence interval over stats intervals"""
+
+    def __init__(self, metric, tolerance=0.0005, min_intervals=10, z=Z):
+        self.metric = metric
+        self.numerator, self.denominator = METRICS[metric]
+        self.tolerance = tolerance
+        self.min_intervals = min_intervals
+        self.z = z
+        self.last = {}
+        self.series = []
+        # sums of a, b, a*a, a*b and b*b over the intervals (a / b is the metric)
+        self.n = 0
+        self.sa = self.sb = self.saa = self.sab = self.sbb = 0.0
+
+    def add(self, stats, insts):
+        """
+        Adds the interval ending with the cumulative stats of one dump after
+        insts instructions. Returns whether the metric has converged.
+        """
+        a = stats.get(self.numerator, 0) - self.last.get(self.numerator, 0)
+        b = stats.get(self.denominator, 0) - self.last.get(self.denominator, 0)
+        self.last = stats
+        self.n += 1
+        self.sa += a
+        self.sb += b
+        self.saa += a * a
+        self.sab += a * b
+        self.sbb += b * b
+        estimate, half_width = self.estimate()
+        self.series.append({"insts": insts, "numerator": a, "denominator": b,
+                            "value": a / b if b else None, "estimate": estimate,
+                            "half_width": None if half_width == math.inf else half_width})
+        return self.converged()
+
+    def estimate(self):
+        """
+        (estimate, confidence half-width); (None, None) before the
+        denominator counted anything.
+        """
+        if not self.sb:
+            return None, None
+        ratio = self.sa / self.sb
+        if self.n < 2:
+            return ratio, math.inf
+        # variance of a - ratio * b, the residual of the ratio estimator
+        var = max(self.saa - 2 * ratio * self.sab + ratio * ratio * self.sbb, 0.0) / (self.n - 1)
+        return ratio, self.z * math.sqrt(var / self.n) / (self.sb / self.n)
+
+    def converged(self):
+        estimate, half_width = self.estimate()
+        return (self.n >= self.min_intervals and estimate is not None
+                and half_width <= self.tolerance * abs(estimate))
+
+    def summary(self):
+        estimate, half_width = self.estimate()
+        return {"metric": self.metric, "tolerance": self.tolerance, "intervals": self.n,
+                "converged": self.converged(), "estimate": estimate,
+                "half_width": None if half_width == math.inf else half_width}
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({**self.summary(), "series": self.series}, f)
+
+
+def read_intervals(path):
+    """
+    The interval record written by Tracker.save, or None.
+    """
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def interval_options(interval=0, metric="missRate", tolerance=None, min_intervals=None):
+    """
+    ooo_core.py options of the interval mode.
+    """
+    if not interval:
+        return {}
+    options = {"statsInterval": interval, "convergeStat": metric}
+    if tolerance is not None:
+        options["convergeTolerance"] = tolerance
+    if min_intervals is not None:
+        options["convergeMinIntervals"] = min_intervals
+    return options
+
+
+def as_stats(intervals):
+    """
+    Summary of an interval record as convergence.* stats for the results
+    store.
+    """
+    if not intervals:
+        return {}
+    stats = {"convergence.intervals": intervals["intervals"], "convergence.converged": int(intervals["converged"])}
+    if intervals.get("half_width") is not None:
+        stats["convergence.half_width"] = intervals["half_width"]
+    if intervals["series"]:
+        stats["convergence.insts"] = intervals["series"][-1]["insts"]
+    return stats
+
+
+def add_interval_arguments(parser):
+    """
+    --interval, --converge, --tolerance and --min-intervals.
+    """
+    parser.add_argument("--interval", type=int, default=0,
+                        help="dump the stats every this many instructions and stop once --converge "
+                             "has converged (see sweep/converge.py). Default: off")
+    parser.add_argument("--converge", choices=sorted(METRICS), default="missRate",
+                        help="metric whose convergence ends a point. Default: missRate")
+    parser.add_argument("--tolerance", type=float, default=None,
+                        help="relative 95%% confidence half-width at which it has converged. Default: 0.0005")
+    parser.add_argument("--min-intervals", type=int, default=None,
+                        help="intervals simulated before checking convergence. Default: 10")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print the interval series of a run in interval mode.")
+    parser.add_argument("intervals", help=f"{INTERVALS_FILE} of a run")
+    args = parser.parse_args(argv)
+
+    record = read_intervals(args.intervals)
+    if record is None:
+        print(f"cannot read {args.intervals}", file=sys.stderr)
+        return 1
+    print(f"{'insts':>14} {'interval':>10} {'estimate':>10} {'+/-':>10}")
+    for row in record["series"]:
+        value = "-" if row["value"] is None else f"{row['value']:.6f}"
+        estimate = "-" if row["estimate"] is None else f"{row['estimate']:.6f}"
+        half = "-" if row["half_width"] in (None, math.inf) else f"{row['half_width']:.6f}"
+        print(f"{row['insts']:>14} {value:>10} {estimate:>10} {half:>10}")
+    state = "converged" if record["converged"] else "not converged"
+    print(f"{record['metric']} {state} after {record['intervals']} intervals (tolerance {record['tolerance']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""
+Storage cost of the predictor structures, computed over whole grids at once.
+
+One place for the sizes every script used to compute on its own:
+
+    local       localPredictorSize x localCtrBits bits (extract_LBP.py)
+    tournament  choice table   choicePredictorSize x choiceCtrBits
+                + global table globalPredictorSize x globalCtrBits
+                + local history localHistoryTableSize x ceil(log2(localPredictorSize))
+                + local table  localPredictorSize x localCtrBits bits
+                (the comment in old/ooo_core.py)
+    btb         btbNumEntries x 16 bytes (extract_BTB.py)
+    ras         rasNumEntries x 8 bytes (extract_RAS.py)
+
+The functions take numpy arrays (or pandas columns, or plain ints) so a
+grid of thousands of configurations costs one array expression, and
+pareto_front extracts the miss rate / storage frontier of any number of
+results in O(n log n). Grids are pruned to a storage budget with
+within_budget before any simulator time is spent on them:
+
+    python -m sweep.cost tournament --param localPredictorSize=64,1024,16384 --max-bytes 4096
+    python -m sweep.runner tourney --max-bytes 8192
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+# bytes per entry assumed by the BTB and RAS extractors
+BTB_ENTRY_BYTES = 16
+RAS_ENTRY_BYTES = 8
+
+# ooo_core.py options that size each structure
+PARAMS = {
+    "local": ["localPredictorSize", "localCtrBits"],
+    "tournament": ["localPredictorSize", "localCtrBits", "choicePredictorSize", "choiceCtrBits",
+                   "globalPredictorSize", "globalCtrBits", "localHistoryTableSize"],
+    "btb": ["btbNumEntries"],
+    "ras": ["rasNumEntries"],
+}
+
+
+def ceil_log2(n):
+    """
+    Element-wise ceil(log2(n)) of positive integers, exact for any int64:
+    the bit length of n - 1, found in integer arithmetic (float64 cannot
+    tell n - 1 from n above 2**53). Gives 0 for n <= 1.
+    """
+    rest = np.asarray(n, dtype=np.int64) - 1
+    bits = np.zeros(rest.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = rest >= (1 << shift)
+        bits += high * shift
+        rest = np.where(high, rest >> shift, rest)
+    return bits + (rest > 0)
+
+
+def local_bits(localPredictorSize, localCtrBits):
+    return np.asarray(localPredictorSize, dtype=np.int64) * localCtrBits
+
+
+def tourney_bits(localPredictorSize, localCtrBits, choicePredictorSize, choiceCtrBits,
+                 globalPredictorSize, globalCtrBits, localHistoryTableSize):
+    local = np.asarray(localPredictorSize, dtype=np.int64)
+    return (np.asarray(choicePredictorSize, dtype=np.int64) * choiceCtrBits
+            + np.asarray(globalPredictorSize, dtype=np.int64) * globalCtrBits
+            + np.asarray(localHistoryTableSize, dtype=np.int64) * ceil_log2(local)
+            + local * localCtrBits)
+
+
+def btb_bits(btbNumEntries):
+    return np.asarray(btbNumEntries, dtype=np.int64) * (BTB_ENTRY_BYTES * 8)
+
+
+def ras_bits(rasNumEntries):
+    return np.asarray(rasNumEntries, dtype=np.int64) * (RAS_ENTRY_BYTES * 8)
+
+
+BITS = {"local": local_bits, "tournament": tourney_bits, "btb": btb_bits, "ras": ras_bits}
+
+# the same formulas as SQL over the option columns (sweep/store.py), so a
+# query computes them in SQLite; ceil_log2 is the store's SQL function. Keep
+# them in step with BITS: tests/test_cost.py checks that both agree
+SQL_BITS = {
+    "local": "localPredictorSize * localCtrBits",
+    "tournament": "choicePredictorSize * choiceCtrBits + globalPredictorSize * globalCtrBits"
+                  " + localHistoryTableSize * ceil_log2(localPredictorSize) + localPredictorSize * localCtrBits",
+    "btb": f"btbNumEntries * {BTB_ENTRY_BYTES * 8}",
+    "ras": f"rasNumEntries * {RAS_ENTRY_BYTES * 8}",
+}
+
+
+def storage_bits(structure, columns):
+    """
+    Bits of every configuration of structure; columns maps the options in
+    PARAMS[structure] to arrays (a dict, a DataFrame, or a single point).
+    """
+    return BITS[structure](*(columns[name] for name in PARAMS[structure]))
+
+
+def storage_bytes(structure, columns):
+    return storage_bits(structure, columns) / 8
+
+
+def point_bytes(structure, point):
+    """
+    Bytes of one configuration, as a Python number.
+    """
+    return storage_bytes(structure, {k: int(v) for k, v in point.items() if k in PARAMS[structure]}).item()
+
+
+def point_columns(points, names, defaults=None):
+    """
+    {option: int64 array} for a list of point dicts; options missing from a
+    point take their value from defaults.
+    """
+    defaults = defaults or {}
+    return {name: np.array([int(p.get(name, defaults.get(name))) for p in points], dtype=np.int64)
+            for name in names}
+
+
+def grid_columns(grid):
+    """
+    {option: flat array} of every combination of a {option: [values]} grid,
+    in the order of grids.expand_grid, without building the points.
+    """
+    names = list(grid)
+    axes = np.meshgrid(*(np.asarray(grid[n], dtype=np.int64) for n in names), indexing="ij")
+    return {name: axis.ravel() for name, axis in zip(names, axes)}
+
+
+def pareto_front(cost, miss):
+    """
+    Indices of the non-dominated results, sorted by cost: each one has a
+    strictly lower miss than every cheaper result (ties in cost go to the
+    lower miss). O(n log n).
+    """
+    cost, miss = np.asarray(cost, dtype=np.float64), np.asarray(miss, dtype=np.float64)
+    if not len(cost):
+        return np.zeros(0, dtype=np.int64)
+    order = np.lexsort((miss, cost))
+    ranked = miss[order]
+    best_before = np.concatenate(([np.inf], np.minimum.accumulate(ranked)[:-1]))
+    return order[ranked < best_before]
+
+
+def dominated(cost, miss):
+    """
+    Boolean mask of the results that are not on the Pareto front.
+    """
+    mask = np.ones(len(cost), dtype=bool)
+    mask[pareto_front(cost, miss)] = False
+    return mask
+
+
+def structure_of(point):
+    """
+    Structure a sweep point sizes: the BTB or RAS if it sets their options,
+    else its predictor (ooo_core.py defaults to the tournament predictor).
+    """
+    if any(name in point for name in PARAMS["btb"]) or "btbAssociativity" in point:
+        return "btb"
+    if any(name in point for name in PARAMS["ras"]):
+        return "ras"
+    return "local" if point.get("predictor") == "local" else "tournament"
+
+
+def within_budget(points, max_bytes, defaults=None, structure=None):
+    """
+    The points whose structure (structure_of each point, unless given)
+    needs at most max_bytes of storage. Options a point leaves out take
+    their defaults (sweep.cache.script_defaults).
+    """
+    keep = np.zeros(len(points), dtype=bool)
+    groups = {}
+    for i, point in enumerate(points):
+        groups.setdefault(structure or structure_of(point), []).append(i)
+    for name, indices in groups.items():
+        size = storage_bytes(name, point_columns([points[i] for i in indices], PARAMS[name], defaults))
+        keep[indices] = size <= max_bytes
+    return [p for p, k in zip(points, keep) if k]
+
+
+def main(argv=None):
+    from sweep import grids
+
+    parser = argparse.ArgumentParser(description="Storage of every configuration of a parameter grid.")
+    parser.add_argument("structure", choices=sorted(PARAMS))
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=V1,V2,...",
+                        help="grid axis (options left out take their ooo_core.py default)")
+    parser.add_argument("--max-bytes", type=float, default=None, help="only list configurations within this budget")
+    args = parser.parse_args(argv)
+
+    from sweep.cache import script_defaults
+    from sweep.store import SCRIPT
+    defaults = script_defaults(SCRIPT)
+    grid = {name: [defaults[name]] for name in PARAMS[args.structure]}
+    grid.update(grids.parse_param_args(args.param))
+    columns = grid_columns(grid)
+    size = storage_bytes(args.structure, columns)
+    keep = np.ones(len(size), dtype=bool) if args.max_bytes is None else size <= args.max_bytes
+    names = list(grid)
+    print("\t".join(names + ["bytes"]))
+    for i in np.flatnonzero(keep)[np.argsort(size[keep], kind="stable")]:
+        print("\t".join([str(columns[n][i]) for n in names] + [f"{size[i]:g}"]))
+    print(f"{int(keep.sum())} of {len(size)} configurations", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
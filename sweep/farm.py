@@ -0,0 +1,521 @@
+"""
+Distribute a sweep over several hosts.
+
+A coordinator keeps the points of a sweep in a durable SQLite queue and
+serves them over HTTP (stdlib only); workers on any host lease a point, run
+gem5 for it with the runner's run_point, and post back the result with all
+of its stats. While gem5 runs, the worker renews its lease; a lease that is
+not renewed in time (the worker died, its host went away) expires and the
+point is handed out again, at most --max-attempts times. The coordinator
+writes every result to the log, results.jsonl and the results store exactly
+like sweep.runner does, in completion order.
+
+    # on the coordinator host
+    python -m sweep.farm coordinator local --queue farm.db --port 8765 --log localBP/log_local_bfs.txt
+    # on every worker host (its own gem5, config script and workload paths)
+    python -m sweep.farm worker http://coordinator:8765 --jobs 16 --gem5 /opt/gem5/gem5.opt
+    python -m sweep.farm status http://coordinator:8765
+
+On a single box, --spawn N makes the coordinator start N local worker
+processes (with its own --gem5/--script/--binary), which is all a test
+needs:
+
+    python -m sweep.farm coordinator btb --spawn 4 --gem5 ./fake_gem5.py --no-preflight --lease 10
+
+The coordinator runs the runner's preflight (sweep/preflight.py): points
+gem5 would refuse are never queued, and once --fail-fast tasks failed with
+the same error before any succeeded, the remaining points are cancelled
+instead of leased. Every worker checks its own gem5, config script and
+workload before leasing anything, and so does the coordinator for the
+workers it spawns.
+
+The coordinator takes the runner's workload options (--checkpoint,
+--graph, --kernel-args, --interval, --batch, --mem-size, --keep-stat) and
+sends them with every task. Their paths (the checkpoints, the graph) are
+used as the coordinator resolved them, so they must be reachable under the
+same path on every worker host, e.g. on a shared filesystem.
+
+The queue survives a coordinator restart: running the same command again
+with the same --queue only adds new points, puts cancelled points back in
+the queue, and writes results that were received but not yet written to
+the log first. The result cache of
+sweep.runner is not used, since workers have their own gem5 builds.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sweep.cache import script_defaults
+from sweep.logstore import clear_log as clear_logfile, open_log
+from sweep.preflight import (FAIL_FAST, FailFast, check_environment, report_failures, report_rejected,
+                             valid_points)
+from sweep.results import RESULTS_FILE, ResultsWriter, params_key
+from sweep.runner import (BINARY, GEM5, SCRIPT, add_run_arguments, add_sweep_arguments, format_block,
+                          record_result, run_identity, run_options, run_point, sweep_points)
+from sweep.store import STORE_FILE, ResultStore
+
+QUEUE_FILE = "farm.db"
+PORT = 8765
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS points (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    point TEXT NOT NULL,
+    header TEXT NOT NULL,
+    stats TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    result TEXT,
+    recorded INTEGER NOT NULL DEFAULT 0,
+    run TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS points_state ON points (state, lease_until);
+"""
+
+# states of a point: pending -> leased -> done, or back to pending when the
+# lease expires; lost once it expired max_attempts times; cancelled when the
+# sweep failed fast before it was leased
+STATES = ["pending", "leased", "done", "lost", "cancelled"]
+
+
+class WorkQueue:
+    """
+    Durable queue of sweep points with leases, shared by the HTTP handler
+    threads of the coordinator.
+    """
+
+    def __init__(self, path=QUEUE_FILE, lease_seconds=120, max_attempts=3):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        if "run" not in [row[1] for row in self.db.execute("PRAGMA table_info(points)")]:
+            # queue written before points carried their run options
+            self.db.execute("ALTER TABLE points ADD COLUMN run TEXT NOT NULL DEFAULT '{}'")
+        self.db.commit()
+
+    def add(self, points, header_fmt, stats, run=None):
+        """
+        Queues the points that are not queued yet for the same run options
+        (see run_spec). Returns how many were added.
+        """
+        run = run or {}
+        with self.lock, self.db:
+            before = self.db.total_changes
+            self.db.executemany(
+                "INSERT OR IGNORE INTO points (key, point, header, stats, run) VALUES (?, ?, ?, ?, ?)",
+                ((json.dumps(params_key(p, run.get("identity"))), json.dumps(p), header_fmt.format(**p),
+                  json.dumps(stats), json.dumps(run))
+                 for p in points))
+            return self.db.total_changes - before
+
+    def expire(self):
+        """
+        Requeues the points whose lease ran out, or gives them up after
+        max_attempts leases. Returns the number of expired leases.
+        """
+        now = time.time()
+        with self.lock, self.db:
+            lost = self.db.execute(
+                "UPDATE points SET state = 'lost', worker = NULL WHERE state = 'leased' AND lease_until < ? "
+                "AND attempts >= ?", (now, self.max_attempts)).rowcount
+            requeued = self.db.execute(
+                "UPDATE points SET state = 'pending', worker = NULL WHERE state = 'leased' AND lease_until < ?",
+                (now,)).rowcount
+        return lost + requeued
+
+    def lease(self, worker):
+        """
+        Leases the next pending point to worker. Returns the task dict, or
+        None if nothing is pending.
+        """
+        self.expire()
+        with self.lock, self.db:
+            row = self.db.execute("SELECT id, point, header, stats, attempts, run FROM points "
+                                  "WHERE state = 'pending' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                return None
+            self.db.execute("UPDATE points SET state = 'leased', worker = ?, lease_until = ?, "
+                            "attempts = attempts + 1 WHERE id = ?",
+                            (worker, time.time() + self.lease_seconds, row[0]))
+        return {"id": row[0], "point": json.loads(row[1]), "header": row[2], "stats": json.loads(row[3]),
+                "attempt": row[4] + 1, "lease_seconds": self.lease_seconds, "run": json.loads(row[5])}
+
+    def cancel(self):
+        """
+        Cancels every pending point. Returns how many were cancelled.
+        """
+        with self.lock, self.db:
+            return self.db.execute("UPDATE points SET state = 'cancelled' WHERE state = 'pending'").rowcount
+
+    def requeue_cancelled(self):
+        """
+        Puts the cancelled points back in the queue. Returns how many.
+        """
+        with self.lock, self.db:
+            return self.db.execute("UPDATE points SET state = 'pending' WHERE state = 'cancelled'").rowcount
+
+    def renew(self, task_id, worker):
+        """
+        Extends the lease of worker on a point. False if it lost the lease.
+        """
+        with self.lock, self.db:
+            return self.db.execute("UPDATE points SET lease_until = ? WHERE id = ? AND state = 'leased' "
+                                   "AND worker = ?",
+                                   (time.time() + self.lease_seconds, task_id, worker)).rowcount == 1
+
+    def complete(self, task_id, worker, result):
+        """
+        Stores the result of a point. A late result from a worker whose
+        lease expired is still taken if nobody finished the point since.
+        Returns False if the point was already done.
+        """
+        with self.lock, self.db:
+            return self.db.execute("UPDATE points SET state = 'done', worker = ?, result = ? "
+                                   "WHERE id = ? AND (state IN ('pending', 'leased') "
+                                   "OR (state = 'lost' AND recorded = 0))",
+                                   (worker, json.dumps(result), task_id)).rowcount == 1
+
+    def unrecorded(self):
+        """
+        [(id, result)] of the points done or lost but not yet written to the
+        log, each with the identity of the workload it ran on. Lost points
+        get a failed result.
+        """
+        with self.lock:
+            rows = self.db.execute("SELECT id, point, header, state, attempts, result, run FROM points "
+                                   "WHERE state IN ('done', 'lost') AND recorded = 0 ORDER BY id").fetchall()
+        found = []
+        for task_id, point, header, state, attempts, result, run in rows:
+            if state == "done":
+                result = json.loads(result)
+            else:
+                output = f"lease expired {attempts} times, point given up\n"
+                result = {"point": json.loads(point), "header": header, "returncode": -1,
+                          "output": output, "stats": {}, "stat_lines": [],
+                          "block": format_block(header, output, [])}
+            result["workload"] = json.loads(run).get("identity", {})
+            found.append((task_id, result))
+        return found
+
+    def mark_recorded(self, task_id):
+        with self.lock, self.db:
+            self.db.execute("UPDATE points SET recorded = 1 WHERE id = ?", (task_id,))
+
+    def counts(self):
+        with self.lock:
+            counts = dict(self.db.execute("SELECT state, COUNT(*) FROM points GROUP BY state").fetchall())
+            workers = [row[0] for row in self.db.execute(
+                "SELECT DISTINCT worker FROM points WHERE state = 'leased'")]
+        return {**{state: counts.get(state, 0) for state in STATES}, "workers": workers}
+
+    def finished(self):
+        counts = self.counts()
+        return counts["pending"] == 0 and counts["leased"] == 0
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    JSON API of the coordinator: POST /lease, /renew, /complete and
+    GET /status.
+    """
+
+    def reply(self, body, code=200):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/status":
+            self.reply(self.server.queue.counts())
+        else:
+            self.reply({"error": "not found"}, 404)
+
+    def do_POST(self):
+        queue = self.server.queue
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError:
+            self.reply({"error": "invalid JSON"}, 400)
+            return
+        if self.path == "/lease":
+            task = queue.lease(body["worker"])
+            if task is None:
+                self.reply({"done": queue.finished()})
+            else:
+                self.reply(task)
+        elif self.path == "/renew":
+            self.reply({"ok": queue.renew(body["id"], body["worker"])})
+        elif self.path == "/complete":
+            self.reply({"ok": queue.complete(body["id"], body["worker"], body["result"])})
+        else:
+            self.reply({"error": "not found"}, 404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(queue, host, port):
+    """
+    Starts the coordinator's HTTP server in a background thread.
+    """
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.queue = queue
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def call(url, path, body=None, timeout=30):
+    """
+    POSTs body (or GETs when body is None) to the coordinator and returns
+    the decoded reply.
+    """
+    data = None if body is None else json.dumps(body).encode()
+    request = urllib.request.Request(url.rstrip("/") + path, data=data,
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=timeout) as reply:
+        return json.loads(reply.read())
+
+
+def call_retrying(url, path, body, patience):
+    """
+    call, retrying while the coordinator is unreachable for up to patience
+    seconds. Returns None if it stayed unreachable.
+    """
+    deadline = time.time() + patience
+    while True:
+        try:
+            return call(url, path, body)
+        except (urllib.error.URLError, ConnectionError, TimeoutError, socket.timeout):
+            if time.time() > deadline:
+                return None
+            time.sleep(2)
+
+
+def heartbeat(url, task, worker, stop):
+    """
+    Renews the lease of task every third of its length until stop is set.
+    """
+    while not stop.wait(task["lease_seconds"] / 3):
+        try:
+            if not call(url, "/renew", {"id": task["id"], "worker": worker})["ok"]:
+                return
+        except (urllib.error.URLError, ConnectionError, TimeoutError, socket.timeout):
+            continue
+
+
+def work(url, worker, gem5, script, binary, outroot, poll=5, patience=300):
+    """
+    Leases and runs points until the coordinator has none left (or stays
+    unreachable for patience seconds). Returns the number of points run.
+    """
+    done = 0
+    while True:
+        task = call_retrying(url, "/lease", {"worker": worker}, patience)
+        if task is None or task.get("done"):
+            return done
+        if "id" not in task:
+            time.sleep(poll)  # every remaining point is leased by someone else
+            continue
+        stop = threading.Event()
+        threading.Thread(target=heartbeat, args=(url, task, worker, stop), daemon=True).start()
+        run = task.get("run", {})
+        try:
+            result = run_point(task["point"], task["header"], task["stats"], gem5, script, binary, outroot,
+                               run.get("checkpoints"), run.get("workload"), run.get("keep_stats"))
+        finally:
+            stop.set()
+        result["worker"] = worker
+        call_retrying(url, "/complete", {"id": task["id"], "worker": worker, "result": result}, patience)
+        done += 1
+        print(f"{worker}: {task['header']} (exit {result['returncode']})", flush=True)
+
+
+def run_worker(args):
+    """
+    Runs --jobs work() loops in threads, each with its own gem5 child.
+    """
+    if not args.no_preflight:
+        problems = check_environment(args.gem5, args.script, args.binary)
+        if problems:
+            print("\n".join(problems), file=sys.stderr)
+            print("Not starting the worker (--no-preflight skips these checks)", file=sys.stderr)
+            return 1
+    script = os.path.abspath(args.script)
+    outroot = os.path.abspath(args.outdir)
+    os.makedirs(outroot, exist_ok=True)
+    name = args.name or f"{socket.gethostname()}:{os.getpid()}"
+    threads = [threading.Thread(target=work, args=(args.url, f"{name}:{i}", args.gem5, script, args.binary,
+                                                   outroot, args.poll, args.patience))
+               for i in range(args.jobs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return 0
+
+
+def spawn_workers(count, url, args):
+    """
+    Starts count local worker processes against url.
+    """
+    cmd = [sys.executable, "-m", "sweep.farm", "worker", url, "--gem5", args.gem5, "--script", args.script,
+           "--binary", args.binary, "--outdir", args.outdir, "--poll", "1"]
+    if args.no_preflight:
+        cmd.append("--no-preflight")
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), os.environ.get("PYTHONPATH")]))}
+    return [subprocess.Popen(cmd + ["--name", f"local{i}"], env=env) for i in range(count)]
+
+
+def run_spec(workload, checkpoints, keep_stats):
+    """
+    Run options sent with every task (see sweep.runner.run_options), with
+    their identity (sweep.runner.run_identity) for the queue key and the
+    recorded results.
+    """
+    return {"workload": workload, "checkpoints": checkpoints, "keep_stats": keep_stats,
+            "identity": run_identity(checkpoints, workload)}
+
+
+def run_coordinator(args):
+    points, header_fmt, stats = sweep_points(args)
+    run = run_spec(*run_options(args))
+    if not args.no_preflight:
+        problems = check_environment(args.gem5, args.script, args.binary) if args.spawn else []
+        if problems:
+            print("\n".join(problems), file=sys.stderr)
+            print("Not starting the sweep (--no-preflight skips these checks)", file=sys.stderr)
+            return 1
+        total = len(points)
+        points, rejected = valid_points(points, script_defaults(args.script))
+        report_rejected(rejected, total)
+    queue = WorkQueue(args.queue, args.lease, args.max_attempts)
+    fresh = sum(v for k, v in queue.counts().items() if k in STATES) == 0
+    queue.requeue_cancelled()
+    added = queue.add(points, header_fmt, stats, run)
+    if fresh and args.clear_log:
+        clear_logfile(args.log)
+    counts = queue.counts()
+    total = sum(counts[state] for state in STATES)
+    print(f"{added} points queued, {counts['done'] + counts['lost']} of {total} already finished")
+
+    server = serve(queue, args.host, args.port)
+    url = f"http://{'127.0.0.1' if args.host in ('', '0.0.0.0') else args.host}:{server.server_address[1]}"
+    print(f"coordinator listening on {url}", flush=True)
+    spawned = spawn_workers(args.spawn, url, args) if args.spawn else []
+
+    log = open_log(args.log)
+    writer = ResultsWriter(args.results) if args.results else None
+    store = ResultStore(args.store, args.script) if args.store else None
+    recorded = counts["done"] + counts["lost"] - len(queue.unrecorded())
+    failing = FailFast(args.fail_fast) if args.fail_fast else None
+    aborted = None
+    results = []
+    try:
+        while True:
+            for task_id, result in queue.unrecorded():
+                recorded += 1
+                record_result(result, log, writer, store, recorded, total)
+                queue.mark_recorded(task_id)
+                results.append(result)
+                if failing and not aborted:
+                    aborted = failing.add(result)
+                    if aborted:
+                        print(f"Aborting: {failing.k} runs failed with \"{aborted}\" and none succeeded; "
+                              f"{queue.cancel()} points cancelled")
+            if queue.finished() and not queue.unrecorded():
+                break
+            queue.expire()
+            time.sleep(0.5)
+        # let the spawned workers ask once more and learn that the sweep is over
+        for proc in spawned:
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.terminate()
+    finally:
+        server.shutdown()
+        log.close()
+        if store:
+            store.close()
+    counts = queue.counts()
+    print(f"{counts['done']} points done, {counts['lost']} lost, {counts['cancelled']} cancelled. "
+          f"Log written to {args.log}")
+    report_failures(results)
+    return 1 if aborted else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Coordinator / worker distribution of a sweep.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("coordinator", help="queue a sweep and serve it to workers")
+    add_sweep_arguments(p)
+    add_run_arguments(p)
+    p.add_argument("--queue", default=QUEUE_FILE, help=f"durable queue file. Default: {QUEUE_FILE}")
+    p.add_argument("--host", default="0.0.0.0", help="address to listen on. Default: all")
+    p.add_argument("--port", type=int, default=PORT, help=f"port to listen on (0: any free port). Default: {PORT}")
+    p.add_argument("--lease", type=float, default=120, help="seconds a lease lasts without renewal. Default: 120")
+    p.add_argument("--max-attempts", type=int, default=3, help="leases of a point before it is given up. Default: 3")
+    p.add_argument("--log", default="log.txt", help="log file read by the extract_* scripts")
+    p.add_argument("--no-clear-log", dest="clear_log", action="store_false",
+                   help="append to --log even for a new queue")
+    p.add_argument("--results", default=RESULTS_FILE, help=f"structured results file. Default: {RESULTS_FILE}")
+    p.add_argument("--store", default=STORE_FILE, help=f"SQLite results store; '' to disable. Default: {STORE_FILE}")
+    p.add_argument("--spawn", type=int, default=0, help="local worker processes to start. Default: 0")
+    p.add_argument("--fail-fast", type=int, default=FAIL_FAST, metavar="K",
+                   help="cancel the pending points once K runs failed with the same error and none succeeded; "
+                        f"0 never cancels. Default: {FAIL_FAST}")
+
+    w = sub.add_parser("worker", help="run points leased from a coordinator")
+    w.add_argument("url", help="coordinator URL, e.g. http://host:8765")
+    w.add_argument("--jobs", "-j", type=int, default=1, help="concurrent gem5 processes. Default: 1")
+    w.add_argument("--name", default=None, help="worker name. Default: host:pid")
+    w.add_argument("--poll", type=float, default=5, help="seconds between polls when all points are leased")
+    w.add_argument("--patience", type=float, default=300,
+                   help="seconds to keep retrying an unreachable coordinator. Default: 300")
+
+    for p in (sub.choices["coordinator"], w):
+        p.add_argument("--gem5", default=GEM5, help=f"gem5 executable. Default: {GEM5}")
+        p.add_argument("--script", default=SCRIPT, help="gem5 config script. Default: old/ooo_core.py")
+        p.add_argument("--binary", default=BINARY, help=f"workload binary. Default: {BINARY}")
+        p.add_argument("--outdir", default="sweep_out", help="root of the per-point gem5 output directories")
+        p.add_argument("--no-preflight", action="store_true",
+                       help="skip the environment checks and keep points gem5 would refuse (see sweep/preflight.py)")
+
+    s = sub.add_parser("status", help="print the queue state of a coordinator")
+    s.add_argument("url")
+    args = parser.parse_args(argv)
+
+    if args.command == "coordinator":
+        try:
+            return run_coordinator(args)
+        except (OSError, ValueError, RuntimeError) as e:
+            parser.error(str(e))
+    if args.command == "worker":
+        return run_worker(args)
+    print(json.dumps(call(args.url, "/status"), indent=1))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
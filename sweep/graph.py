@@ -0,0 +1,140 @@
+"""
+Generate the gapbs input graph once, load it in every sweep point.
+
+Every rv64_bfs run builds its synthetic graph from scratch ("Generate Time",
+"Build Time", "Graph has 1024 nodes ..." in each log block), and gem5
+simulates all of that instruction by instruction, for every point. Instead,
+the graph can be written once in gapbs' serialized format (.sg) by gapbs'
+converter on the host, and every point loads it with -f:
+
+    python -m sweep.graph "-g 16 -k 10"
+    python -m sweep.runner local --graph "-g 16 -k 10" --kernel-args "-n 4"
+    python -m sweep.runner btb --graph graphs/g16_k10.sg
+
+--graph takes either an existing .sg file or converter arguments, in which
+case the graph is generated into --graph-dir the first time and reused
+afterwards (the file is named after the arguments). Points then only
+simulate reading the graph, and all of them see the identical input. The
+serialized layout (little-endian, 64-bit offsets) is the same for x86_64
+and rv64, so the host build of the converter can write it.
+
+The graph's contents and the kernel arguments are part of the result
+cache key (sweep/cache.py).
+"""
+
+import argparse
+import os
+import re
+import shlex
+import subprocess
+import sys
+
+from sweep.cache import file_digest
+
+GRAPH_DIR = "graphs"
+# host build of gapbs' converter (make converter in the gapbs checkout)
+CONVERTER = "/home/teravyte/gapbs/converter"
+
+
+def graph_file(generator_args, directory=GRAPH_DIR):
+    """
+    .sg file for converter arguments, e.g. "-g 16 -k 10" -> graphs/g16_k10.sg.
+    """
+    name = "_".join(flag + value for flag, value in re.findall(r"-+(\w+)\s*([\w.]*)", generator_args))
+    return os.path.abspath(os.path.join(directory, (name or "graph") + ".sg"))
+
+
+def make_graph(generator_args, directory=GRAPH_DIR, converter=CONVERTER):
+    """
+    Writes the serialized graph for generator_args unless it already exists.
+    Returns its path.
+    """
+    path = graph_file(generator_args, directory)
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    part = f"{path}.{os.getpid()}.part"
+    cmd = shlex.split(converter) + shlex.split(generator_args) + ["-b", part]
+    print(" ".join(cmd))
+    out = subprocess.run(cmd, capture_output=True, text=True)
+    if out.returncode != 0 or not os.path.exists(part):
+        if os.path.exists(part):
+            os.remove(part)
+        raise RuntimeError(f"{' '.join(cmd)} failed ({out.returncode}):\n{out.stdout}{out.stderr}")
+    os.replace(part, path)
+    return path
+
+
+def resolve_graph(graph, directory=GRAPH_DIR, converter=CONVERTER):
+    """
+    Path of the .sg file for a --graph value: the file itself, or the graph
+    generated (once) from converter arguments.
+    """
+    if graph.lstrip().startswith("-"):
+        return make_graph(graph, directory, converter)
+    if not os.path.exists(graph):
+        raise ValueError(f"graph file {graph} does not exist")
+    return os.path.abspath(graph)
+
+
+def workload_options(graph=None, kernel_args=""):
+    """
+    ooo_core.py options that run the workload on graph with kernel_args.
+    """
+    options = {}
+    if graph:
+        options["graph"] = graph
+    if kernel_args:
+        options["workloadArgs"] = kernel_args
+    return options
+
+
+def workload_id(options):
+    """
+    Identity of the workload options for the result cache: the graph's
+    contents instead of its path.
+    """
+    identity = dict(options)
+    if "graph" in identity:
+        identity["graph"] = file_digest(identity["graph"])
+    return identity
+
+
+def add_workload_arguments(parser):
+    """
+    --graph, --graph-dir, --converter and --kernel-args (see workload_from_args).
+    """
+    parser.add_argument("--graph", default=None,
+                        help="serialized gapbs graph (.sg) every point loads, or converter arguments "
+                             "such as '-g 16 -k 10' to generate it once (see sweep/graph.py)")
+    parser.add_argument("--graph-dir", default=GRAPH_DIR, help=f"where generated graphs are kept. Default: {GRAPH_DIR}")
+    parser.add_argument("--converter", default=CONVERTER, help=f"gapbs converter for the host. Default: {CONVERTER}")
+    parser.add_argument("--kernel-args", default="", help="extra workload arguments, e.g. '-n 4' (trials)")
+
+
+def workload_from_args(args):
+    """
+    ooo_core.py workload options of the add_workload_arguments options.
+    """
+    graph = resolve_graph(args.graph, args.graph_dir, args.converter) if args.graph else None
+    return workload_options(graph, args.kernel_args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a serialized gapbs graph for sweep.runner --graph.")
+    parser.add_argument("generator_args", help="converter arguments, e.g. '-g 16 -k 10' or '-u 12'")
+    parser.add_argument("--graph-dir", default=GRAPH_DIR, help=f"output directory. Default: {GRAPH_DIR}")
+    parser.add_argument("--converter", default=CONVERTER, help=f"gapbs converter for the host. Default: {CONVERTER}")
+    args = parser.parse_args(argv)
+
+    try:
+        path = make_graph(args.generator_args, args.graph_dir, args.converter)
+    except (OSError, RuntimeError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"{path}: {os.path.getsize(path)} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Parameter grids for the sweeps in old/run.sh, old/run_tourney.sh and the
+BTB / RAS experiments.
+
+A sweep is described by a list of points (dicts of ooo_core.py option names
+to values), the RUNNING header written before each point in the log, and the
+stats collected from stats.txt after the run. The headers are the ones the
+extract_* scripts look for, so logs written by the runner can be fed to them
+unchanged.
+"""
+
+import itertools
+
+# Stats collected by the original run scripts
+DIRECT_COND_STATS = [
+    "system.cpu.branchPred.committed_0::DirectCond",
+    "system.cpu.branchPred.mispredicted_0::DirectCond",
+]
+BTB_STATS = ["system.cpu.branchPred.BTBHitRatio"]
+RAS_STATS = [
+    "system.cpu.branchPred.ras.correct",
+    "system.cpu.branchPred.ras.used",
+]
+
+
+def powers_of_two(lo, hi):
+    """
+    Returns [2**lo, ..., 2**hi].
+    """
+    return [2 ** i for i in range(lo, hi + 1)]
+
+
+def expand_grid(grid):
+    """
+    Expands a dict of {option: [values]} into the list of all combinations.
+    Options keep the order in which they appear in the dict.
+    """
+    names = list(grid)
+    return [dict(zip(names, values))
+            for values in itertools.product(*(grid[n] for n in names))]
+
+
+def local_points():
+    """
+    Points of old/run.sh: LocalBP size 2^6..2^16, counter 2^0..2^16,
+    skipping counters wider than the table is long (j > i).
+    """
+    points = []
+    for j in range(0, 17):
+        for i in range(6, 17):
+            if j > i:
+                continue
+            points.append({"predictor": "local",
+                           "localPredictorSize": 2 ** i,
+                           "localCtrBits": 2 ** j})
+    return points
+
+
+def tourney_points():
+    """
+    Points of old/run_tourney.sh: local size 2^6..2^16 against choice/global/
+    local history sizes 2^0..2^16 tied together, all counters 4 bits wide.
+    """
+    points = []
+    for j in range(0, 17):
+        for i in range(6, 17):
+            points.append({"predictor": "tournament",
+                           "localPredictorSize": 2 ** i,
+                           "localCtrBits": 4,
+                           "choicePredictorSize": 2 ** j,
+                           "choiceCtrBits": 4,
+                           "globalPredictorSize": 2 ** j,
+                           "globalCtrBits": 4,
+                           "localHistoryTableSize": 2 ** j})
+    return points
+
+
+def btb_points():
+    """
+    Points of log_BTB_full.txt: every (associativity, numEntries) pair with
+    both in 2^0..2^16.
+    """
+    return expand_grid({"btbAssociativity": powers_of_two(0, 16),
+                        "btbNumEntries": powers_of_two(0, 16)})
+
+
+def ras_points():
+    """
+    Points of log_RAS.txt: RAS numEntries 2^0..2^16.
+    """
+    return expand_grid({"rasNumEntries": powers_of_two(0, 16)})
+
+
+LOCAL_HEADER = "RUNNING LOCAL PREDICTOR WITH SIZE={localPredictorSize} AND COUNTER={localCtrBits}"
+TOURNEY_HEADER = ("RUNNING LOCAL PREDICTOR WITH SIZE={localPredictorSize} AND LOCAL CTRL BITS={localCtrBits}"
+                  " AND CHOICE PREDICTOR SIZE={choicePredictorSize} AND CHOICE CTRL BITS={choiceCtrBits}"
+                  " AND GLOBAL PREDICTOR SIZE={globalPredictorSize} AND GLOBAL CTRL BITS={globalCtrBits}"
+                  " AND LOCAL HISTORY TABLE SIZE={localHistoryTableSize}")
+BTB_HEADER = "RUNNING associativity={btbAssociativity} AND numEntries={btbNumEntries}"
+RAS_HEADER = "RUNNING numEntries={rasNumEntries}"
+
+# name -> (points function, header format, stats)
+SWEEPS = {
+    "local": (local_points, LOCAL_HEADER, DIRECT_COND_STATS),
+    "tourney": (tourney_points, TOURNEY_HEADER, DIRECT_COND_STATS),
+    "btb": (btb_points, BTB_HEADER, BTB_STATS),
+    "ras": (ras_points, RAS_HEADER, RAS_STATS),
+}
+
+
+def generic_header(point):
+    """
+    Header for points that do not belong to a named sweep.
+    """
+    return "RUNNING " + " AND ".join(f"{k}={v}" for k, v in point.items())
+
+
+def parse_param_args(param_args):
+    """
+    Turns ["localCtrBits=1,2,4", "predictor=local"] into a grid dict.
+    Integer values are converted, everything else is kept as a string.
+    """
+    grid = {}
+    for arg in param_args:
+        name, _, values = arg.partition("=")
+        if not values:
+            raise ValueError(f"expected NAME=V1,V2,... but got '{arg}'")
+        grid[name.strip()] = [int(v) if v.strip().lstrip("-").isdigit() else v.strip()
+                              for v in values.split(",")]
+    return grid
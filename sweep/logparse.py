@@ -0,0 +1,211 @@
+"""
+Single-pass streaming parser for the sweep logs.
+
+A log is a sequence of blocks
+
+    #################################################################
+    RUNNING <parameters>
+    <gem5 output, possibly a crash message and backtrace>
+    <stat lines copied from stats.txt>
+
+as written by old/run.sh, old/run_tourney.sh and sweep/runner.py.
+iter_runs() reads the log line by line and yields one RunRecord per block,
+so memory use does not depend on the size of the log. Every stat line is
+recognised by one precompiled pattern, and blocks that crashed (assertions,
+Python tracebacks, missing stats) are yielded with failed=True instead of
+leaking their neighbours' stats.
+"""
+
+import os
+import re
+import tempfile
+from collections import namedtuple
+
+# header: RUNNING line as written in the log
+# params: {name: int or str} parsed from the header
+# stats:  {stat name: int or float} for every stat line in the block
+# failed: True if gem5 did not finish or no stats were collected
+# error:  first error line of the block (assertion, exception, ...) or None
+# line:   line number of the RUNNING header in the log
+RunRecord = namedtuple("RunRecord", ["header", "params", "stats", "failed", "error", "line"])
+
+# name, value of a gem5 stat line, e.g.
+#   system.cpu.branchPred.committed_0::DirectCond      1770620     90.62%     93.97% # ...
+STAT_RE = re.compile(
+    r'^((?:system|sim|host|final)[\w.:\-]*)\s+(-?(?:\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|nan|inf))(?=\s|$)')
+
+# first line of a failure: C++ assertion, gem5 panic/fatal, Python exception
+ERROR_RE = re.compile(r"Assertion .* failed|Program aborted|\b(?:panic|fatal):|^\w+(?:Error|Exception): ")
+
+# long-form keys used by the run scripts' headers -> ooo_core.py option names
+HEADER_KEYS = {
+    "LOCAL PREDICTOR WITH SIZE": "localPredictorSize",
+    "COUNTER": "localCtrBits",
+    "LOCAL CTRL BITS": "localCtrBits",
+    "CHOICE PREDICTOR SIZE": "choicePredictorSize",
+    "CHOICE CTRL BITS": "choiceCtrBits",
+    "GLOBAL PREDICTOR SIZE": "globalPredictorSize",
+    "GLOBAL CTRL BITS": "globalCtrBits",
+    "LOCAL HISTORY TABLE SIZE": "localHistoryTableSize",
+}
+
+
+def parse_header(header):
+    """
+    Parses a RUNNING line into a dict, e.g.
+      RUNNING LOCAL PREDICTOR WITH SIZE=64 AND COUNTER=1
+        -> {"localPredictorSize": 64, "localCtrBits": 1}
+      RUNNING associativity=2 AND numEntries=512
+        -> {"associativity": 2, "numEntries": 512}
+    """
+    params = {}
+    body = header.strip()[len("RUNNING"):]
+    for part in body.split(" AND "):
+        key, sep, value = part.partition("=")
+        if not sep:
+            continue
+        key = key.strip()
+        key = HEADER_KEYS.get(key, key)
+        value = value.strip()
+        params[key] = int(value) if value.lstrip("-").isdigit() else value
+    return params
+
+
+def parse_value(text):
+    """
+    Converts a stat value to int when it has no fractional part in the text.
+    """
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def iter_lines(source):
+    """
+    Yields the lines of source, which is a file name or an iterable of lines.
+    Compressed logs (.gz, or the .runs container of sweep/logstore.py) are
+    decompressed on the fly.
+    """
+    if isinstance(source, str):
+        from sweep.logstore import is_runlog, iter_log_lines
+        if is_runlog(source):
+            yield from iter_log_lines(source)
+            return
+        if source.endswith(".gz"):
+            import gzip
+            with gzip.open(source, "rt", errors="replace") as f:
+                yield from f
+            return
+        with open(source, "r", errors="replace") as f:
+            yield from f
+    else:
+        yield from source
+
+
+def iter_runs(source, start_line=0):
+    """
+    Generator over the runs of a log. source is a file name or an iterable
+    of lines (e.g. an open file). Yields one RunRecord per RUNNING block,
+    failed ones included. Text before the first RUNNING header is ignored.
+    """
+    header = None
+    header_line = 0
+    stats = {}
+    error = None
+    stat_match = STAT_RE.match
+    error_search = ERROR_RE.search
+
+    for number, line in enumerate(iter_lines(source), start=start_line + 1):
+        first = line[:1]
+        if first == "#":
+            if line.startswith("####"):
+                if header is not None:
+                    yield make_record(header, stats, error, header_line)
+                    header = None
+                continue
+        elif first == "R" and line.startswith("RUNNING"):
+            if header is not None:
+                yield make_record(header, stats, error, header_line)
+            header = line.rstrip("\n")
+            header_line = number
+            stats = {}
+            error = None
+            continue
+
+        if header is None:
+            continue
+        m = stat_match(line)
+        if m:
+            stats[m.group(1)] = parse_value(m.group(2))
+        elif error is None and error_search(line):
+            error = line.strip()
+
+    if header is not None:
+        yield make_record(header, stats, error, header_line)
+
+
+def make_record(header, stats, error, line):
+    return RunRecord(header=header, params=parse_header(header), stats=stats,
+                     failed=error is not None or not stats, error=error, line=line)
+
+
+def read_stats_file(path, keep=()):
+    """
+    Parses a gem5 stats.txt in one pass. Returns ({stat name: value}, lines)
+    where lines are the raw lines of the stats named in keep, in file order.
+    If stats.txt holds several dumps (the cumulative dumps of the interval
+    mode), later values overwrite earlier ones and lines come from the last
+    dump only. A missing file gives ({}, []).
+    """
+    stats = {}
+    lines = []
+    keep = set(keep)
+    stat_match = STAT_RE.match
+    try:
+        f = open(path, "r", errors="replace")
+    except OSError:
+        return stats, lines
+    with f:
+        for line in f:
+            if line.startswith("---------- Begin"):
+                lines = []
+                continue
+            m = stat_match(line)
+            if m:
+                stats[m.group(1)] = parse_value(m.group(2))
+                if m.group(1) in keep:
+                    lines.append(line if line.endswith("\n") else line + "\n")
+    return stats, lines
+
+
+def prune_stats_file(path, keep=(), prefixes=()):
+    """
+    Rewrites a gem5 stats.txt with only the stats named in keep or starting
+    with one of prefixes (dump delimiters and blank lines stay). Returns the
+    bytes saved; a missing file saves nothing.
+    """
+    keep = set(keep)
+    prefixes = tuple(prefixes)
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return 0
+    fd, tmp = tempfile.mkstemp(suffix=".prune", dir=os.path.dirname(os.path.abspath(path)))
+    with open(path, "r", errors="replace") as src, os.fdopen(fd, "w") as dst:
+        for line in src:
+            name = line.split(None, 1)[0] if line.strip() else ""
+            if not name or name.startswith("-") or name in keep or name.startswith(prefixes):
+                dst.write(line)
+    os.replace(tmp, path)
+    return size - os.path.getsize(path)
+
+
+def successful_runs(source, *required):
+    """
+    Yields the runs of source that did not fail and contain every stat in
+    required.
+    """
+    for run in iter_runs(source):
+        if not run.failed and all(name in run.stats for name in required):
+            yield run
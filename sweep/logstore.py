@@ -0,0 +1,374 @@
+"""
+Compressed run-log container (.runs).
+
+Most of a sweep log is the same gem5 banner, DRAM and syscall warnings and
+libc backtraces repeated for every run. A .runs file stores the log as one
+zlib frame per block (separator, RUNNING header, gem5 output, stats), all
+compressed against a shared preset dictionary built from earlier blocks, so
+repeated boilerplate is stored once in the dictionary and costs a few bytes
+per run afterwards. Frames are independent, so any run can be decompressed
+on its own, and the RUNNING header of every frame is stored uncompressed
+(as the part that differs from the previous frame's header) so runs can be
+found by their parameters without decompressing anything.
+
+    file   := MAGIC frame*
+    frame  := FRAME(kind, shared header prefix, suffix bytes, payload bytes)
+              header suffix, payload
+    kind   := DICT (payload: zlib-compressed dictionary, used by the frames
+              that follow) | BLOCK (payload: block text compressed with the
+              current dictionary)
+
+Unpacking a .runs file gives back the original log byte for byte. Frames
+are only ever appended, so the sweep runner writes .runs logs directly
+(--log log.runs), and every reader of the logs (sweep.logparse.iter_runs and
+with it the extract_* scripts, sweep.replay validate, ...) reads .runs and
+.gz logs transparently. sweep.watch follows a growing .runs log frame by
+frame (RunLog.follow).
+
+    python -m sweep.logstore pack BTB/log_BTB_full.txt BTB/log_BTB_full.runs
+    python -m sweep.logstore show BTB/log_BTB_full.runs associativity=2 numEntries=512
+    python -m sweep.logstore unpack BTB/log_BTB_full.runs log.txt
+    python -m sweep.logstore info BTB/log_BTB_full.runs
+"""
+
+import argparse
+import os
+import struct
+import sys
+import zlib
+
+from sweep.logparse import parse_header
+
+MAGIC = b"RUNLOG1\n"
+FRAME = struct.Struct("<BHHI")  # kind, header prefix shared with the last frame, suffix bytes, payload bytes
+DICT = 1
+BLOCK = 2
+
+# zlib only looks back 32 KiB, so a longer dictionary would be wasted
+MAX_DICT = 32 * 1024
+# a block compressing worse than this ratio has boilerplate the dictionary lacks
+REFRESH_RATIO = 0.15
+LEVEL = 9
+
+
+def is_runlog(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def split_blocks(lines):
+    """
+    Groups the lines of a log into blocks, each starting at a separator line
+    (the text before the first separator is a block of its own). Yields the
+    text of every block, so "".join(blocks) is the log.
+    """
+    block = []
+    for line in lines:
+        if line.startswith("####") and block:
+            yield "".join(block)
+            block = []
+        block.append(line)
+    if block:
+        yield "".join(block)
+
+
+def block_header(text):
+    """
+    The RUNNING line of a block, or "".
+    """
+    for line in text.splitlines():
+        if line.startswith("RUNNING"):
+            return line
+    return ""
+
+
+def compress(data, dictionary):
+    c = zlib.compressobj(LEVEL, zdict=dictionary) if dictionary else zlib.compressobj(LEVEL)
+    return c.compress(data) + c.flush()
+
+
+def decompress(payload, dictionary):
+    d = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+    return d.decompress(payload) + d.flush()
+
+
+class RunLogWriter:
+    """
+    Appends blocks to a .runs file, creating it if needed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.dictionary = b""
+        self.last_header = b""
+        if os.path.exists(path) and os.path.getsize(path):
+            for kind, header, payload, _ in RunLog(path).frames(payloads=True, kinds=(DICT,)):
+                self.dictionary = zlib.decompress(payload)
+            for _, header, _, _ in RunLog(path).frames():
+                self.last_header = header.encode()
+            self.f = open(path, "ab")
+        else:
+            self.f = open(path, "wb")
+            self.f.write(MAGIC)
+
+    def write_frame(self, kind, header, payload):
+        header = header.encode()
+        shared = len(os.path.commonprefix([header, self.last_header]))
+        self.f.write(FRAME.pack(kind, shared, len(header) - shared, len(payload)))
+        self.f.write(header[shared:])
+        self.f.write(payload)
+        self.last_header = header
+
+    def write_block(self, text):
+        """
+        Appends one block (see split_blocks). A block that compresses badly
+        against the current dictionary is added to the dictionary first.
+        """
+        data = text.encode()
+        payload = compress(data, self.dictionary)
+        if len(payload) > REFRESH_RATIO * len(data) and len(data) > 256:
+            self.dictionary = (self.dictionary + data)[-MAX_DICT:]
+            self.write_frame(DICT, self.last_header.decode(), zlib.compress(self.dictionary, LEVEL))
+            payload = compress(data, self.dictionary)
+        self.write_frame(BLOCK, block_header(text), payload)
+
+    def write(self, text):
+        """
+        Appends text made of whole blocks, visible to readers on return.
+        """
+        for block in split_blocks(text.splitlines(True)):
+            self.write_block(block)
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TextLogWriter:
+    """
+    Appends blocks to a plain text log.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "a")
+
+    def write(self, text):
+        self.f.write(text)
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RunLog:
+    """
+    Reader of a .runs file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def frames(self, payloads=False, kinds=(DICT, BLOCK)):
+        """
+        Yields (kind, header, payload or None, offset of the payload) for the
+        frames of the given kinds. Payloads of other frames are skipped, not
+        read.
+        """
+        with open(self.path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not a .runs file")
+            last = b""
+            while True:
+                head = f.read(FRAME.size)
+                if len(head) < FRAME.size:
+                    return
+                kind, shared, suffix_len, payload_len = FRAME.unpack(head)
+                last = last[:shared] + f.read(suffix_len)
+                header = last.decode(errors="replace")
+                offset = f.tell()
+                if payloads and kind in kinds:
+                    payload = f.read(payload_len)
+                    if len(payload) < payload_len:
+                        return  # frame still being written
+                else:
+                    payload = None
+                    f.seek(payload_len, os.SEEK_CUR)
+                if kind in kinds:
+                    yield kind, header, payload, offset
+
+    def follow(self, offset=None, header="", dictionary_offset=None):
+        """
+        Reads the frames complete so far from byte offset on (the first
+        frame by default). header is the header of the frame before offset
+        and dictionary_offset the start of the last DICT frame before it, as
+        returned with an earlier block. Yields (header, block text, (offset,
+        header, dictionary_offset) after the block) for every block; a frame
+        still being written ends the iteration.
+        """
+        with open(self.path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not a .runs file")
+            dictionary = b""
+            if dictionary_offset is not None:
+                f.seek(dictionary_offset)
+                _, _, suffix_len, payload_len = FRAME.unpack(f.read(FRAME.size))
+                f.seek(suffix_len, os.SEEK_CUR)
+                dictionary = zlib.decompress(f.read(payload_len))
+            if offset is not None:
+                f.seek(offset)
+            last = header.encode()
+            while True:
+                start = f.tell()
+                head = f.read(FRAME.size)
+                if len(head) < FRAME.size:
+                    return
+                kind, shared, suffix_len, payload_len = FRAME.unpack(head)
+                suffix = f.read(suffix_len)
+                payload = f.read(payload_len)
+                if len(suffix) < suffix_len or len(payload) < payload_len:
+                    return  # frame still being written
+                last = last[:shared] + suffix
+                header = last.decode(errors="replace")
+                if kind == DICT:
+                    dictionary, dictionary_offset = zlib.decompress(payload), start
+                else:
+                    text = decompress(payload, dictionary).decode(errors="replace")
+                    yield header, text, (f.tell(), header, dictionary_offset)
+
+    def blocks(self, select=None):
+        """
+        Yields (header, block text) for every block, or only for the blocks
+        whose header satisfies select(header). Unselected blocks are not
+        decompressed.
+        """
+        dictionary = b""
+        for kind, header, payload, _ in self.frames(payloads=True):
+            if kind == DICT:
+                dictionary = zlib.decompress(payload)
+            elif select is None or select(header):
+                yield header, decompress(payload, dictionary).decode(errors="replace")
+
+    def lines(self):
+        for _, text in self.blocks():
+            yield from text.splitlines(True)
+
+    def index(self):
+        """
+        [(header, params)] of every run, read without decompressing.
+        """
+        return [(header, parse_header(header)) for kind, header, _, _ in self.frames(kinds=(BLOCK,)) if header]
+
+    def find(self, **params):
+        """
+        Yields (header, block text) of the runs whose parameters include params.
+        """
+        wanted = {k: str(v) for k, v in params.items()}
+
+        def select(header):
+            if not header:
+                return False
+            found = parse_header(header)
+            return all(str(found.get(k)) == v for k, v in wanted.items())
+        return self.blocks(select)
+
+
+def iter_log_lines(path):
+    """
+    Lines of a .runs file, as they were in the original log.
+    """
+    return RunLog(path).lines()
+
+
+def clear_log(path):
+    """
+    Starts a new log, as `echo "">log.txt` in the run scripts.
+    """
+    if path.endswith(".runs"):
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+        with RunLogWriter(path) as writer:
+            writer.write_block("\n")
+    else:
+        with open(path, "w") as log:
+            log.write("\n")
+
+
+def open_log(path):
+    """
+    Writer appending whole blocks to a text or .runs log. Sweeps keep one
+    open for all of their runs: opening a .runs log reads the whole file to
+    recover the dictionary and the last header.
+    """
+    return RunLogWriter(path) if path.endswith(".runs") else TextLogWriter(path)
+
+
+def append_log(path, text):
+    """
+    Appends whole blocks to a text or .runs log.
+    """
+    with open_log(path) as log:
+        log.write(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compressed run-log container.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("pack", help="text (or .gz) log -> .runs")
+    p.add_argument("log")
+    p.add_argument("out")
+    p = sub.add_parser("unpack", help=".runs -> text log")
+    p.add_argument("runs")
+    p.add_argument("out")
+    p = sub.add_parser("show", help="print the blocks of the runs with these parameters")
+    p.add_argument("runs")
+    p.add_argument("params", nargs="*", metavar="NAME=VALUE")
+    p = sub.add_parser("info", help="sizes and number of runs")
+    p.add_argument("runs")
+    args = parser.parse_args(argv)
+
+    if args.command == "pack":
+        from sweep.logparse import iter_lines
+        part = args.out + ".part"
+        if os.path.exists(part):
+            os.remove(part)
+        with RunLogWriter(part) as writer:
+            for block in split_blocks(iter_lines(args.log)):
+                writer.write_block(block)
+        os.replace(part, args.out)
+        size, packed = os.path.getsize(args.log), os.path.getsize(args.out)
+        print(f"{args.log}: {size} bytes -> {args.out}: {packed} bytes ({size / max(packed, 1):.1f}x)")
+    elif args.command == "unpack":
+        with open(args.out, "w") as f:
+            for line in RunLog(args.runs).lines():
+                f.write(line)
+    elif args.command == "show":
+        params = dict(p.split("=", 1) for p in args.params)
+        for _, text in RunLog(args.runs).find(**params):
+            sys.stdout.write(text)
+    else:
+        log = RunLog(args.runs)
+        dicts = sum(1 for _ in log.frames(kinds=(DICT,)))
+        raw = sum(len(text) for _, text in log.blocks())
+        print(f"{args.runs}: {len(log.index())} runs, {dicts} dictionaries, "
+              f"{os.path.getsize(args.runs)} bytes for {raw} bytes of log")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Several predictor configurations per gem5 process.
+
+Sweep points only differ in system.cpu.branchPred, yet each one pays gem5's
+startup, the config import, loading the SE workload and generating the
+graph. With --predictorConfigs, ooo_core.py instead builds one independent
+System per configuration under a single Root, all running the same binary,
+and their stats come out side by side in one stats.txt under system0.,
+system1., ...
+
+The runner (--per-process K) packs K points into each gem5 process: it
+writes their options to predictor_configs.json in a group directory, runs
+gem5 there and splits the stats back into one stats.txt per point, renamed
+to system., so the log, cache, results file and store see ordinary runs.
+The process-wide sim* stats are not the point's: simInsts and simOps add up
+all systems, simSeconds, simTicks and finalTick are the slowest system's.
+Each split file gets them computed from the point's own counters instead
+(committed instructions and ops, cycles times clock period), or not at
+all where those counters are missing:
+
+    python -m sweep.runner local --per-process 8 --jobs 4
+
+A configuration gem5 cannot build (a BTB with more ways than entries aborts
+at construction) takes its whole process down, so a failed group is rerun
+one point per process. Checkpoints, --interval and --maxInsts need one
+process per point and are not combined with groups.
+"""
+
+import json
+import os
+import re
+
+from sweep.logparse import STAT_RE, parse_value
+
+CONFIGS_FILE = "predictor_configs.json"
+
+SYSTEM_RE = re.compile(r"system(\d+)\.")
+
+# process-wide sim* stat -> the system's counters it sums (first one found)
+SYSTEM_COUNTS = {
+    "simInsts": ("cpu.commitStats0.numInsts", "cpu.committedInsts"),
+    "simOps": ("cpu.commitStats0.numOps", "cpu.committedOps"),
+}
+# process-wide sim* stats of the simulated time, i.e. of the slowest system
+SYSTEM_TIMES = ("simSeconds", "simTicks", "finalTick")
+
+
+def write_configs(path, points):
+    """
+    Writes the --predictorConfigs file for points.
+    """
+    with open(path, "w") as f:
+        json.dump(points, f, indent=1)
+
+
+def system_sim_stats(stats, prefix):
+    """
+    The process-wide sim* stats (SYSTEM_COUNTS, SYSTEM_TIMES) of the
+    system whose stats start with prefix alone, from its own counters in
+    one dump's stats. Those whose counters are missing are left out.
+    """
+    own = {}
+    for name, counters in SYSTEM_COUNTS.items():
+        value = next((stats[prefix + c] for c in counters if prefix + c in stats), None)
+        if value is not None:
+            own[name] = value
+    cycles, clock = stats.get(prefix + "cpu.numCycles"), stats.get(prefix + "clk_domain.clock")
+    if cycles is not None and clock is not None:
+        own["simTicks"] = own["finalTick"] = int(cycles * clock)
+        if stats.get("simFreq"):
+            own["simSeconds"] = own["simTicks"] / stats["simFreq"]
+    return own
+
+
+def stat_line(name, value, line):
+    """
+    line (a stat line) with name and value replaced, its description kept.
+    """
+    text = f"{value:.6f}" if isinstance(value, float) else str(value)
+    comment = line[line.index("#"):] if "#" in line else "\n"
+    return f"{name:<40} {text:>12}                       {comment}"
+
+
+def split_stats_file(path, outdirs):
+    """
+    Splits the stats.txt of a multi-system run into outdirs[i]/stats.txt:
+    system<i>.* lines go to outdirs[i] renamed to system.*, and lines not
+    belonging to any system (host*, dump delimiters) to every file. The
+    sim* stats summing or spanning all systems are replaced by the
+    system's own values (system_sim_stats), or dropped.
+    """
+    with open(path, "r", errors="replace") as src:
+        dumps = re.split(r"(?m)^(?=---------- Begin)", src.read())
+    files = []
+    for outdir in outdirs:
+        os.makedirs(outdir, exist_ok=True)
+        files.append(open(os.path.join(outdir, "stats.txt"), "w"))
+    try:
+        for dump in dumps:
+            lines = dump.splitlines(keepends=True)
+            stats = {m.group(1): parse_value(m.group(2)) for m in map(STAT_RE.match, lines) if m}
+            own = [system_sim_stats(stats, f"system{i}.") for i in range(len(files))]
+            for line in lines:
+                m = SYSTEM_RE.match(line)
+                if m is not None:
+                    if int(m.group(1)) < len(files):
+                        files[int(m.group(1))].write("system." + line[m.end():])
+                    continue
+                stat = STAT_RE.match(line)
+                if stat and (stat.group(1) in SYSTEM_COUNTS or stat.group(1) in SYSTEM_TIMES):
+                    for f, values in zip(files, own):
+                        if stat.group(1) in values:
+                            f.write(stat_line(stat.group(1), values[stat.group(1)], line))
+                    continue
+                for f in files:
+                    f.write(line)
+    finally:
+        for f in files:
+            f.close()
+
+
+def point_telemetry(telemetry, count):
+    """
+    Share of one of count points in the telemetry of their common process:
+    the times divided evenly, the memory of the whole process.
+    """
+    share = dict(telemetry, group_size=count)
+    for name in ("wall_seconds", "cpu_seconds", "hostSeconds"):
+        if name in share:
+            share[name] = share[name] / count
+    return share
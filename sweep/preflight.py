@@ -0,0 +1,259 @@
+"""
+Checks made before a sweep launches gem5, and failing fast once it has.
+
+old/log.txt is a whole LocalBP sweep in which every run died with
+"ModuleNotFoundError: No module named 'common'", and log_BTB_full.txt spends
+runs on associativity > numEntries points that abort at tick 0 in
+floorLog2. Both were only noticed after the sweep. The runner therefore
+
+  1. checks the environment once: the gem5 executable, the config script,
+     the directories its m5.util.addToPath calls add and the modules it
+     imports from them, and the workload binary (check_environment);
+  2. rejects grid points gem5 would refuse with the constraints of its
+     predictors: power-of-two table sizes, counter widths in
+     1..MAX_CTR_BITS, BTB associativity <= numEntries (point_error);
+  3. aborts the sweep when K runs have failed with the same error and none
+     has succeeded yet (FailFast, --fail-fast K), and
+  4. reports the failed runs grouped by the class of their error
+     (failure_class, report_failures).
+
+    python -m sweep.preflight btb --gem5 ./fake_gem5.py
+"""
+
+import argparse
+import ast
+import os
+import re
+import shutil
+import sys
+from collections import Counter
+
+from sweep.logparse import ERROR_RE
+from sweep.replay import is_power_of_2, local_config_error, tourney_config_error
+
+FAIL_FAST = 5
+
+# modules every gem5 binary provides without addToPath
+GEM5_MODULES = {"m5", "_m5", "gem5"}
+
+
+def check_gem5(gem5):
+    """
+    Returns why gem5 cannot be executed, or None.
+    """
+    if os.sep not in gem5:
+        return None if shutil.which(gem5) else f"gem5 executable {gem5} is not on PATH"
+    if not os.path.isfile(gem5):
+        return f"gem5 executable {gem5} does not exist"
+    if not os.access(gem5, os.X_OK):
+        return f"gem5 executable {gem5} is not executable"
+    return None
+
+
+def script_imports(script):
+    """
+    Returns (directories added by m5.util.addToPath, packages imported
+    unconditionally, i.e. by the script's top-level statements) of a gem5
+    config script. Relative directories are taken relative to the script,
+    as addToPath does.
+    """
+    with open(script, "r") as f:
+        tree = ast.parse(f.read(), script)
+    paths, modules = [], set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and getattr(node.func, "attr", getattr(node.func, "id", None)) == "addToPath":
+            if node.args and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str):
+                paths.append(os.path.join(os.path.dirname(os.path.abspath(script)), node.args[0].value))
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.add(node.module.split(".")[0])
+    return paths, modules
+
+
+def check_script(script):
+    """
+    Problems with a gem5 config script: missing, unparsable, addToPath
+    directories that do not exist, or imported modules that are neither
+    part of Python or gem5 nor found in those directories (or next to the
+    script).
+    """
+    if not os.path.isfile(script):
+        return [f"config script {script} does not exist"]
+    try:
+        paths, modules = script_imports(script)
+    except (OSError, SyntaxError) as e:
+        return [f"cannot parse config script {script}: {e}"]
+    problems = [f"{script} adds {path} to the module path, which does not exist"
+                for path in paths if not os.path.isdir(path)]
+    search = [os.path.dirname(os.path.abspath(script))] + paths
+    builtin = set(getattr(sys, "stdlib_module_names", ())) | set(sys.builtin_module_names) | GEM5_MODULES
+    for module in sorted(modules - builtin):
+        if not any(os.path.exists(os.path.join(d, module + ".py")) or os.path.isdir(os.path.join(d, module))
+                   for d in search):
+            problems.append(f"{script} imports {module}, which is in none of {', '.join(search)}")
+    return problems
+
+
+def check_environment(gem5, script, binary):
+    """
+    Everything that would make every run of a sweep fail, as a list of
+    problems (empty when the sweep can start).
+    """
+    problems = [problem for problem in [check_gem5(gem5)] if problem]
+    problems += check_script(script)
+    if not os.path.isfile(binary):
+        problems.append(f"workload binary {binary} does not exist")
+    return problems
+
+
+def point_error(point, defaults=None):
+    """
+    Returns why gem5 would refuse a sweep point, or None if it is valid.
+    Options the point leaves out take their defaults
+    (sweep.cache.script_defaults).
+    """
+    config = {**(defaults or {}), **point}
+    numbers = {}
+    for name in ("localPredictorSize", "localCtrBits", "globalPredictorSize", "globalCtrBits",
+                 "choicePredictorSize", "choiceCtrBits", "localHistoryTableSize",
+                 "btbAssociativity", "btbNumEntries", "rasNumEntries"):
+        if name in config:
+            try:
+                numbers[name] = int(config[name])
+            except (TypeError, ValueError):
+                return f"{name}={config[name]} is not an integer"
+    predictor = config.get("predictor", "tournament")
+    if predictor == "local" and {"localPredictorSize", "localCtrBits"} <= set(numbers):
+        error = local_config_error(numbers["localPredictorSize"], numbers["localCtrBits"])
+        if error:
+            return error
+    if predictor == "tournament" and all(name in numbers for name in (
+            "localPredictorSize", "localCtrBits", "globalPredictorSize", "globalCtrBits",
+            "choicePredictorSize", "choiceCtrBits", "localHistoryTableSize")):
+        error = tourney_config_error(numbers)
+        if error:
+            return error
+    for name in ("btbNumEntries", "btbAssociativity"):
+        if name in numbers and not is_power_of_2(numbers[name]):
+            return f"{name}={numbers[name]} is not a power of 2"
+    assoc, entries = numbers.get("btbAssociativity"), numbers.get("btbNumEntries")
+    if assoc is not None and entries is not None and assoc > entries:
+        # no sets left: floorLog2(0) assertion when the BTB is built
+        return f"btbAssociativity={assoc} > btbNumEntries={entries}"
+    if numbers.get("rasNumEntries", 1) < 1:
+        return f"rasNumEntries={numbers['rasNumEntries']} is less than 1"
+    return None
+
+
+def valid_points(points, defaults=None):
+    """
+    Splits points into (valid points, [(rejected point, reason)]).
+    """
+    valid, rejected = [], []
+    for point in points:
+        error = point_error(point, defaults)
+        if error is None:
+            valid.append(point)
+        else:
+            rejected.append((point, error))
+    return valid, rejected
+
+
+def failure_class(text):
+    """
+    Class of an error message: numbers and addresses replaced, so runs that
+    failed the same way share it.
+    """
+    return re.sub(r"0x[0-9a-fA-F]+|\d+", "N", text.strip())
+
+
+def failure_signature(result):
+    """
+    Class of the first error line in a failed run's gem5 output (see
+    sweep.runner.run_point), or of its exit status if there is none.
+    """
+    for line in result["output"].splitlines():
+        if ERROR_RE.search(line):
+            return failure_class(line)
+    return f"exit status {result['returncode']}"
+
+
+class FailFast:
+    """
+    Decides when to abort a sweep: after k runs failed with the same
+    signature before any run succeeded. Cached results do not count.
+    """
+
+    def __init__(self, k=FAIL_FAST):
+        self.k = k
+        self.succeeded = False
+        self.failures = Counter()
+
+    def add(self, result):
+        """
+        Adds a finished run. Returns the signature that ends the sweep, or
+        None to go on.
+        """
+        if result.get("cached"):
+            return None
+        if result["returncode"] == 0:
+            self.succeeded = True
+            return None
+        signature = failure_signature(result)
+        self.failures[signature] += 1
+        if not self.succeeded and self.failures[signature] >= self.k:
+            return signature
+        return None
+
+
+def report_failures(results):
+    """
+    Prints the failed runs grouped by failure signature, most frequent first.
+    """
+    classes = Counter(failure_signature(r) for r in results if r["returncode"] != 0)
+    if classes:
+        print("Failures by class:")
+    for signature, count in classes.most_common():
+        print(f"  {count:>5}  {signature}")
+
+
+def report_rejected(rejected, total):
+    """
+    Prints how many points were rejected, grouped by the class of reason.
+    """
+    if not rejected:
+        return
+    print(f"{len(rejected)} of {total} points rejected, gem5 would refuse them:")
+    for reason, count in Counter(failure_class(reason) for _, reason in rejected).most_common():
+        print(f"  {count:>5}  {reason}")
+
+
+def main(argv=None):
+    from sweep.cache import script_defaults
+    from sweep.runner import BINARY, GEM5, SCRIPT, add_sweep_arguments, sweep_points
+
+    parser = argparse.ArgumentParser(description="Check the environment and the points of a sweep without running it.")
+    add_sweep_arguments(parser)
+    parser.add_argument("--gem5", default=GEM5, help=f"gem5 executable. Default: {GEM5}")
+    parser.add_argument("--script", default=SCRIPT, help="gem5 config script. Default: old/ooo_core.py")
+    parser.add_argument("--binary", default=BINARY, help=f"workload binary. Default: {BINARY}")
+    args = parser.parse_args(argv)
+
+    try:
+        points, _, _ = sweep_points(args)
+        defaults = script_defaults(args.script)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    problems = check_environment(args.gem5, args.script, args.binary)
+    for problem in problems:
+        print(problem)
+    valid, rejected = valid_points(points, defaults)
+    report_rejected(rejected, len(points))
+    print(f"{len(valid)} of {len(points)} points valid, environment {'broken' if problems else 'ok'}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+RAS hit rate for every numEntries from one pass over a call/return trace.
+
+gem5's return address stack is a circular buffer: a call writes the return
+address at tos + 1 and a return reads the entry at tos and moves tos down,
+wrapping around numEntries in both directions. The entry pushed by a call at
+depth d is therefore still intact when its return comes back to depth d
+unless some call in between was made at depth d + numEntries or deeper,
+i.e. unless the deepest excursion above d since the call is >= numEntries.
+Tracking that excursion for each return, with one record per call depth,
+gives a histogram from which the hit rate of every size follows, in memory
+proportional to the maximum call depth.
+
+As in gem5, every return uses the RAS (ras.used is the number of returns);
+a return is correct if its target is the address pushed into its slot, which
+also covers wrapped slots that happen to hold the same return address again
+(recursion) and returns past the start of the trace.
+
+    python -m sweep.ras profile trace.npz --out ras.csv --log RAS/log_RAS_trace.txt
+    python -m sweep.ras check trace.npz RAS/log_RAS.txt
+
+The --log output uses the RUNNING/ras.correct/ras.used format read by
+extract_RAS.py.
+"""
+
+import argparse
+import csv
+import sys
+
+from sweep.cost import point_bytes
+from sweep.logparse import successful_runs
+from sweep.replay import BRANCH_TYPES, RETURN, read_trace
+
+CORRECT = "system.cpu.branchPred.ras.correct"
+USED = "system.cpu.branchPred.ras.used"
+
+CALLS = {BRANCH_TYPES.index("CallDirect"), BRANCH_TYPES.index("CallIndirect")}
+
+# RISC-V calls are 2 or 4 bytes long, so the return address is pc + 2 or pc + 4
+MAX_CALL_SIZE = 4
+
+# numEntries 2^0 .. 2^16, as in log_RAS.txt
+MAX_LOG2 = 16
+
+
+def matches(call_pc, target):
+    """
+    True if target is the return address of a call at call_pc.
+    """
+    return 0 < target - call_pc <= MAX_CALL_SIZE
+
+
+def excursion_histogram(pc, target, kind):
+    """
+    One pass over the trace, modelling the RAS as a circular buffer whose
+    top of stack moves on every call and return.
+
+    Returns (histogram, extra, returns, max depth). histogram[e] counts
+    returns whose entry is correct and was left intact as long as
+    numEntries > e, where e is the deepest excursion above the return's depth
+    since its call. extra[n] counts returns that are correct only by accident
+    for numEntries == n: their entry was overwritten after wrapping, by a call
+    with the same return address (typically recursion).
+    """
+    # for every depth: time and call pc of the last call made at that depth,
+    # and the deepest depth reached since then
+    last_time, last_pc, deepest = {}, {}, {}
+    hist = []
+    extra = {}
+    returns = 0
+    depth = 0
+    max_depth = 0
+
+    for time, (p, t, k) in enumerate(zip(pc.tolist(), target.tolist(), kind.tolist())):
+        if k in CALLS:
+            depth += 1
+            last_time[depth], last_pc[depth], deepest[depth] = time, p, depth
+            if depth > max_depth:
+                max_depth = depth
+        elif k == RETURN:
+            returns += 1
+            d = depth
+            depth -= 1
+            if d not in last_time:
+                count_unpushed(d, t, last_time, last_pc, extra)
+                continue
+            top = deepest[d]
+            if depth in deepest and top > deepest[depth]:
+                deepest[depth] = top
+            e = top - d
+            if matches(last_pc[d], t):
+                if e >= len(hist):
+                    hist.extend([0] * (e + 1 - len(hist)))
+                hist[e] += 1
+            # sizes n <= e: the slot was overwritten from depth d + k*n, and
+            # the latest of those calls decides the prediction
+            for n in range(1, e + 1):
+                winner = max(range(d + n, top + 1, n), key=last_time.__getitem__)
+                if matches(last_pc[winner], t):
+                    extra[n] = extra.get(n, 0) + 1
+
+    return hist, extra, returns, max_depth
+
+
+def count_unpushed(d, t, last_time, last_pc, extra):
+    """
+    A return at a depth no call has reached yet (the trace started inside a
+    deeper function): its slot holds whatever the latest call at a depth
+    congruent to d modulo numEntries wrote, if any.
+    """
+    if not last_time:
+        return
+    lo, hi = min(last_time), max(last_time)
+    # d is below every depth called so far, so only n <= hi - d can wrap onto one
+    for n in range(1, hi - d + 1):
+        depths = [x for x in range(d - ((d - lo) // n) * n, hi + 1, n) if x in last_time]
+        if depths and matches(last_pc[max(depths, key=last_time.__getitem__)], t):
+            extra[n] = extra.get(n, 0) + 1
+
+
+def hit_rates(hist, extra, returns, max_entries):
+    """
+    Returns [(numEntries, correct, used)] for numEntries = 1 .. max_entries.
+    """
+    rows = []
+    intact = 0
+    for n in range(1, max_entries + 1):
+        if n - 1 < len(hist):
+            intact += hist[n - 1]
+        rows.append((n, intact + extra.get(n, 0), returns))
+    return rows
+
+
+def write_log(path, rows):
+    """
+    Writes the power-of-two sizes as RUNNING/ras blocks for extract_RAS.py.
+    """
+    with open(path, "w") as f:
+        f.write("\n")
+        for n, correct, used in rows:
+            if n & (n - 1):
+                continue
+            f.write("#" * 65 + "\n")
+            f.write(f"RUNNING numEntries={n}\n")
+            f.write(f"{CORRECT:<40} {correct:>12}                       "
+                    "# Number of times the RAS is the provider and the prediction is correct (Count)\n")
+            f.write(f"{USED:<40} {used:>12}                       "
+                    "# Number of times the RAS is the provider (Count)\n\n")
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["numEntries", "correct", "used", "Hit Rate", "Total Size (Bytes)"])
+        for n, correct, used in rows:
+            writer.writerow([n, correct, used, correct / used if used else 0.0,
+                             int(point_bytes("ras", {"rasNumEntries": n}))])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RAS hit rate for every size from one pass over a trace.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("profile", help="hit rate for numEntries = 1 .. N")
+    p.add_argument("trace")
+    p.add_argument("--max-entries", type=int, default=2 ** MAX_LOG2,
+                   help=f"largest numEntries. Default: {2 ** MAX_LOG2}")
+    p.add_argument("--out", default="ras_profile.csv", help="CSV table to write")
+    p.add_argument("--log", default=None, help="also write a log readable by extract_RAS.py")
+    p = sub.add_parser("check", help="compare against a gem5 RAS log")
+    p.add_argument("trace")
+    p.add_argument("log")
+    args = parser.parse_args(argv)
+
+    pc, taken, kind, target = read_trace(args.trace, with_target=True)
+    hist, extra, returns, max_depth = excursion_histogram(pc, target, kind)
+    print(f"{returns} returns, maximum call depth {max_depth}")
+
+    if args.command == "profile":
+        rows = hit_rates(hist, extra, returns, args.max_entries)
+        write_csv(args.out, rows)
+        print(f"Data stored in {args.out}")
+        if args.log:
+            write_log(args.log, rows)
+            print(f"Log stored in {args.log}")
+        return 0
+
+    runs = list(successful_runs(args.log, CORRECT, USED))
+    largest = max((r.params.get("numEntries", 0) for r in runs), default=0)
+    rates = {n: (correct, used) for n, correct, used in hit_rates(hist, extra, returns, largest)}
+    for run in runs:
+        n = run.params.get("numEntries")
+        if n not in rates:
+            continue
+        correct, used = rates[n]
+        gem5_rate = run.stats[CORRECT] / run.stats[USED]
+        rate = correct / used if used else 0.0
+        print(f"numEntries={n:<6} gem5 {run.stats[CORRECT]}/{run.stats[USED]} = {gem5_rate:.6f}  "
+              f"trace {correct}/{used} = {rate:.6f}  diff {rate - gem5_rate:+.6f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,501 @@
+"""
+Trace-driven replay of gem5's LocalBP and TournamentBP.
+
+Instead of a full O3 simulation per sweep point, a recorded stream of
+committed conditional branches (PC, taken) is replayed through models of
+gem5's predictor tables (src/cpu/pred/2bit_local.cc and tournament.cc).
+All configurations of a sweep are evaluated in the same pass over the
+trace: their tables are laid out back to back in one array per table kind,
+and for each branch the lookups and counter updates of every configuration
+are done with a handful of NumPy operations.
+
+The model resolves every branch before the next one is predicted, whereas
+the O3 CPU predicts at fetch and updates at commit, so the numbers are close
+to but not identical with gem5's. The validate command measures the gap
+against an existing gem5 log.
+
+    python -m sweep.replay local trace.npz --out local.csv
+    python -m sweep.replay tourney trace.npz --out tourney.csv
+    python -m sweep.replay validate trace.npz localBP/log_local_bfs.txt
+
+With --jobs N the configurations are split among N processes. The trace
+is loaded once and placed in shared memory, which every worker maps
+without copying it, and the workers' rows are merged into one table in
+grid order:
+
+    python -m sweep.replay tourney trace.npz --jobs 16 --param localPredictorSize=256,1024,4096
+
+Traces are binary branch traces (see sweep/trace.py), .npz files with "pc"
+and "taken" arrays (and optionally "kind", a gem5 BranchType code per
+branch, and "target"), or text files with one
+"<pc> <taken> [<BranchType name> [<target>]]" line per branch (addresses in
+hex or decimal). Only DirectCond branches are predicted and counted; as in
+gem5's TournamentBP::updateHistories, every other branch still shifts its
+outcome into the global history, unconditional ones as taken.
+"""
+
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from sweep import cost, grids
+from sweep.logparse import successful_runs
+
+# BranchPredictor.py: instShiftAmt = Param.Unsigned(2, ...)
+INST_SHIFT_AMT = 2
+# SatCounter8 refuses counters wider than 8 bits
+MAX_CTR_BITS = 8
+
+# gem5's BranchType enum (src/cpu/static_inst.hh), in code order
+BRANCH_TYPES = ["NoBranch", "Return", "CallDirect", "CallIndirect",
+                "DirectCond", "DirectUncond", "IndirectCond", "IndirectUncond"]
+DIRECT_COND = BRANCH_TYPES.index("DirectCond")
+RETURN = BRANCH_TYPES.index("Return")
+NO_BRANCH = BRANCH_TYPES.index("NoBranch")
+UNCONDITIONAL = [BRANCH_TYPES.index(name) for name in
+                 ("Return", "CallDirect", "CallIndirect", "DirectUncond", "IndirectUncond")]
+
+COMMITTED = "system.cpu.branchPred.committed_0::DirectCond"
+MISPREDICTED = "system.cpu.branchPred.mispredicted_0::DirectCond"
+
+# Columns of the DataFrame built by localBP/extract_LBP.py
+LOCAL_COLUMNS = ["Local Predictor Size", "Counter", "Committed Branches", "Mispredicted Branches"]
+# Columns of the spreadsheet read by tournamentBP/extract_tourney.py
+TOURNEY_PARAMS = ["localPredictorSize", "localCtrBits", "choicePredictorSize", "choiceCtrBits",
+                  "globalPredictorSize", "globalCtrBits", "localHistoryTableSize"]
+TOURNEY_COLUMNS = TOURNEY_PARAMS + ["COMMITED", "MISS", "MISS Rate", "Total Size (Bytes)"]
+
+
+def is_power_of_2(n):
+    return n > 0 and n & (n - 1) == 0
+
+
+def read_trace(path, with_target=False):
+    """
+    Returns (pc, taken, kind) arrays for every branch in a trace file, plus
+    the target array if with_target is set (zeros when the trace has none).
+    Traces without branch types are taken to hold DirectCond branches only.
+    """
+    from sweep.trace import TraceReader, is_trace
+
+    if is_trace(path):
+        pc, taken, kind, target = TraceReader(path).arrays()
+    elif path.endswith(".npz"):
+        with np.load(path) as data:
+            pc, taken = data["pc"].astype(np.uint64), data["taken"].astype(bool)
+            if "kind" in data:
+                kind = data["kind"].astype(np.uint8)
+            else:
+                kind = np.full(len(pc), DIRECT_COND, dtype=np.uint8)
+            target = data["target"].astype(np.uint64) if "target" in data else np.zeros_like(pc)
+    else:
+        pcs, taken, kinds, targets = [], [], [], []
+        with open(path, "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 2 or parts[0].startswith("#"):
+                    continue
+                pcs.append(int(parts[0], 0))
+                taken.append(parts[1] not in ("0", "N", "n", "False"))
+                kinds.append(BRANCH_TYPES.index(parts[2]) if len(parts) > 2 else DIRECT_COND)
+                targets.append(int(parts[3], 0) if len(parts) > 3 else 0)
+        pc, taken = np.array(pcs, dtype=np.uint64), np.array(taken, dtype=bool)
+        kind, target = np.array(kinds, dtype=np.uint8), np.array(targets, dtype=np.uint64)
+    if with_target:
+        return pc, taken, kind, target
+    return pc, taken, kind
+
+
+def load_trace(path):
+    """
+    Returns (pc, taken, kind) arrays of the branches in a trace file, with
+    unconditional branches marked taken.
+    """
+    pc, taken, kind = read_trace(path)
+    branch = kind != NO_BRANCH
+    pc, taken, kind = pc[branch], taken[branch], kind[branch]
+    return pc, taken | np.isin(kind, UNCONDITIONAL), kind
+
+
+def conditional(taken, kind):
+    """
+    Mask of the DirectCond branches, the ones the predictors are scored on.
+    """
+    if kind is None:
+        return np.ones(len(taken), dtype=bool)
+    return kind == DIRECT_COND
+
+
+def branch_keys(pc):
+    """
+    PC >> instShiftAmt as Python-friendly int64, shared by every index function.
+    """
+    return (pc >> np.uint64(INST_SHIFT_AMT)).astype(np.int64)
+
+
+# ----------------------------------------------------------------------
+# LocalBP
+# ----------------------------------------------------------------------
+
+def local_config_error(size, bits):
+    """
+    Returns why gem5 would refuse LocalBP(size, bits), or None if it is valid.
+    """
+    if bits < 1 or bits > MAX_CTR_BITS:
+        return f"localCtrBits={bits} is not in 1..{MAX_CTR_BITS}"
+    if not is_power_of_2(size):
+        return f"localPredictorSize={size} is not a power of 2"
+    if size < bits or not is_power_of_2(size // bits):
+        return f"localPredictorSize/localCtrBits={size}/{bits} is not a power of 2"
+    return None
+
+
+def replay_local(pc, taken, configs, kind=None):
+    """
+    Replays the trace through LocalBP for every (localPredictorSize,
+    localCtrBits) in configs. Returns the number of mispredictions per config
+    (None for configs gem5 would refuse). Without kind, every branch is taken
+    to be DirectCond; LocalBP keeps no history, so other branches are skipped.
+
+    As in gem5, the table has localPredictorSize / localCtrBits counters
+    indexed by (PC >> instShiftAmt) & (sets - 1), predicting taken when the
+    counter's top bit is set. Configs with the same (sets, bits) share a table.
+    """
+    unique = {}
+    for size, bits in configs:
+        if local_config_error(size, bits) is None:
+            unique.setdefault((size // bits, bits), len(unique))
+    misses = np.zeros(len(unique), dtype=np.int64)
+    cond = conditional(taken, kind)
+    pc, taken = pc[cond], taken[cond]
+
+    if unique:
+        shapes = sorted(unique, key=unique.get)
+        sets = np.array([s for s, _ in shapes], dtype=np.int64)
+        bits = np.array([b for _, b in shapes], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(sets)[:-1]))
+        masks = sets - 1
+        thresholds = 1 << (bits - 1)
+        maxima = (1 << bits) - 1
+        table = np.zeros(int(sets.sum()), dtype=np.int16)
+
+        for key, t in zip(branch_keys(pc).tolist(), taken.tolist()):
+            idx = offsets + (key & masks)
+            ctr = table[idx]
+            pred = ctr >= thresholds
+            if t:
+                misses += ~pred
+                table[idx] = np.minimum(ctr + 1, maxima)
+            else:
+                misses += pred
+                table[idx] = np.maximum(ctr - 1, 0)
+
+    result = []
+    for size, bits in configs:
+        if local_config_error(size, bits) is None:
+            result.append(int(misses[unique[(size // bits, bits)]]))
+        else:
+            result.append(None)
+    return result
+
+
+# ----------------------------------------------------------------------
+# TournamentBP
+# ----------------------------------------------------------------------
+
+def tourney_config_error(config):
+    """
+    Returns why gem5 would refuse a TournamentBP config, or None if it is valid.
+    """
+    for name in ("localPredictorSize", "globalPredictorSize", "choicePredictorSize",
+                 "localHistoryTableSize"):
+        if not is_power_of_2(int(config[name])):
+            return f"{name}={config[name]} is not a power of 2"
+    for name in ("localCtrBits", "globalCtrBits", "choiceCtrBits"):
+        if not 1 <= int(config[name]) <= MAX_CTR_BITS:
+            return f"{name}={config[name]} is not in 1..{MAX_CTR_BITS}"
+    return None
+
+
+def tourney_storage_bytes(config):
+    """
+    Storage of a TournamentBP config, from the formula in old/ooo_core.py
+    (see sweep/cost.py).
+    """
+    return cost.point_bytes("tournament", config)
+
+
+def replay_tournament(pc, taken, configs, kind=None):
+    """
+    Replays the trace through TournamentBP for every config (dicts with the
+    seven ooo_core.py tournament options). Returns the number of
+    mispredictions per config (None for configs gem5 would refuse). Without
+    kind, every branch is taken to be DirectCond.
+
+    Mirrors tournament.cc: the local history table (indexed by PC) selects a
+    local counter, the global history selects both a global and a choice
+    counter, the choice counter picks local or global, the choice counter is
+    trained only when the two disagree, and both histories shift in the
+    outcome. Branches other than DirectCond are neither predicted nor
+    trained but shift their outcome into the global history.
+    """
+    valid = [i for i, c in enumerate(configs) if tourney_config_error(c) is None]
+    result = [None] * len(configs)
+    if not valid:
+        return result
+
+    def column(name):
+        return np.array([int(configs[i][name]) for i in valid], dtype=np.int64)
+
+    local_size, local_bits = column("localPredictorSize"), column("localCtrBits")
+    global_size, global_bits = column("globalPredictorSize"), column("globalCtrBits")
+    choice_size, choice_bits = column("choicePredictorSize"), column("choiceCtrBits")
+    lht_size = column("localHistoryTableSize")
+
+    def offsets(sizes):
+        return np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+    local_off, global_off = offsets(local_size), offsets(global_size)
+    choice_off, lht_off = offsets(choice_size), offsets(lht_size)
+    local_ctrs = np.zeros(int(local_size.sum()), dtype=np.int16)
+    global_ctrs = np.zeros(int(global_size.sum()), dtype=np.int16)
+    choice_ctrs = np.zeros(int(choice_size.sum()), dtype=np.int16)
+    local_hist = np.zeros(int(lht_size.sum()), dtype=np.int64)
+
+    # localHistoryBits = ceilLog2(localPredictorSize)
+    local_mask = (1 << cost.ceil_log2(local_size)) - 1
+    global_mask, choice_mask, lht_mask = global_size - 1, choice_size - 1, lht_size - 1
+    history_mask = (1 << np.maximum(cost.ceil_log2(global_size), cost.ceil_log2(choice_size))) - 1
+    # threshold = (1 << (ctrBits - 1)) - 1, predict taken when counter > threshold
+    local_thr, global_thr = (1 << (local_bits - 1)) - 1, (1 << (global_bits - 1)) - 1
+    choice_thr = (1 << (choice_bits - 1)) - 1
+    local_max, global_max, choice_max = (1 << local_bits) - 1, (1 << global_bits) - 1, (1 << choice_bits) - 1
+
+    global_hist = np.zeros(len(valid), dtype=np.int64)
+    misses = np.zeros(len(valid), dtype=np.int64)
+
+    cond = conditional(taken, kind)
+    for key, t, c in zip(branch_keys(pc).tolist(), taken.tolist(), cond.tolist()):
+        if not c:
+            global_hist = ((global_hist << 1) | t) & history_mask
+            continue
+        lht_idx = lht_off + (key & lht_mask)
+        history = local_hist[lht_idx]
+        local_idx = local_off + history
+        global_idx = global_off + (global_hist & global_mask)
+        choice_idx = choice_off + (global_hist & choice_mask)
+
+        local_ctr = local_ctrs[local_idx]
+        global_ctr = global_ctrs[global_idx]
+        choice_ctr = choice_ctrs[choice_idx]
+        local_pred = local_ctr > local_thr
+        global_pred = global_ctr > global_thr
+        pred = np.where(choice_ctr > choice_thr, global_pred, local_pred)
+
+        disagree = local_pred != global_pred
+        if t:
+            misses += ~pred
+            choice_ctrs[choice_idx] = np.where(disagree & ~local_pred, np.minimum(choice_ctr + 1, choice_max),
+                                               np.where(disagree, np.maximum(choice_ctr - 1, 0), choice_ctr))
+            global_ctrs[global_idx] = np.minimum(global_ctr + 1, global_max)
+            local_ctrs[local_idx] = np.minimum(local_ctr + 1, local_max)
+        else:
+            misses += pred
+            choice_ctrs[choice_idx] = np.where(disagree & local_pred, np.minimum(choice_ctr + 1, choice_max),
+                                               np.where(disagree, np.maximum(choice_ctr - 1, 0), choice_ctr))
+            global_ctrs[global_idx] = np.maximum(global_ctr - 1, 0)
+            local_ctrs[local_idx] = np.maximum(local_ctr - 1, 0)
+
+        global_hist = ((global_hist << 1) | t) & history_mask
+        local_hist[lht_idx] = ((history << 1) | t) & local_mask
+
+    for i, m in zip(valid, misses.tolist()):
+        result[i] = m
+    return result
+
+
+# ----------------------------------------------------------------------
+# tables
+# ----------------------------------------------------------------------
+
+def local_table(pc, taken, kind, points):
+    """
+    Rows in the format of extract_LBP.py's DataFrame for the valid points.
+    """
+    configs = [(int(p["localPredictorSize"]), int(p["localCtrBits"])) for p in points]
+    committed = int(conditional(taken, kind).sum())
+    rows = []
+    for (size, bits), miss in zip(configs, replay_local(pc, taken, configs, kind)):
+        if miss is not None:
+            rows.append([size, bits, committed, miss])
+    return rows
+
+
+def tourney_table(pc, taken, kind, points):
+    """
+    Rows in the format of the spreadsheet read by extract_tourney.py.
+    """
+    committed = int(conditional(taken, kind).sum())
+    rows = []
+    for point, miss in zip(points, replay_tournament(pc, taken, points, kind)):
+        if miss is not None:
+            rows.append([int(point[n]) for n in TOURNEY_PARAMS]
+                        + [committed, miss, miss / committed * 100, tourney_storage_bytes(point)])
+    return rows
+
+
+TABLES = {"local": local_table, "tourney": tourney_table}
+
+
+# ----------------------------------------------------------------------
+# parallel replay
+# ----------------------------------------------------------------------
+
+# this worker's mapping of the shared trace: blocks and (pc, taken, kind) views
+_shared = {}
+
+
+def share_arrays(arrays):
+    """
+    Copies arrays into new shared memory blocks. Returns (blocks, specs);
+    specs [(block name, shape, dtype)] let other processes map them.
+    """
+    blocks, specs = [], []
+    for array in arrays:
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        specs.append((block.name, array.shape, array.dtype.str))
+    return blocks, specs
+
+
+def attach_arrays(specs):
+    """
+    Maps the blocks of share_arrays. Returns (blocks, arrays); the arrays
+    are views of the shared memory, valid while the blocks are open.
+    """
+    blocks = [shared_memory.SharedMemory(name=name) for name, _, _ in specs]
+    arrays = [np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+              for block, (_, shape, dtype) in zip(blocks, specs)]
+    return blocks, arrays
+
+
+def _attach_worker(specs):
+    _shared["blocks"], _shared["arrays"] = attach_arrays(specs)
+
+
+def _replay_share(job):
+    table, points = job
+    pc, taken, kind = _shared["arrays"]
+    return TABLES[table](pc, taken, kind, points)
+
+
+def parallel_table(table, pc, taken, kind, points, jobs=None):
+    """
+    Rows of TABLES[table] for points, computed by jobs processes that share
+    one copy of the trace, each replaying a contiguous share of the points.
+    The rows come back in the order of points.
+    """
+    jobs = min(jobs or os.cpu_count() or 1, len(points))
+    if jobs <= 1:
+        return TABLES[table](pc, taken, kind, points)
+    shares = np.array_split(np.arange(len(points)), jobs)
+    blocks, specs = share_arrays([pc, taken, kind])
+    try:
+        with ProcessPoolExecutor(jobs, initializer=_attach_worker, initargs=(specs,)) as pool:
+            parts = pool.map(_replay_share, [(table, [points[i] for i in share]) for share in shares])
+            return [row for part in parts for row in part]
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def write_table(path, columns, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+
+def validate(pc, taken, kind, log):
+    """
+    Replays every successful run of a gem5 log and returns rows of
+    (header, gem5 miss rate %, replay miss rate %, difference in points).
+    LocalBP runs are recognised by their localPredictorSize/localCtrBits
+    header, tournament runs by the full set of tournament options.
+    """
+    runs = list(successful_runs(log, COMMITTED, MISPREDICTED))
+    tourney = [r for r in runs if all(n in r.params for n in TOURNEY_PARAMS)]
+    local = [r for r in runs if r not in tourney and "localPredictorSize" in r.params]
+
+    rows = []
+    committed = int(conditional(taken, kind).sum())
+    local_misses = replay_local(pc, taken, [(r.params["localPredictorSize"], r.params["localCtrBits"])
+                                            for r in local], kind)
+    tourney_misses = replay_tournament(pc, taken, [r.params for r in tourney], kind)
+    for run, miss in list(zip(local, local_misses)) + list(zip(tourney, tourney_misses)):
+        if miss is None:
+            continue
+        gem5_rate = run.stats[MISPREDICTED] / run.stats[COMMITTED] * 100
+        replay_rate = miss / committed * 100
+        rows.append((run.header, gem5_rate, replay_rate, replay_rate - gem5_rate))
+    return rows
+
+
+def sweep_points(name, param_args):
+    """
+    Points of the named grid, or the grid given with --param.
+    """
+    extra = grids.parse_param_args(param_args)
+    if extra:
+        fixed = {"local": {}, "tourney": {"localCtrBits": 4, "choiceCtrBits": 4, "globalCtrBits": 4}}[name]
+        return [{**fixed, **p} for p in grids.expand_grid(extra)]
+    return grids.local_points() if name == "local" else grids.tourney_points()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a branch trace through LocalBP/TournamentBP models.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("local", "tourney"):
+        p = sub.add_parser(name, help=f"miss-rate table for the {name} sweep")
+        p.add_argument("trace")
+        p.add_argument("--param", action="append", default=[], metavar="NAME=V1,V2,...",
+                       help="grid axis (default: the run.sh / run_tourney.sh grid)")
+        p.add_argument("--out", default=f"{name}_replay.csv", help="CSV table to write")
+        p.add_argument("--jobs", "-j", type=int, default=1,
+                       help="processes sharing the trace, each replaying part of the grid. Default: 1")
+    p = sub.add_parser("validate", help="compare replay miss rates against a gem5 log")
+    p.add_argument("trace")
+    p.add_argument("log")
+    args = parser.parse_args(argv)
+
+    pc, taken, kind = load_trace(args.trace)
+    print(f"Loaded {len(taken)} branches, {int(conditional(taken, kind).sum())} conditional, from {args.trace}")
+
+    if args.command == "validate":
+        rows = validate(pc, taken, kind, args.log)
+        for header, gem5_rate, replay_rate, diff in rows:
+            print(f"{header}\n    gem5 {gem5_rate:8.4f}%  replay {replay_rate:8.4f}%  diff {diff:+.4f}")
+        if rows:
+            errors = [abs(r[3]) for r in rows]
+            print(f"{len(rows)} runs compared: mean |diff| {sum(errors) / len(errors):.4f} points, "
+                  f"max {max(errors):.4f} points")
+        else:
+            print("No comparable runs found in the log.")
+        return 0
+
+    points = sweep_points(args.command, args.param)
+    rows = parallel_table(args.command, pc, taken, kind, points, args.jobs)
+    write_table(args.out, LOCAL_COLUMNS if args.command == "local" else TOURNEY_COLUMNS, rows)
+    print(f"Data stored in {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
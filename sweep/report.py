@@ -0,0 +1,224 @@
+"""
+Headless report of every sweep.
+
+Parses the inputs of all extract_* scripts (LocalBP, TournamentBP, BTB size,
+BTB associativity, RAS) and renders their figures with matplotlib's Agg
+backend in a process pool, as PNG and SVG files plus an index.html:
+
+    python -m sweep.report --out report --jobs 6
+    python -m sweep.report --input btb_assoc=BTB/log_BTB_full.runs --format png
+    python -m sweep.report --input tourney=results.db
+    python -m sweep.report --dry-run
+
+Parsing happens in this process with the extractors' own parse functions,
+which only need sweep.logparse; pandas and matplotlib are imported by the
+workers that draw. report/manifest.json keeps a digest of every figure's
+parsed data and of the extractor drawing it, and figures whose digest has not
+changed (and whose files exist) are not rendered again.
+"""
+
+import argparse
+import hashlib
+import html
+import importlib.util
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from sweep.cache import file_digest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# default input of every sweep, relative to the repository root
+INPUTS = {
+    "local": "localBP/log_local_bfs.txt",
+    "tourney": "tournamentBP/salvaaa.xlsx",
+    "btb": "BTB/log_BTB_entries.txt",
+    "btb_assoc": "BTB/log_BTB_full.txt",
+    "ras": "RAS/log_RAS.txt",
+}
+
+# figure -> (sweep, extractor, parse function, function turning the parsed
+# data into the plot argument or None, plot function)
+FIGURES = {
+    "local_miss_rate_vs_size": ("local", "localBP/extract_LBP.py", "parse_log", "make_dataframe",
+                                "plot_miss_rate_vs_size"),
+    "local_miss_rate_vs_bytes": ("local", "localBP/extract_LBP.py", "parse_log", "make_dataframe",
+                                 "plot_miss_rate_vs_total_size"),
+    "tourney_miss_rate_vs_bytes": ("tourney", "tournamentBP/extract_tourney.py", None, "load_table",
+                                   "plot_miss_rate"),
+    "btb_hit_ratio_vs_size": ("btb", "BTB/extract_BTB.py", "parse_log_file", None, "plot_btb"),
+    "btb_hit_rate_vs_associativity": ("btb_assoc", "BTB/extract_BTB_ass.py", "parse_log_file", None,
+                                      "plot_hit_rate"),
+    "ras_hit_rate_vs_size": ("ras", "RAS/extract_RAS.py", "parse_log_file", None,
+                             "plot_hit_rate_vs_total_size"),
+}
+
+FORMATS = ["png", "svg"]
+
+_extractors = {}
+
+
+def finish_figure(plt, out=None):
+    """
+    Shows the current figure, or saves it to every path in out and closes it.
+    Used by the extract_* scripts so that they also draw headless.
+    """
+    if not out:
+        plt.show()
+        return
+    for path in out:
+        plt.savefig(path, bbox_inches="tight")
+    plt.close()
+
+
+def load_extractor(script):
+    """
+    Imports an extract_* script (relative to the repository root) as a module.
+    """
+    if script not in _extractors:
+        path = os.path.join(REPO_ROOT, script)
+        name = os.path.splitext(os.path.basename(script))[0]
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _extractors[script] = module
+    return _extractors[script]
+
+
+def digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(json.dumps(part, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def parse_inputs(inputs):
+    """
+    Parses every sweep once. Returns {sweep: (data, digest of the data)};
+    sweeps whose input is missing or empty get (None, None). Inputs without
+    a parse function (the tournament results store or spreadsheet) are passed
+    on as paths and digested by content.
+    """
+    parsed = {}
+    for name, (sweep, script, parse, _, _) in FIGURES.items():
+        if sweep in parsed:
+            continue
+        path = inputs[sweep]
+        if not os.path.exists(path):
+            parsed[sweep] = (None, None)
+        elif parse is None:
+            parsed[sweep] = (os.path.abspath(path), file_digest(path))
+        else:
+            data = getattr(load_extractor(script), parse)(path)
+            empty = not data or (isinstance(data, tuple) and not data[0])
+            parsed[sweep] = (None, None) if empty else (data, digest(data))
+    return parsed
+
+
+def render(name, data, outputs):
+    """
+    Draws one figure into outputs (worker process).
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+
+    _, script, _, prepare, plot = FIGURES[name]
+    module = load_extractor(script)
+    if prepare:
+        args = (getattr(module, prepare)(data),)
+    else:
+        args = data if isinstance(data, tuple) else (data,)
+    getattr(module, plot)(*args, out=outputs)
+    return name
+
+
+def write_index(path, figures, inputs, formats):
+    """
+    Writes an HTML page showing every rendered figure.
+    """
+    image = "png" if "png" in formats else formats[0]
+    with open(path, "w") as f:
+        f.write("<!DOCTYPE html>\n<html><head><meta charset='utf-8'><title>Sweep report</title></head><body>\n")
+        f.write("<h1>Sweep report</h1>\n")
+        for name in figures:
+            sweep = FIGURES[name][0]
+            links = " ".join(f"<a href='{name}.{fmt}'>{fmt}</a>" for fmt in formats)
+            f.write(f"<h2>{html.escape(name)}</h2>\n<p>{html.escape(inputs[sweep])} &middot; {links}</p>\n")
+            f.write(f"<img src='{name}.{image}' style='max-width: 100%'>\n")
+        f.write("</body></html>\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render every sweep figure headless, in parallel.")
+    parser.add_argument("--out", default="report", help="output directory. Default: report")
+    parser.add_argument("--input", action="append", default=[], metavar="SWEEP=PATH",
+                        help=f"input of a sweep ({', '.join(INPUTS)}); default: the checked-in files")
+    parser.add_argument("--format", action="append", default=None, choices=FORMATS,
+                        help="image format (repeatable). Default: png and svg")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="worker processes (default: number of CPUs)")
+    parser.add_argument("--force", action="store_true", help="render every figure, changed or not")
+    parser.add_argument("--dry-run", action="store_true", help="only parse and list the figures to render")
+    args = parser.parse_args(argv)
+
+    inputs = {k: os.path.join(REPO_ROOT, v) for k, v in INPUTS.items()}
+    for item in args.input:
+        sweep, _, path = item.partition("=")
+        if sweep not in INPUTS or not path:
+            parser.error(f"expected SWEEP=PATH with SWEEP in {', '.join(INPUTS)}, got '{item}'")
+        inputs[sweep] = path
+    formats = args.format or FORMATS
+    os.makedirs(args.out, exist_ok=True)
+
+    manifest_path = os.path.join(args.out, "manifest.json")
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    parsed = parse_inputs(inputs)
+    jobs, figures = {}, []
+    for name, (sweep, script, _, _, _) in FIGURES.items():
+        data, data_digest = parsed[sweep]
+        if data_digest is None:
+            print(f"{name}: no data in {inputs[sweep]}, skipped")
+            continue
+        figures.append(name)
+        key = digest(data_digest, file_digest(os.path.join(REPO_ROOT, script)), formats)
+        outputs = [os.path.abspath(os.path.join(args.out, f"{name}.{fmt}")) for fmt in formats]
+        if args.force or manifest.get(name) != key or not all(os.path.exists(p) for p in outputs):
+            jobs[name] = (data, outputs, key)
+        else:
+            print(f"{name}: unchanged")
+
+    if args.dry_run:
+        for name in jobs:
+            print(f"{name}: would render")
+        return 0
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {pool.submit(render, name, data, outputs): name for name, (data, outputs, _) in jobs.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                manifest.pop(name, None)
+                print(f"{name}: FAILED ({e})")
+                continue
+            manifest[name] = jobs[name][2]
+            print(f"{name}: rendered")
+
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    write_index(os.path.join(args.out, "index.html"), [n for n in figures if n in manifest], inputs, formats)
+    print(f"{len(jobs) - failed} rendered, {len(figures) - len(jobs)} unchanged, {failed} failed. "
+          f"Report in {os.path.join(args.out, 'index.html')}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
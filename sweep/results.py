@@ -0,0 +1,171 @@
+"""
+Append-only file of structured per-run results.
+
+Every finished sweep point is stored as one JSON line holding the point's
+ooo_core.py parameters and *all* stats of its stats.txt, parsed once:
+
+    {"params": {...}, "header": "RUNNING ...", "returncode": 0, "stats": {...},
+     "telemetry": {...}, "workload": {...}}
+
+so new questions about old sweeps are answered by reading this file rather
+than by simulating again. telemetry is the host cost of the run (see
+sweep/telemetry.py). workload, left out for the default workload, is the
+identity of the input and checkpoint the point ran on (see
+sweep.runner.run_identity). Records are keyed by their parameters and
+workload; when a point appears more than once on the same workload the last
+record wins. read_columns() and read_dataframe() turn the file into one
+column per parameter, workload option and stat.
+
+    python -m sweep.results results.jsonl --stat system.cpu.branchPred.BTBHitRatio
+"""
+
+import argparse
+import json
+import os
+import sys
+
+RESULTS_FILE = "results.jsonl"
+
+
+def params_key(params, workload=None):
+    """
+    Hashable identity of a point, run on workload (the identity of its input
+    and checkpoint, see sweep.runner.run_identity). Values are compared as
+    strings, so 64 and "64" are the same point.
+    """
+    key = tuple(sorted((k, str(v)) for k, v in params.items()))
+    if workload:
+        key += (("workload", tuple(sorted((k, str(v)) for k, v in workload.items()))),)
+    return key
+
+
+def make_record(result):
+    """
+    Builds the stored record from a runner result dict.
+    """
+    record = {
+        "params": result["point"],
+        "header": result["header"],
+        "returncode": result["returncode"],
+        "stats": result.get("stats", {}),
+        "telemetry": result.get("telemetry", {}),
+    }
+    if result.get("intervals"):
+        record["intervals"] = result["intervals"]
+    if result.get("workload"):
+        record["workload"] = result["workload"]
+    return record
+
+
+def iter_records(path):
+    """
+    Yields the stored records in file order, skipping a torn last line left
+    by an interrupted writer.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def read_records(path):
+    """
+    Returns the records of path, one per point and workload (the last one
+    written).
+    """
+    records = {}
+    for record in iter_records(path):
+        records[params_key(record["params"], record.get("workload"))] = record
+    return list(records.values())
+
+
+class ResultsWriter:
+    """Appends records for points that are not in the results file yet"""
+
+    def __init__(self, path=RESULTS_FILE):
+        self.path = path
+        self.known = {params_key(r["params"], r.get("workload")) for r in iter_records(path)}
+
+    def add(self, result, overwrite=False):
+        """
+        Appends result unless its point is already stored for the same
+        workload. Freshly simulated points pass overwrite=True so they
+        replace older records on read.
+        """
+        key = params_key(result["point"], result.get("workload"))
+        if key in self.known and not overwrite:
+            return False
+        with open(self.path, "a") as f:
+            f.write(json.dumps(make_record(result), separators=(",", ":")) + "\n")
+        self.known.add(key)
+        return True
+
+
+def read_columns(path, stats=None):
+    """
+    Returns {column: [values]} with one column per parameter and workload
+    option, plus "returncode", plus one column per stat (all stats, or only
+    those in stats). Missing values are None.
+    """
+    records = read_records(path)
+    params = [{**r["params"], **r.get("workload", {})} for r in records]
+    param_names = []
+    stat_names = [] if stats is None else list(stats)
+    seen_params, seen_stats = set(), set(stat_names)
+    for record, point in zip(records, params):
+        for name in point:
+            if name not in seen_params:
+                seen_params.add(name)
+                param_names.append(name)
+        if stats is None:
+            for name in record["stats"]:
+                if name not in seen_stats:
+                    seen_stats.add(name)
+                    stat_names.append(name)
+
+    columns = {name: [] for name in param_names + ["returncode"] + stat_names}
+    for record, point in zip(records, params):
+        for name in param_names:
+            columns[name].append(point.get(name))
+        columns["returncode"].append(record["returncode"])
+        for name in stat_names:
+            columns[name].append(record["stats"].get(name))
+    return columns
+
+
+def read_dataframe(path, stats=None):
+    """
+    Same as read_columns, as a pandas DataFrame.
+    """
+    import pandas as pd
+    return pd.DataFrame(read_columns(path, stats))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print stored sweep results as a table.")
+    parser.add_argument("results", nargs="?", default=RESULTS_FILE, help=f"results file. Default: {RESULTS_FILE}")
+    parser.add_argument("--stat", action="append", default=None, help="stat column to show (repeatable)")
+    parser.add_argument("--list-stats", action="store_true", help="list the stat names stored in the file")
+    args = parser.parse_args(argv)
+
+    if args.list_stats:
+        names = set()
+        for record in iter_records(args.results):
+            names.update(record["stats"])
+        print("\n".join(sorted(names)))
+        return 0
+
+    columns = read_columns(args.results, args.stat or [])
+    names = list(columns)
+    print("\t".join(names))
+    for row in zip(*(columns[n] for n in names)):
+        print("\t".join("" if v is None else str(v) for v in row))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
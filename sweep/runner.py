@@ -0,0 +1,594 @@
+"""
+Parallel replacement for the serial loops in old/run.sh and old/run_tourney.sh.
+
+Every sweep point runs in its own gem5 process with its own --outdir, so
+several points can run at once without clobbering each other's stats.txt.
+At most --jobs gem5 processes are alive at any time. Finished points are
+appended to the log by this process only, in the same
+
+    #################################################################
+    RUNNING ...
+    <gem5 output>
+    <stat lines>
+
+format the run scripts produced, so the extract_* scripts read it unchanged.
+
+Examples (from the repository root):
+
+    python -m sweep.runner local --jobs 32 --log localBP/log_local_bfs.txt
+    python -m sweep.runner btb --gem5 ./fake_gem5.py --no-preflight --outdir /tmp/btb
+    python -m sweep.runner custom --param localCtrBits=1,2,4 --param localPredictorSize=1024
+
+With --checkpoint, every point restores a checkpoint taken once after
+fast-forwarding (or a set of SimPoint checkpoints) instead of simulating
+from tick 0; see sweep/checkpoint.py.
+
+With --graph, the gapbs graph is generated once in serialized form and
+every point loads it instead of simulating its generation; see
+sweep/graph.py. With --interval, every point dumps its stats periodically
+and stops once the --converge metric has converged; see sweep/converge.py.
+
+--batch runs ooo_core.py lean, so one gem5 per core fits on a host: no GDB
+listener (concurrent runs would collide on port 7000), no config dumps,
+the DRAM device sized to --mem-size, and every stats.txt cut down to the
+branch-predictor, sim* and host* stats (or the --keep-stat prefixes)
+before it is parsed, cached and recorded.
+
+--per-process K simulates K points in each gem5 process, one System per
+point under a single Root, and splits their stats; see sweep/multi.py.
+
+Before anything runs, the gem5 executable, the config script's modules and
+the workload binary are checked and points gem5 would refuse are dropped;
+the sweep aborts once --fail-fast runs failed the same way before any
+succeeded, and the failures are reported by class; see sweep/preflight.py.
+
+Finished points are stored in a result cache (see sweep/cache.py), so
+re-running an interrupted or extended sweep only simulates the new points.
+Each run's complete stats.txt is parsed once and appended to a structured
+results file (see sweep/results.py) and stored as one row of the SQLite
+results store (see sweep/store.py), so later analysis never needs the
+simulation again.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from sweep import cost, grids
+from sweep.cache import CACHE_DIR, ResultCache, SweepKeys, script_defaults
+from sweep.checkpoint import checkpoint_id, find_checkpoints, merge_simpoint_runs, restore_options
+from sweep.converge import INTERVALS_FILE, add_interval_arguments, interval_options, read_intervals
+from sweep.graph import add_workload_arguments, workload_from_args, workload_id
+from sweep.logparse import prune_stats_file, read_stats_file
+from sweep.logstore import clear_log as clear_logfile, open_log
+from sweep.multi import CONFIGS_FILE, point_telemetry, split_stats_file, write_configs
+from sweep.preflight import (FAIL_FAST, FailFast, check_environment, report_failures, report_rejected,
+                             valid_points)
+from sweep.results import RESULTS_FILE, ResultsWriter
+from sweep.schedule import DEFAULT_RSS_KB, CostModel, plan
+from sweep.store import STORE_FILE, ResultStore
+from sweep.telemetry import combine, load_runs, run_measured, with_host_stats
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Defaults taken from old/run.sh
+GEM5 = "/home/teravyte/gem5/build/RISCV/gem5.opt"
+BINARY = "/home/teravyte/gapbs/rv64_bfs"
+SCRIPT = os.path.join(REPO_ROOT, "old", "ooo_core.py")
+
+SEPARATOR = "#" * 65
+
+# stats.txt prefixes kept in --batch mode
+BATCH_STATS = ["sim", "host", "system.cpu.branchPred."]
+
+
+def point_name(point):
+    """
+    Directory-safe name of a sweep point, e.g. localPredictorSize-64_localCtrBits-1.
+    """
+    return "_".join(f"{k}-{v}" for k, v in point.items())
+
+
+def build_command(gem5, script, binary, outdir, point):
+    """
+    Returns the gem5 command line for one sweep point.
+    """
+    cmd = [gem5, f"--outdir={outdir}", script]
+    cmd += [f"--{k}={v}" for k, v in point.items()]
+    cmd.append(binary)
+    return cmd
+
+
+def format_block(header, output, stat_lines):
+    """
+    Formats one run as the run scripts did: separator, RUNNING header,
+    gem5 output, collected stats and a blank line.
+    """
+    if output and not output.endswith("\n"):
+        output += "\n"
+    return f"{SEPARATOR}\n{header}\n{output}{''.join(stat_lines)}\n"
+
+
+def call_gem5(cmd, outdir):
+    """
+    Runs one gem5 command in outdir. Returns (exit status, gem5 output,
+    telemetry of the process, see sweep/telemetry.py).
+    """
+    os.makedirs(outdir, exist_ok=True)
+    gem5_log = os.path.join(outdir, "gem5.log")
+    with open(gem5_log, "w") as log:
+        try:
+            returncode, telemetry = run_measured(cmd, log, outdir)
+        except OSError as e:
+            log.write(f"{e}\n")
+            returncode, telemetry = -1, {"exit_status": -1}
+
+    with open(gem5_log, "r", errors="replace") as log:
+        return returncode, log.read(), telemetry
+
+
+def run_point(point, header, stats, gem5, script, binary, outroot, checkpoints=None, workload=None,
+              keep_stats=None):
+    """
+    Runs gem5 for one sweep point in outroot/<point name> and returns a dict
+    with the point, its header, the exit status, the formatted log block,
+    the log's stat lines, every stat of stats.txt and the host cost of the
+    run (telemetry). Unlike the fgrep loop in the run scripts, stats.txt is
+    read only once.
+
+    With checkpoints (see sweep/checkpoint.py) the point restores each of
+    them in turn; several (SimPoint) checkpoints are run in subdirectories
+    and their weighted stats written to the point's stats.txt.
+
+    workload holds ooo_core.py options shared by every point: the
+    workload's input (sweep/graph.py) and the interval mode
+    (sweep/converge.py), whose interval series is kept as "intervals".
+    With keep_stats (stat name prefixes), stats.txt is cut down to those
+    and the stats before it is read.
+    """
+    outdir = os.path.join(outroot, point_name(point))
+    point_options = {**point, **(workload or {})}
+    if not checkpoints or len(checkpoints) == 1:
+        options = {**point_options, **restore_options(checkpoints[0])} if checkpoints else point_options
+        returncode, output, telemetry = call_gem5(build_command(gem5, script, binary, outdir, options), outdir)
+    else:
+        returncode, outputs, runs, parts = 0, [], [], []
+        for number, checkpoint in enumerate(checkpoints):
+            run_dir = os.path.join(outdir, f"simpoint_{number:02d}")
+            options = {**point_options, **restore_options(checkpoint)}
+            code, output, part = call_gem5(build_command(gem5, script, binary, run_dir, options), run_dir)
+            outputs.append(f"simpoint {number} (weight {checkpoint[1]}):\n{output}")
+            runs.append((checkpoint[1], run_dir))
+            parts.append(with_host_stats(part, read_stats_file(os.path.join(run_dir, "stats.txt"))[0]))
+            if code != 0:
+                returncode = code
+                break
+        output = "".join(outputs)
+        telemetry = combine(parts)
+        if returncode == 0:
+            merge_simpoint_runs(outdir, runs)
+    if keep_stats is not None:
+        prune_stats_file(os.path.join(outdir, "stats.txt"), stats, keep_stats)
+    all_stats, stat_lines = read_stats_file(os.path.join(outdir, "stats.txt"), stats)
+    if not checkpoints or len(checkpoints) == 1:
+        telemetry = with_host_stats(telemetry, all_stats)
+    intervals = read_intervals(os.path.join(outdir, INTERVALS_FILE))
+
+    return {
+        "point": point,
+        "header": header,
+        "outdir": outdir,
+        "returncode": returncode,
+        "output": output,
+        "stats": all_stats,
+        "stat_lines": stat_lines,
+        "block": format_block(header, output, stat_lines),
+        "telemetry": telemetry,
+        "intervals": intervals,
+    }
+
+
+def run_group(points, headers, stats, gem5, script, binary, outroot, checkpoints=None, workload=None,
+              keep_stats=None):
+    """
+    Runs several points in one gem5 process (see sweep/multi.py) and returns
+    their results as run_point does, each with its share of the telemetry.
+    A single point, or a group whose process failed, is run with run_point
+    one point per process.
+    """
+    if len(points) == 1:
+        return [run_point(points[0], headers[0], stats, gem5, script, binary, outroot, checkpoints, workload,
+                          keep_stats)]
+    group_dir = os.path.join(outroot, "group-" + point_name(points[0]))
+    os.makedirs(group_dir, exist_ok=True)
+    configs = os.path.join(group_dir, CONFIGS_FILE)
+    write_configs(configs, points)
+    options = {**(workload or {}), "predictorConfigs": configs}
+    returncode, output, telemetry = call_gem5(build_command(gem5, script, binary, group_dir, options), group_dir)
+    if returncode != 0:
+        return [run_point(point, header, stats, gem5, script, binary, outroot, None, workload, keep_stats)
+                for point, header in zip(points, headers)]
+
+    outdirs = [os.path.join(outroot, point_name(point)) for point in points]
+    split_stats_file(os.path.join(group_dir, "stats.txt"), outdirs)
+    telemetry = point_telemetry(with_host_stats(telemetry, read_stats_file(os.path.join(group_dir, "stats.txt"))[0]),
+                                len(points))
+    results = []
+    for point, header, outdir in zip(points, headers, outdirs):
+        if keep_stats is not None:
+            prune_stats_file(os.path.join(outdir, "stats.txt"), stats, keep_stats)
+        all_stats, stat_lines = read_stats_file(os.path.join(outdir, "stats.txt"), stats)
+        results.append({
+            "point": point,
+            "header": header,
+            "outdir": outdir,
+            "returncode": returncode,
+            "output": output,
+            "stats": all_stats,
+            "stat_lines": stat_lines,
+            "block": format_block(header, output, stat_lines),
+            "telemetry": telemetry,
+            "intervals": None,
+        })
+    return results
+
+
+def run_identity(checkpoints=None, workload=None):
+    """
+    What decides a point's results besides its options: the checkpoints it
+    restores and the workload options, with the graph identified by its
+    contents (see sweep.checkpoint.checkpoint_id, sweep.graph.workload_id).
+    Empty for the default workload simulated from tick 0.
+    """
+    identity = {"checkpoint": checkpoint_id(checkpoints)} if checkpoints else {}
+    if workload:
+        identity.update(workload_id(workload))
+    return identity
+
+
+def cached_result(entry, point, header, stats, cache):
+    """
+    Rebuilds a runner result from a cache entry. The stat lines are collected
+    again from the cached stats.txt, so a sweep asking for different stats
+    than the one that filled the cache still gets them.
+    """
+    all_stats, stat_lines = read_stats_file(os.path.join(cache.entry_dir(entry["key"]), "stats.txt"), stats)
+    return {
+        "point": point,
+        "header": header,
+        "outdir": entry["outdir"],
+        "returncode": entry["returncode"],
+        "output": entry["output"],
+        "stats": all_stats,
+        "stat_lines": stat_lines,
+        "block": format_block(header, entry["output"], stat_lines),
+        "telemetry": entry.get("telemetry", {}),
+        "intervals": entry.get("intervals"),
+        "cached": True,
+    }
+
+
+def run_sweep(points, header_fmt, stats, gem5=GEM5, script=SCRIPT, binary=BINARY,
+              outroot="sweep_out", logfile="log.txt", jobs=None, cache=None,
+              results_file=RESULTS_FILE, clear_log=True, checkpoints=None, store_file=STORE_FILE,
+              model=None, mem_budget=None, workload=None, keep_stats=None, per_process=1, fail_fast=None,
+              longest_first=True):
+    """
+    Runs every point with at most `jobs` concurrent gem5 processes and appends
+    each finished point to logfile as soon as it completes. Each worker thread
+    only waits on its gem5 child, so the pool bounds the number of gem5
+    processes, not Python work.
+
+    If cache (a ResultCache) is given, points already in it are written to
+    the log without running gem5, and every successful run is stored in it as
+    soon as it finishes.
+
+    Every point is also recorded in results_file with all of its stats
+    (points already recorded there are not appended again), and stored in the
+    results store store_file, both under the point's options and
+    run_identity(checkpoints, workload).
+
+    With clear_log=False the blocks are appended to an existing logfile, so
+    several batches (e.g. the rounds of sweep/search.py) share one log.
+
+    checkpoints (from sweep.checkpoint.find_checkpoints) makes every point
+    start from the checkpoints instead of from tick 0, and workload (see
+    run_point) adds the same ooo_core.py options to every point and
+    keep_stats (see run_point) limits the stats kept of every run.
+    per_process > 1 runs that many points in each gem5 process (see
+    run_group); it cannot be combined with checkpoints or the interval mode.
+
+    With a model (sweep.schedule.CostModel) the points are started
+    longest-first (in grid order with longest_first=False), and a point
+    only starts while the predicted RSS of the running points leaves room
+    for it in mem_budget (KiB); without a model or history every point
+    counts as sweep.schedule.DEFAULT_RSS_KB. The predicted and achieved
+    makespans are printed at the end.
+
+    With fail_fast (K, see sweep.preflight.FailFast) no further points are
+    started once K runs failed with the same error before any succeeded;
+    the running ones are still recorded.
+
+    Returns the list of per-point result dicts (see run_point), in completion
+    order.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if per_process > 1 and (checkpoints or "statsInterval" in (workload or {})):
+        raise ValueError("several points per gem5 process cannot restore checkpoints or use the interval mode")
+    script = os.path.abspath(script)
+    outroot = os.path.abspath(outroot)
+    os.makedirs(outroot, exist_ok=True)
+
+    # CLEAR LOG FILE (same as `echo "">log.txt` in the run scripts)
+    if clear_log:
+        clear_logfile(logfile)
+    log = open_log(logfile)
+
+    keys = SweepKeys(cache, gem5, script, binary) if cache else None
+    identity = run_identity(checkpoints, workload)
+    # the cache holds stats.txt as pruned by keep_stats
+    cached_as = {**identity, "keepStats": ",".join(sorted(keep_stats))} if keep_stats is not None else identity
+    writer = ResultsWriter(results_file) if results_file else None
+    store = ResultStore(store_file, script) if store_file else None
+    results = []
+    pending = []
+    for point in points:
+        header = header_fmt.format(**point)
+        key = keys.key({**point, **cached_as}) if keys else None
+        entry = cache.get(key) if key else None
+        if entry is not None:
+            result = cached_result(entry, point, header, stats, cache)
+            result["workload"] = identity
+            record_result(result, log, writer, store, len(results) + 1, len(points))
+            results.append(result)
+        else:
+            pending.append((point, header, key))
+
+    predicted = expected = fifo = None
+    order = range(len(pending))
+    if model is not None and pending:
+        order, predicted, expected, fifo = plan([p for p, _, _ in pending], model, jobs, mem_budget,
+                                                script_defaults(script))
+        if not longest_first:
+            order = range(len(pending))
+    if predicted:
+        rss = [r for _, r in predicted]
+    else:
+        rss = [DEFAULT_RSS_KB if mem_budget is not None else 0] * len(pending)
+        if mem_budget is not None and pending:
+            print(f"No telemetry history: every point counts as {DEFAULT_RSS_KB / 1024 / 1024:g} GiB "
+                  f"against the memory budget")
+    pending = [pending[i] + (rss[i],) for i in order]
+    # points sharing a gem5 process are neighbours in start order, so of similar cost
+    pending = [([p for p, _, _, _ in group], [h for _, h, _, _ in group], [k for _, _, k, _ in group],
+                sum(r for _, _, _, r in group))
+               for group in (pending[i:i + per_process] for i in range(0, len(pending), per_process))]
+
+    failing = FailFast(fail_fast) if fail_fast else None
+    aborted = None
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        running = {}
+        used = 0
+        while pending or running:
+            while pending and len(running) < jobs:
+                fits = next((i for i, item in enumerate(pending)
+                             if mem_budget is None or not running or used + item[3] <= mem_budget), None)
+                if fits is None:
+                    break
+                group, headers, group_keys, rss = pending.pop(fits)
+                future = pool.submit(run_group, group, headers, stats, gem5, script, binary, outroot, checkpoints,
+                                     workload, keep_stats)
+                running[future] = (group_keys, rss)
+                used += rss
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                group_keys, rss = running.pop(future)
+                used -= rss
+                for key, result in zip(group_keys, future.result()):
+                    result["workload"] = identity
+                    if key and result["returncode"] == 0:
+                        cache.put(key, result, keys.meta, os.path.join(result["outdir"], "stats.txt"))
+                    record_result(result, log, writer, store, len(results) + 1, len(points))
+                    results.append(result)
+                    if failing and not aborted:
+                        aborted = failing.add(result)
+            if aborted and pending:
+                print(f"Aborting: {failing.k} runs failed with \"{aborted}\" and none succeeded; "
+                      f"{sum(len(group) for group, _, _, _ in pending)} points not started")
+                pending = []
+    if expected is not None and longest_first:
+        print(f"Makespan: predicted {expected:.1f} s longest-first ({fifo:.1f} s in grid order), "
+              f"achieved {time.monotonic() - start:.1f} s")
+    elif expected is not None:
+        print(f"Makespan: predicted {fifo:.1f} s in grid order, achieved {time.monotonic() - start:.1f} s")
+    log.close()
+    if store:
+        store.close()
+    return results
+
+
+def record_result(result, log, writer, store, done, total):
+    """
+    Appends a finished point to the log (a sweep.logstore.open_log writer),
+    the results file and the results store and reports progress.
+    """
+    log.write(result["block"])
+    if writer:
+        writer.add(result, overwrite=not result.get("cached"))
+    if store:
+        store.add_result(result, log.path)
+        store.commit()
+    if result.get("cached"):
+        status = "cached"
+    else:
+        status = "ok" if result["returncode"] == 0 else f"exit {result['returncode']}"
+        telemetry = result.get("telemetry", {})
+        if "wall_seconds" in telemetry:
+            status += f", {telemetry['wall_seconds']:.1f} s, {telemetry['max_rss_kb'] / 1024:.0f} MiB"
+        intervals = result.get("intervals")
+        if intervals:
+            state = "converged" if intervals["converged"] else "not converged"
+            status += f", {state} after {intervals['intervals']} intervals"
+    print(f"[{done}/{total}] {result['header']} ({status})")
+
+
+def add_sweep_arguments(parser):
+    """
+    Options selecting the points of a sweep (see sweep_points).
+    """
+    parser.add_argument("sweep", choices=sorted(grids.SWEEPS) + ["custom"],
+                        help="named sweep, or 'custom' to build the grid from --param")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=V1,V2,...",
+                        help="grid axis for ooo_core.py; repeat for more axes. "
+                             "For named sweeps, fixes/overrides that option on every point")
+    parser.add_argument("--stat", action="append", default=None,
+                        help="stat to copy from stats.txt into the log (repeatable)")
+    parser.add_argument("--max-bytes", type=float, default=None,
+                        help="skip points whose predictor / BTB / RAS storage exceeds this (see sweep/cost.py)")
+
+
+def sweep_points(args):
+    """
+    Returns (points, header format, stats) of the sweep chosen by the
+    add_sweep_arguments options (and args.script).
+    """
+    extra = grids.parse_param_args(args.param)
+    if args.sweep == "custom":
+        if not extra:
+            raise ValueError("custom sweeps need at least one --param")
+        points = grids.expand_grid(extra)
+        header_fmt, stats = None, grids.DIRECT_COND_STATS
+    else:
+        points_fn, header_fmt, stats = grids.SWEEPS[args.sweep]
+        points = points_fn()
+        if extra:
+            points = [{**p, **q} for p in points for q in grids.expand_grid(extra)]
+    if args.stat:
+        stats = args.stat
+    if args.max_bytes is not None:
+        total = len(points)
+        points = cost.within_budget(points, args.max_bytes, script_defaults(args.script))
+        print(f"{total - len(points)} of {total} points over {args.max_bytes:g} bytes skipped")
+
+    if header_fmt is None and points:
+        # custom grids get a generic header listing every option
+        header_fmt = grids.generic_header({k: "{" + k + "}" for k in points[0]})
+    return points, header_fmt, stats
+
+
+def add_run_arguments(parser):
+    """
+    Options of how every point of a sweep runs: its checkpoint, workload,
+    interval mode and batch mode (see run_options).
+    """
+    parser.add_argument("--checkpoint", default=None,
+                        help="restore this checkpoint (or directory of SimPoint checkpoints) for every point")
+    parser.add_argument("--max-insts", type=int, default=0,
+                        help="instructions to simulate after restoring --checkpoint. Default: to the end")
+    parser.add_argument("--batch", action="store_true",
+                        help="lean gem5 runs: no GDB listener or config dumps, DRAM sized to --mem-size, "
+                             "only the branch-predictor, sim* and host* stats kept")
+    parser.add_argument("--mem-size", default=None, help="simulated memory size, e.g. 128MiB. Default: 512MiB")
+    parser.add_argument("--keep-stat", action="append", default=None, metavar="PREFIX",
+                        help="keep only the stats starting with PREFIX in stats.txt (repeatable). "
+                             f"Default with --batch: {' '.join(BATCH_STATS)}")
+    add_workload_arguments(parser)
+    add_interval_arguments(parser)
+
+
+def run_options(args):
+    """
+    Returns (workload, checkpoints, keep_stats) for run_sweep / run_point
+    from the add_run_arguments options. Raises OSError, ValueError or
+    RuntimeError for a graph or checkpoint that cannot be used.
+    """
+    workload = {**workload_from_args(args),
+                **interval_options(args.interval, args.converge, args.tolerance, args.min_intervals)}
+    if args.batch:
+        workload["batch"] = 1
+    if args.mem_size:
+        workload["memSize"] = args.mem_size
+    checkpoints = find_checkpoints(args.checkpoint, args.max_insts) if args.checkpoint else None
+    return workload, checkpoints, args.keep_stat or (BATCH_STATS if args.batch else None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run an ooo_core.py parameter sweep in parallel.")
+    add_sweep_arguments(parser)
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="maximum concurrent gem5 processes (default: number of CPUs)")
+    parser.add_argument("--gem5", default=GEM5, help=f"gem5 executable. Default: {GEM5}")
+    parser.add_argument("--script", default=SCRIPT, help="gem5 config script. Default: old/ooo_core.py")
+    parser.add_argument("--binary", default=BINARY, help=f"workload binary. Default: {BINARY}")
+    parser.add_argument("--outdir", default="sweep_out", help="root of the per-point gem5 output directories")
+    parser.add_argument("--log", default="log.txt",
+                        help="log file read by the extract_* scripts (*.runs: compressed, see sweep/logstore.py)")
+    parser.add_argument("--results", default=RESULTS_FILE,
+                        help=f"structured results file (all stats of every run). Default: {RESULTS_FILE}")
+    parser.add_argument("--store", default=STORE_FILE,
+                        help=f"SQLite results store (see sweep/store.py); '' to disable. Default: {STORE_FILE}")
+    parser.add_argument("--cache", default=CACHE_DIR, help=f"result cache directory. Default: {CACHE_DIR}")
+    parser.add_argument("--no-cache", action="store_true", help="always simulate, never read or fill the cache")
+    parser.add_argument("--schedule", choices=["longest-first", "fifo"], default="longest-first",
+                        help="start order of the points (see sweep/schedule.py). Default: longest-first")
+    parser.add_argument("--history", action="append", default=None,
+                        help="results file or store whose telemetry predicts the cost of the points "
+                             "(repeatable). Default: --results")
+    parser.add_argument("--mem-budget", type=float, default=None,
+                        help="GiB of host memory the concurrently running gem5 processes may use (predicted "
+                             f"from --history, else {DEFAULT_RSS_KB / 1024 / 1024:g} GiB per point)")
+    parser.add_argument("--per-process", type=int, default=1, metavar="K",
+                        help="simulate K points in each gem5 process, one System each (see sweep/multi.py). "
+                             "Default: 1")
+    parser.add_argument("--fail-fast", type=int, default=FAIL_FAST, metavar="K",
+                        help="stop starting points once K runs failed with the same error and none succeeded; "
+                             f"0 never stops. Default: {FAIL_FAST}")
+    parser.add_argument("--no-preflight", action="store_true",
+                        help="skip the environment checks and keep points gem5 would refuse (see sweep/preflight.py)")
+    add_run_arguments(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        points, header_fmt, stats = sweep_points(args)
+        workload, checkpoints, keep_stats = run_options(args)
+        if args.per_process > 1 and (args.checkpoint or args.interval):
+            raise ValueError("--per-process cannot be combined with --checkpoint or --interval")
+    except (OSError, ValueError, RuntimeError) as e:
+        parser.error(str(e))
+    if not args.no_preflight:
+        problems = check_environment(args.gem5, args.script, args.binary)
+        if problems:
+            print("\n".join(problems), file=sys.stderr)
+            print("Not starting the sweep (--no-preflight skips these checks)", file=sys.stderr)
+            return 1
+        total = len(points)
+        points, rejected = valid_points(points, script_defaults(args.script))
+        report_rejected(rejected, total)
+    if not points:
+        return 0
+
+    model = None
+    if args.schedule == "longest-first" or args.mem_budget:
+        history = [p for p in (args.history or [args.results]) if p and os.path.exists(p)]
+        model = CostModel([run for path in history for run in load_runs(path)])
+
+    results = run_sweep(points, header_fmt, stats, gem5=args.gem5, script=args.script,
+                        binary=args.binary, outroot=args.outdir, logfile=args.log,
+                        jobs=args.jobs, cache=None if args.no_cache else ResultCache(args.cache),
+                        results_file=args.results, store_file=args.store,
+                        checkpoints=checkpoints,
+                        model=model, mem_budget=args.mem_budget * 1024 * 1024 if args.mem_budget else None,
+                        workload=workload, keep_stats=keep_stats,
+                        per_process=args.per_process, fail_fast=args.fail_fast,
+                        longest_first=args.schedule == "longest-first")
+    failed = sum(1 for r in results if r["returncode"] != 0)
+    print(f"{len(results)} runs, {failed} failed. Log written to {args.log}")
+    report_failures(results)
+    return 1 if failed == len(results) and results else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Cost-aware ordering of sweep points.
+
+Runtimes within a sweep differ by orders of magnitude: BTB points with
+associativity > numEntries abort in milliseconds, big tables with wide
+counters run for minutes. Started in grid order, the long points end up at
+the tail and leave most workers idle. The runner therefore
+
+  1. predicts the wall time and peak RSS of every point from the telemetry
+     of past runs (sweep/telemetry.py): the run of the same configuration if
+     there is one, else the mean of the K nearest configurations, with
+     sizes compared on a log2 scale;
+  2. starts the points longest-first (LPT scheduling), and
+  3. only starts a point when the predicted RSS of everything running plus
+     the point fits the host's memory budget (--mem-budget).
+
+It prints the makespan predicted for this schedule and for grid (FIFO)
+order, and the makespan achieved, to show whether the ordering pays off.
+Without history, points are ordered by their storage size (sweep/cost.py),
+which grows with the simulation time, and the memory budget counts every
+point as DEFAULT_RSS_KB, a conservative peak RSS for one ooo_core.py run.
+
+    python -m sweep.schedule local --history results.jsonl --jobs 32
+"""
+
+import argparse
+import heapq
+import math
+import sys
+
+import numpy as np
+
+from sweep import cost
+from sweep.results import params_key
+
+K = 3
+# peak RSS assumed for a point without telemetry history (KiB)
+DEFAULT_RSS_KB = 2 * 1024 * 1024
+
+
+def log_value(value):
+    """
+    log2 of a positive number, None for anything else.
+    """
+    if isinstance(value, bool):
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return math.log2(value) if value > 0 else None
+
+
+class CostModel:
+    """
+    Predicts wall seconds and peak RSS (KiB) of points from past runs
+    [(params, telemetry)] (telemetry.load_runs).
+    """
+
+    def __init__(self, runs, k=K):
+        self.k = k
+        self.exact = {}
+        for params, telemetry in runs:
+            if "wall_seconds" in telemetry:
+                self.exact.setdefault(params_key(params), []).append(telemetry)
+        self.runs = [(params, t) for params, t in runs if "wall_seconds" in t]
+        self.names = sorted({name for params, _ in self.runs for name in params})
+        self.numeric = np.array([[log_value(params.get(n)) if log_value(params.get(n)) is not None else np.nan
+                                  for n in self.names] for params, _ in self.runs],
+                                dtype=np.float64).reshape(len(self.runs), len(self.names))
+        self.seconds = np.array([t["wall_seconds"] for _, t in self.runs])
+        self.rss = np.array([t.get("max_rss_kb", 0) for _, t in self.runs])
+
+    def __bool__(self):
+        return bool(self.runs)
+
+    def predict(self, point):
+        """
+        (wall seconds, peak RSS KiB) predicted for point.
+        """
+        same = self.exact.get(params_key(point))
+        if same:
+            return (sum(t["wall_seconds"] for t in same) / len(same),
+                    max(t.get("max_rss_kb", 0) for t in same))
+        mine = np.array([log_value(point.get(n)) if log_value(point.get(n)) is not None else np.nan
+                         for n in self.names])
+        distance = np.abs(self.numeric - mine)
+        # parameters that are not numbers (or missing on one side) count 1 when they differ
+        mismatch = np.isnan(distance)
+        for j, name in enumerate(self.names):
+            if not mismatch[:, j].any():
+                continue
+            same_value = np.array([str(params.get(name)) == str(point.get(name)) for params, _ in self.runs])
+            distance[:, j] = np.where(mismatch[:, j], ~same_value, distance[:, j])
+        total = distance.sum(axis=1)
+        nearest = np.argsort(total, kind="stable")[:self.k]
+        weights = 1 / (1 + total[nearest])
+        return (float(np.average(self.seconds[nearest], weights=weights)), float(self.rss[nearest].max()))
+
+
+def proxy_cost(point, defaults=None):
+    """
+    Relative cost of a point without history: its storage in bytes.
+    """
+    structure = cost.structure_of(point)
+    columns = cost.point_columns([point], cost.PARAMS[structure], defaults)
+    return float(cost.storage_bytes(structure, columns)[0])
+
+
+def simulate(tasks, jobs, mem_budget=None):
+    """
+    Makespan of starting tasks [(seconds, rss)] in the given order on jobs
+    workers, a task waiting while the running ones leave no room for its
+    rss in mem_budget (the first running task always fits). Same policy as
+    sweep.runner's dispatcher.
+    """
+    running = []  # (finish time, rss)
+    now, used, pending = 0.0, 0.0, list(tasks)
+    while pending:
+        seconds, rss = next(((s, r) for s, r in pending
+                             if mem_budget is None or not running or used + r <= mem_budget), (None, None))
+        if seconds is not None and len(running) < jobs:
+            pending.remove((seconds, rss))
+            heapq.heappush(running, (now + seconds, rss))
+            used += rss
+            continue
+        now, rss_done = heapq.heappop(running)
+        used -= rss_done
+    return max([finish for finish, _ in running], default=now)
+
+
+def plan(points, model, jobs, mem_budget=None, defaults=None):
+    """
+    Orders points longest-first. Returns (indices of points in start order,
+    [(seconds, rss)] predicted per point or None without history, predicted
+    makespan of that order, predicted makespan of grid order).
+    """
+    if not model:
+        order = sorted(range(len(points)), key=lambda i: -proxy_cost(points[i], defaults))
+        return order, None, None, None
+    predicted = [model.predict(p) for p in points]
+    order = sorted(range(len(points)), key=lambda i: -predicted[i][0])
+    ordered = simulate([predicted[i] for i in order], jobs, mem_budget)
+    fifo = simulate(predicted, jobs, mem_budget)
+    return order, predicted, ordered, fifo
+
+
+def main(argv=None):
+    from sweep.cache import script_defaults
+    from sweep.results import RESULTS_FILE
+    from sweep.runner import SCRIPT, add_sweep_arguments, sweep_points
+    from sweep.telemetry import load_runs
+
+    parser = argparse.ArgumentParser(description="Predict the cost of a sweep and its longest-first schedule.")
+    add_sweep_arguments(parser)
+    parser.add_argument("--history", action="append", default=None,
+                        help=f"results file or store with telemetry (repeatable). Default: {RESULTS_FILE}")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="concurrent gem5 processes. Default: 1")
+    parser.add_argument("--mem-budget", type=float, default=None, help="host memory budget in GiB")
+    parser.add_argument("--script", default=SCRIPT, help="gem5 config script. Default: old/ooo_core.py")
+    parser.add_argument("--top", type=int, default=10, help="most expensive points to list. Default: 10")
+    args = parser.parse_args(argv)
+
+    points, header_fmt, _ = sweep_points(args)
+    model = CostModel([run for path in (args.history or [RESULTS_FILE]) for run in load_runs(path)])
+    budget = args.mem_budget * 1024 * 1024 if args.mem_budget else None
+    order, predicted, makespan, fifo = plan(points, model, args.jobs, budget, script_defaults(args.script))
+    if predicted is None:
+        print(f"no telemetry history; {len(points)} points ordered by storage size")
+        return 0
+    total = sum(s for s, _ in predicted)
+    print(f"{len(points)} points, {total:.0f} s of simulation predicted from {len(model.runs)} past runs")
+    print(f"makespan on {args.jobs} jobs: {makespan:.0f} s longest-first, {fifo:.0f} s in grid order")
+    for i in order[:args.top]:
+        seconds, rss = predicted[i]
+        print(f"  {seconds:>10.1f} s {rss / 1024:>8.0f} MiB  {header_fmt.format(**points[i])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,373 @@
+"""
+Adaptive search for the miss-rate / storage Pareto frontier of TournamentBP.
+
+run_tourney.sh ties choicePredictorSize, globalPredictorSize and
+localHistoryTableSize together and fixes every counter at 4 bits, and still
+needs 187 runs. This module explores all seven tournament options of
+ooo_core.py instead, spending runs only around the current frontier:
+
+  1. evaluate a small seed set spread over the storage range;
+  2. take the frontier of everything evaluated so far (lowest miss rate for
+     the storage, see pareto_front) and propose the neighbours of its points
+     that were not expanded yet, i.e. every point one step away along one
+     option (next power of two for sizes, +-1 bit for counters);
+  3. rank the proposals with a running model of how much each step changes
+     the miss rate, learnt from the parent/neighbour pairs evaluated so far,
+     and evaluate the most promising batch;
+  4. stop when the frontier has stabilised (the area under it, see
+     frontier_area, improved by less than --tolerance for --patience rounds
+     in a row), when no frontier point is left to expand, or when the run
+     budget is spent.
+
+Points are evaluated either by gem5 through the sweep runner (and its result
+cache) or, much faster, by replaying a branch trace (sweep/replay.py).
+
+    python -m sweep.search replay trace.npz --budget 400 --baseline grid
+    python -m sweep.search gem5 --jobs 32 --budget 300 --log tournamentBP/log_search.txt
+
+The frontier is written in the spreadsheet format read by extract_tourney.py.
+"""
+
+import argparse
+import math
+import random
+import sys
+
+from sweep import cost, grids
+from sweep.cache import CACHE_DIR, ResultCache
+from sweep.logparse import successful_runs
+from sweep.replay import (COMMITTED, MAX_CTR_BITS, MISPREDICTED, TOURNEY_COLUMNS, TOURNEY_PARAMS,
+                          conditional, load_trace, replay_tournament, tourney_storage_bytes, write_table)
+from sweep.results import RESULTS_FILE, params_key
+from sweep.runner import BINARY, GEM5, SCRIPT, run_sweep
+
+# values of every tournament option of ooo_core.py; counters wider than
+# MAX_CTR_BITS abort gem5 (sat_counter.hh)
+SPACE = {
+    "localPredictorSize": grids.powers_of_two(6, 16),
+    "localCtrBits": list(range(1, MAX_CTR_BITS + 1)),
+    "choicePredictorSize": grids.powers_of_two(0, 16),
+    "choiceCtrBits": list(range(1, MAX_CTR_BITS + 1)),
+    "globalPredictorSize": grids.powers_of_two(0, 16),
+    "globalCtrBits": list(range(1, MAX_CTR_BITS + 1)),
+    "localHistoryTableSize": grids.powers_of_two(0, 16),
+}
+
+
+def pareto_front(evaluated):
+    """
+    Keys of the non-dominated entries of {key: (storage bytes, miss rate)}:
+    sorted by storage, each one has a strictly lower miss rate than every
+    smaller configuration.
+    """
+    keys = list(evaluated)
+    values = [evaluated[k] for k in keys]
+    front = cost.pareto_front([v[0] for v in values], [v[1] for v in values])
+    return [keys[i] for i in front]
+
+
+def frontier_area(front, evaluated, lo, hi):
+    """
+    Area under the frontier's step curve of miss rate (%) against
+    log2(storage) between storage lo and hi, counting 100% below the
+    smallest frontier point. Smaller is better.
+    """
+    lo, hi = math.log2(lo), math.log2(hi)
+    area, x, rate = 0.0, lo, 100.0
+    for key in front:
+        size, next_rate = evaluated[key]
+        next_x = min(max(math.log2(size), lo), hi)
+        area += rate * (next_x - x)
+        x, rate = next_x, next_rate
+    return area + rate * (hi - x)
+
+
+def neighbours(point, space):
+    """
+    Yields (option, step, neighbour) for every point one value away from
+    point along one option of space.
+    """
+    for name, values in space.items():
+        i = values.index(point[name])
+        for step in (-1, 1):
+            if 0 <= i + step < len(values):
+                yield name, step, {**point, name: values[i + step]}
+
+
+def seed_points(space, count, rng):
+    """
+    The points with every size equal (clipped to the option's range) and
+    2-bit counters, which span the storage range, plus count random points.
+    """
+    points = []
+    for k in range(17):
+        point = {}
+        for name, values in space.items():
+            if name.endswith("CtrBits"):
+                point[name] = 2 if 2 in values else values[0]
+            else:
+                point[name] = min(values, key=lambda v: abs(math.log2(v) - k))
+        if point not in points:
+            points.append(point)
+    for _ in range(count):
+        points.append({name: rng.choice(values) for name, values in space.items()})
+    return points
+
+
+class StepModel:
+    """
+    Running mean of log(miss rate of neighbour / miss rate of parent) for
+    every (option, step) move, used to predict unevaluated neighbours.
+    """
+
+    def __init__(self):
+        self.sums = {}
+        self.counts = {}
+
+    def add(self, move, parent_rate, rate):
+        delta = math.log(max(rate, 1e-9) / max(parent_rate, 1e-9))
+        self.sums[move] = self.sums.get(move, 0.0) + delta
+        self.counts[move] = self.counts.get(move, 0) + 1
+
+    def predict(self, move, parent_rate):
+        if move not in self.counts:
+            return parent_rate
+        return parent_rate * math.exp(self.sums[move] / self.counts[move])
+
+
+def frontier_rate(front, evaluated, size):
+    """
+    Best miss rate of the frontier at or below size (inf below the frontier).
+    """
+    rate = math.inf
+    for key in front:
+        if evaluated[key][0] > size:
+            break
+        rate = evaluated[key][1]
+    return rate
+
+
+def search(evaluate, space=SPACE, initial=32, batch=32, budget=500, patience=3, tolerance=0.005,
+           seed=0, report=print):
+    """
+    Adaptive frontier search. evaluate(points) returns one (committed,
+    mispredicted) pair or None (failed run) per point. A round leaves the
+    frontier unchanged when it shrinks frontier_area by less than tolerance
+    (relative).
+
+    Returns (points, outcomes) where points maps a key to its point and
+    outcomes maps the key of every successful run to (committed, mispredicted).
+    """
+    rng = random.Random(seed)
+    points, outcomes, evaluated = {}, {}, {}
+    tried = set()
+
+    def run(batch_points):
+        batch_points = [p for p in batch_points if params_key(p) not in tried][:budget - len(tried)]
+        for point, outcome in zip(batch_points, evaluate(batch_points)):
+            key = params_key(point)
+            tried.add(key)
+            points[key] = point
+            if outcome is not None and outcome[0]:
+                outcomes[key] = outcome
+                evaluated[key] = (tourney_storage_bytes(point), outcome[1] / outcome[0] * 100)
+
+    run(seed_points(space, initial, rng))
+    model = StepModel()
+    expanded = set()
+    lo = tourney_storage_bytes({name: values[0] for name, values in space.items()})
+    hi = tourney_storage_bytes({name: values[-1] for name, values in space.items()})
+    front = pareto_front(evaluated)
+    area = frontier_area(front, evaluated, lo, hi)
+    stable = 0
+    rounds = 0
+
+    while len(tried) < budget and stable < patience:
+        proposals = []
+        for key in front:
+            if key in expanded:
+                continue
+            expanded.add(key)
+            parent_rate = evaluated[key][1]
+            for name, step, point in neighbours(points[key], space):
+                nkey = params_key(point)
+                if nkey in tried:
+                    if nkey in evaluated:
+                        model.add((name, step), parent_rate, evaluated[nkey][1])
+                    continue
+                size = tourney_storage_bytes(point)
+                predicted = model.predict((name, step), parent_rate)
+                # how far below the current frontier the model expects it to land
+                gain = math.log(frontier_rate(front, evaluated, size) / max(predicted, 1e-9)) \
+                    if frontier_rate(front, evaluated, size) < math.inf else math.inf
+                proposals.append((gain, -size, (name, step), key, point))
+        if not proposals:
+            report("Every frontier point has been expanded.")
+            break
+
+        proposals.sort(key=lambda p: p[:2], reverse=True)
+        chosen, seen = [], set()
+        for gain, _, move, parent, point in proposals:
+            key = params_key(point)
+            if key not in seen:
+                seen.add(key)
+                chosen.append((move, parent, point))
+            if len(chosen) == batch:
+                break
+        # parents whose proposals did not make it into the batch are expanded again later
+        for _, _, _, parent, point in proposals:
+            if params_key(point) not in seen:
+                expanded.discard(parent)
+
+        run([point for _, _, point in chosen])
+        for move, parent, point in chosen:
+            key = params_key(point)
+            if key in evaluated:
+                model.add(move, evaluated[parent][1], evaluated[key][1])
+
+        front = pareto_front(evaluated)
+        new_area = frontier_area(front, evaluated, lo, hi)
+        stable = stable + 1 if area - new_area < tolerance * area else 0
+        area = new_area
+        rounds += 1
+        report(f"round {rounds}: {len(tried)} runs, {len(front)} frontier points, "
+               f"area {area:.2f}{' (stable)' if stable else ''}")
+
+    return points, outcomes
+
+
+def frontier_rows(points, outcomes):
+    """
+    Frontier rows in the format of the spreadsheet read by extract_tourney.py.
+    """
+    evaluated = {k: (tourney_storage_bytes(points[k]), m / c * 100) for k, (c, m) in outcomes.items()}
+    rows = []
+    for key in pareto_front(evaluated):
+        committed, miss = outcomes[key]
+        rows.append([int(points[key][n]) for n in TOURNEY_PARAMS]
+                    + [committed, miss, evaluated[key][1], evaluated[key][0]])
+    return rows
+
+
+def coverage(rows, baseline_rows):
+    """
+    Fraction of the baseline frontier that the frontier rows match or beat
+    (some row at most as large with at most the same miss rate).
+    """
+    if not baseline_rows:
+        return 1.0
+    size, rate = TOURNEY_COLUMNS.index("Total Size (Bytes)"), TOURNEY_COLUMNS.index("MISS Rate")
+    covered = sum(1 for b in baseline_rows
+                  if any(r[size] <= b[size] and r[rate] <= b[rate] for r in rows))
+    return covered / len(baseline_rows)
+
+
+def replay_evaluator(trace):
+    pc, taken, kind = load_trace(trace)
+    committed = int(conditional(taken, kind).sum())
+
+    def evaluate(points):
+        return [None if miss is None else (committed, miss)
+                for miss in replay_tournament(pc, taken, points, kind)]
+    return evaluate
+
+
+def gem5_evaluator(args):
+    """
+    Runs each batch through the sweep runner; every run is appended to the
+    same log, so extract scripts and later searches can reuse it.
+    """
+    cache = None if args.no_cache else ResultCache(args.cache)
+    first = [True]
+
+    def evaluate(points):
+        results = run_sweep([{"predictor": "tournament", **p} for p in points], grids.TOURNEY_HEADER,
+                            grids.DIRECT_COND_STATS, gem5=args.gem5, script=args.script,
+                            binary=args.binary, outroot=args.outdir, logfile=args.log, jobs=args.jobs,
+                            cache=cache, results_file=args.results, clear_log=first[0])
+        first[0] = False
+        by_key = {}
+        for result in results:
+            stats = result["stats"]
+            if result["returncode"] == 0 and COMMITTED in stats and MISPREDICTED in stats:
+                point = {n: result["point"][n] for n in TOURNEY_PARAMS}
+                by_key[params_key(point)] = (stats[COMMITTED], stats[MISPREDICTED])
+        return [by_key.get(params_key(p)) for p in points]
+    return evaluate
+
+
+def baseline_rows(baseline, evaluate):
+    """
+    Frontier of the run_tourney.sh grid ("grid", evaluated like the search)
+    or of the successful tournament runs of a gem5 log.
+    """
+    if baseline == "grid":
+        grid = [{n: p[n] for n in TOURNEY_PARAMS} for p in grids.tourney_points()]
+        outcomes = dict(zip(range(len(grid)), evaluate(grid)))
+        points = dict(enumerate(grid))
+    else:
+        runs = [r for r in successful_runs(baseline, COMMITTED, MISPREDICTED)
+                if all(n in r.params for n in TOURNEY_PARAMS)]
+        points = {i: r.params for i, r in enumerate(runs)}
+        outcomes = {i: (r.stats[COMMITTED], r.stats[MISPREDICTED]) for i, r in enumerate(runs)}
+    outcomes = {k: v for k, v in outcomes.items() if v is not None and v[0]}
+    return frontier_rows(points, outcomes), len(points)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Adaptive Pareto-frontier search over TournamentBP options.")
+    sub = parser.add_subparsers(dest="mode", required=True)
+    p = sub.add_parser("replay", help="evaluate points by trace replay")
+    p.add_argument("trace")
+    p = sub.add_parser("gem5", help="evaluate points with gem5 through the sweep runner")
+    p.add_argument("--jobs", "-j", type=int, default=None, help="maximum concurrent gem5 processes")
+    p.add_argument("--gem5", default=GEM5, help=f"gem5 executable. Default: {GEM5}")
+    p.add_argument("--script", default=SCRIPT, help="gem5 config script. Default: old/ooo_core.py")
+    p.add_argument("--binary", default=BINARY, help=f"workload binary. Default: {BINARY}")
+    p.add_argument("--outdir", default="sweep_out", help="root of the per-point gem5 output directories")
+    p.add_argument("--log", default="log.txt", help="log of every run of the search")
+    p.add_argument("--results", default=RESULTS_FILE, help=f"structured results file. Default: {RESULTS_FILE}")
+    p.add_argument("--cache", default=CACHE_DIR, help=f"result cache directory. Default: {CACHE_DIR}")
+    p.add_argument("--no-cache", action="store_true", help="always simulate, never read or fill the cache")
+    for p in sub.choices.values():
+        p.add_argument("--param", action="append", default=[], metavar="NAME=V1,V2,...",
+                       help="restrict an option to these values (default: all of SPACE)")
+        p.add_argument("--budget", type=int, default=500, help="maximum number of runs. Default: 500")
+        p.add_argument("--initial", type=int, default=32, help="random seed points. Default: 32")
+        p.add_argument("--batch", type=int, default=32, help="runs per round. Default: 32")
+        p.add_argument("--patience", type=int, default=3,
+                       help="stop after this many rounds without a frontier change. Default: 3")
+        p.add_argument("--tolerance", type=float, default=0.005,
+                       help="relative frontier area improvement that counts as a change. Default: 0.005")
+        p.add_argument("--seed", type=int, default=0, help="random seed. Default: 0")
+        p.add_argument("--baseline", default=None, metavar="grid|LOG",
+                       help="compare with the run_tourney.sh grid or with the runs of a gem5 log")
+        p.add_argument("--out", default="tourney_frontier.csv", help="CSV table of the frontier")
+    args = parser.parse_args(argv)
+
+    space = dict(SPACE)
+    for name, values in grids.parse_param_args(args.param).items():
+        if name not in space:
+            parser.error(f"unknown tournament option '{name}'")
+        space[name] = sorted(values)
+
+    evaluate = replay_evaluator(args.trace) if args.mode == "replay" else gem5_evaluator(args)
+    points, outcomes = search(evaluate, space, initial=args.initial, batch=args.batch,
+                              budget=args.budget, patience=args.patience, tolerance=args.tolerance,
+                              seed=args.seed)
+    rows = frontier_rows(points, outcomes)
+    write_table(args.out, TOURNEY_COLUMNS, rows)
+    total = math.prod(len(values) for values in space.values())
+    print(f"{len(points)} runs ({len(points) / total * 100:.4f}% of the {total} points), "
+          f"{len(rows)} frontier points. Data stored in {args.out}")
+
+    if args.baseline:
+        base, runs = baseline_rows(args.baseline, evaluate)
+        print(f"Baseline: {runs} runs, {len(base)} frontier points; "
+              f"search frontier matches or beats {coverage(rows, base) * 100:.1f}% of them "
+              f"with {len(points) / max(runs, 1) * 100:.1f}% of the runs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
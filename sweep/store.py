@@ -0,0 +1,374 @@
+"""
+Local results store (SQLite).
+
+One row per run in the runs table, with one column per ooo_core.py option
+(every option, defaults filled in, so runs from different sweeps line up)
+and an index on every option column. All stats of the run are kept in the
+stats table as (run, name, value). The workload a run simulated is part of
+its identity: the workload options of sweep.runner.run_identity fill their
+option columns (graph holding the graph's digest) and the checkpoint column
+identifies the restored checkpoints, so a --graph, --checkpoint or
+--interval run of a configuration is a row of its own. The runner writes
+every finished point here (--store, default results.db), and earlier data
+is imported from results.jsonl files, logs and the old spreadsheets:
+
+    python -m sweep.store import results.jsonl
+    python -m sweep.store import localBP/log_local_bfs.txt --sweep local
+    python -m sweep.store import-sheet tournamentBP/salvaaa.xlsx
+    python -m sweep.store query --where "localPredictorSize = globalPredictorSize" \\
+        --stat system.cpu.branchPred.mispredicted_0::DirectCond --order-by tourney_bytes
+    python -m sweep.store export tourney.xlsx --where "predictor = 'tournament'"
+
+Selections are SQL expressions over the option columns plus the derived
+columns in DERIVED (storage cost of the predictors); query() returns plain
+dicts, query_dataframe() a pandas DataFrame. Excel is only an export format.
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+
+from sweep import cost, grids
+from sweep.cache import script_defaults
+from sweep.converge import as_stats as convergence_stats
+from sweep.logparse import iter_runs
+from sweep.telemetry import as_stats
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(REPO_ROOT, "old", "ooo_core.py")
+STORE_FILE = "results.db"
+
+COMMITTED, MISPREDICTED = grids.DIRECT_COND_STATS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    header TEXT,
+    returncode INTEGER,
+    source TEXT
+);
+CREATE TABLE IF NOT EXISTS stats (
+    run INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value,
+    PRIMARY KEY (run, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS stats_name ON stats (name, value);
+"""
+
+# derived columns usable in where / order_by: bytes of storage of each
+# structure, computed in SQL from the formulas of sweep/cost.py
+DERIVED = {
+    "local_bytes": "local",
+    "tourney_bytes": "tournament",
+    "btb_bytes": "btb",
+    "ras_bytes": "ras",
+}
+
+# parameters of the logs of each sweep that the RUNNING headers do not name,
+# and header names that differ from the ooo_core.py option names
+LOG_SWEEPS = {
+    "local": ({"predictor": "local"}, {}),
+    "tourney": ({"predictor": "tournament"}, {}),
+    "btb": ({}, {"associativity": "btbAssociativity", "numEntries": "btbNumEntries"}),
+    "ras": ({}, {"numEntries": "rasNumEntries"}),
+}
+
+# stat columns of the spreadsheets written by hand from old sweeps
+SHEET_STATS = {"COMMITED": COMMITTED, "COMMITTED": COMMITTED, "MISS": MISPREDICTED}
+
+NAME_RE = re.compile(r"^[A-Za-z_]\w*$")
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def sql_bytes(structure):
+    """
+    SQL expression of the bytes of storage of structure (cost.SQL_BITS).
+    """
+    return f"({cost.SQL_BITS[structure]}) / 8.0"
+
+
+def sql_ceil_log2(n):
+    """
+    cost.ceil_log2 as an SQL function: NULL for a missing or non-positive size.
+    """
+    return None if n is None or int(n) <= 0 else int(cost.ceil_log2(int(n)))
+
+
+def run_key(config):
+    return json.dumps({k: str(v) for k, v in config.items()}, sort_keys=True)
+
+
+class ResultStore:
+    """
+    SQLite file of runs (one row each, one column per option) and their stats.
+    """
+
+    def __init__(self, path=STORE_FILE, script=SCRIPT):
+        self.path = path
+        self.defaults = script_defaults(script) if script and os.path.exists(script) else {}
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.create_function("ceil_log2", 1, sql_ceil_log2, deterministic=True)
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.executescript(SCHEMA)
+        self.params = [row["name"] for row in self.db.execute("PRAGMA table_info(runs)")
+                       if row["name"] not in ("id", "key", "header", "returncode", "source")]
+        for name in self.defaults:
+            self.add_param(name)
+        self.db.commit()
+
+    def add_param(self, name):
+        """
+        Adds an (indexed) option column, with the option's default for the
+        runs stored before it existed.
+        """
+        if name in self.params:
+            return
+        if not NAME_RE.match(name):
+            raise ValueError(f"invalid parameter name '{name}'")
+        self.db.execute(f"ALTER TABLE runs ADD COLUMN {quote(name)}")
+        if name in self.defaults:
+            self.db.execute(f"UPDATE runs SET {quote(name)} = ?", (self.defaults[name],))
+        self.db.execute(f"CREATE INDEX IF NOT EXISTS {quote('runs_' + name)} ON runs ({quote(name)})")
+        self.params.append(name)
+
+    def add(self, params, stats, header="", returncode=0, source="", workload=None):
+        """
+        Stores one run: params are the options given to ooo_core.py (the
+        others take their defaults), workload the identity of the input and
+        checkpoint it ran on (sweep.runner.run_identity). A run with the
+        same configuration and workload replaces the stored one. Returns the
+        run id. Call commit() to make the runs added so far durable.
+        """
+        config = {**self.defaults, **params, **(workload or {})}
+        for name in config:
+            self.add_param(name)
+        key = run_key(config)
+        names = ["key", "header", "returncode", "source"] + list(config)
+        values = [key, header, returncode, source] + list(config.values())
+        updates = ", ".join(f"{quote(n)} = excluded.{quote(n)}" for n in names[1:])
+        self.db.execute(f"INSERT INTO runs ({', '.join(quote(n) for n in names)}) "
+                        f"VALUES ({', '.join('?' * len(names))}) ON CONFLICT (key) DO UPDATE SET {updates}",
+                        values)
+        run = self.db.execute("SELECT id FROM runs WHERE key = ?", (key,)).fetchone()["id"]
+        self.db.execute("DELETE FROM stats WHERE run = ?", (run,))
+        self.db.executemany("INSERT INTO stats (run, name, value) VALUES (?, ?, ?)",
+                            ((run, name, value) for name, value in stats.items()))
+        return run
+
+    def add_result(self, result, source=""):
+        """
+        Stores a runner result dict (see sweep.runner.run_point), its
+        telemetry as telemetry.* stats and its convergence (interval mode)
+        as convergence.* stats.
+        """
+        stats = {**result.get("stats", {}), **as_stats(result.get("telemetry", {})),
+                 **convergence_stats(result.get("intervals"))}
+        return self.add(result["point"], stats, result["header"], result["returncode"], source,
+                        result.get("workload"))
+
+    def commit(self):
+        self.db.commit()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stat_names(self):
+        return [row[0] for row in self.db.execute("SELECT DISTINCT name FROM stats ORDER BY name")]
+
+    def query(self, where=None, args=(), stats=(), order_by=None, limit=None, failed=False):
+        """
+        Returns one dict per matching run with its options, header,
+        returncode, the derived columns and the requested stats (a list of
+        names, or {column: stat name}); missing stats are None.
+
+        where and order_by are SQL over the option and derived columns and
+        the stat columns, e.g.
+            store.query("localPredictorSize = globalPredictorSize", stats=[COMMITTED],
+                        order_by="tourney_bytes")
+        with ? placeholders bound to args. Failed runs are left out unless
+        failed is True.
+        """
+        if not isinstance(stats, dict):
+            stats = {name: name for name in stats}
+        derived = ", ".join(f"{sql_bytes(s)} AS {name}" for name, s in DERIVED.items()
+                            if all(p in self.params for p in cost.PARAMS[s]))
+        joins, columns, binds = [], [], []
+        for i, (column, name) in enumerate(stats.items()):
+            joins.append(f"LEFT JOIN stats s{i} ON s{i}.run = runs.id AND s{i}.name = ?")
+            columns.append(f"s{i}.value AS {quote(column)}")
+            binds.append(name)
+        conditions = [] if failed else ["runs.returncode = 0"]
+        if where:
+            conditions.append(f"({where})")
+        sql = (f"SELECT * FROM (SELECT runs.*{', ' + derived if derived else ''}"
+               f"{''.join(', ' + c for c in columns)} FROM runs {' '.join(joins)}) AS runs")
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        if order_by:
+            sql += f" ORDER BY {order_by}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [{k: row[k] for k in row.keys() if k != "key"}
+                for row in self.db.execute(sql, binds + list(args))]
+
+    def query_dataframe(self, *args, **kwargs):
+        """
+        Same as query, as a pandas DataFrame.
+        """
+        import pandas as pd
+        return pd.DataFrame(self.query(*args, **kwargs))
+
+    def import_results(self, path):
+        """
+        Stores the records of a results.jsonl file (sweep/results.py).
+        """
+        from sweep.results import read_records
+        count = 0
+        for record in read_records(path):
+            stats = {**record["stats"], **as_stats(record.get("telemetry", {})),
+                     **convergence_stats(record.get("intervals"))}
+            self.add(record["params"], stats, record["header"], record["returncode"], path, record.get("workload"))
+            count += 1
+        self.commit()
+        return count
+
+    def import_log(self, path, fixed=None, rename=None):
+        """
+        Stores the runs of a log (text, .gz or .runs). fixed holds options the
+        headers do not name (e.g. predictor=local), rename maps header names
+        to option names.
+        """
+        fixed, rename = fixed or {}, rename or {}
+        count = 0
+        for run in iter_runs(path):
+            params = {**fixed, **{rename.get(k, k): v for k, v in run.params.items()}}
+            self.add(params, run.stats, run.header, 1 if run.failed else 0, path)
+            count += 1
+        self.commit()
+        return count
+
+    def import_sheet(self, path, sheet="Sheet1", fixed=None):
+        """
+        Stores the rows of a spreadsheet with one column per option and the
+        committed / mispredicted counts (see SHEET_STATS). Columns that are
+        neither (e.g. a hand-computed miss rate) are dropped.
+        """
+        import pandas as pd
+        df = pd.read_excel(path, sheet_name=sheet, header=0).dropna(how="all")
+        params = [c for c in df.columns if c in self.defaults]
+        count = 0
+        for _, row in df.iterrows():
+            if any(pd.isna(row[c]) for c in params):
+                continue
+            point = {**(fixed or {}), **{c: int(row[c]) for c in params}}
+            stats = {SHEET_STATS[c]: int(row[c]) for c in df.columns
+                     if c in SHEET_STATS and not pd.isna(row[c])}
+            self.add(point, stats, "", 0, path)
+            count += 1
+        self.commit()
+        return count
+
+
+def export(rows, path):
+    """
+    Writes query rows to .csv, or to .xlsx with pandas.
+    """
+    if path.endswith(".xlsx"):
+        import pandas as pd
+        pd.DataFrame(rows).to_excel(path, index=False)
+        return
+    import csv
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else [])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def parse_assignments(items):
+    values = {}
+    for item in items:
+        name, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"expected NAME=VALUE, got '{item}'")
+        values[name] = int(value) if value.lstrip("-").isdigit() else value
+    return values
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local SQLite store of sweep results.")
+    parser.add_argument("--store", default=STORE_FILE, help=f"store file. Default: {STORE_FILE}")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("import", help="store the runs of results.jsonl files or logs")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("--sweep", choices=sorted(LOG_SWEEPS), default=None,
+                   help="sweep the logs come from (fills in the options their headers leave out)")
+    p.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                   help="option value of every imported log run")
+    p = sub.add_parser("import-sheet", help="store the rows of a spreadsheet")
+    p.add_argument("path")
+    p.add_argument("--sheet", default="Sheet1", help="sheet name. Default: Sheet1")
+    p.add_argument("--set", action="append", default=["predictor=tournament"], metavar="NAME=VALUE",
+                   help="option value of every row. Default: predictor=tournament")
+    for name in ("query", "export"):
+        p = sub.add_parser(name, help="print the selected runs" if name == "query" else "write them to .csv/.xlsx")
+        if name == "export":
+            p.add_argument("out")
+        p.add_argument("--where", default=None, help="SQL condition on the option / derived columns")
+        p.add_argument("--stat", action="append", default=[], help="stat column (repeatable)")
+        p.add_argument("--order-by", default=None, help="SQL ordering, e.g. tourney_bytes")
+        p.add_argument("--limit", type=int, default=None)
+        p.add_argument("--failed", action="store_true", help="include failed runs")
+        p.add_argument("--columns", default=None, help="comma separated columns to print")
+    sub.add_parser("stats", help="list the stored stat names")
+    args = parser.parse_args(argv)
+
+    with ResultStore(args.store) as store:
+        if args.command == "import":
+            fixed, rename = LOG_SWEEPS.get(args.sweep, ({}, {}))
+            fixed = {**fixed, **parse_assignments(args.set)}
+            for path in args.paths:
+                if path.endswith(".jsonl"):
+                    count = store.import_results(path)
+                else:
+                    count = store.import_log(path, fixed, rename)
+                print(f"{path}: {count} runs")
+        elif args.command == "import-sheet":
+            count = store.import_sheet(args.path, args.sheet, parse_assignments(args.set))
+            print(f"{args.path}: {count} rows")
+        elif args.command == "stats":
+            print("\n".join(store.stat_names()))
+        else:
+            rows = store.query(args.where, stats=args.stat, order_by=args.order_by, limit=args.limit,
+                               failed=args.failed)
+            if args.columns:
+                names = args.columns.split(",")
+                rows = [{n: row.get(n) for n in names} for row in rows]
+            if args.command == "export":
+                export(rows, args.out)
+                print(f"{len(rows)} runs written to {args.out}")
+            elif rows:
+                names = list(rows[0])
+                print("\t".join(names))
+                for row in rows:
+                    print("\t".join("" if row[n] is None else str(row[n]) for n in names))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
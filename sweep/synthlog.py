@@ -0,0 +1,218 @@
+"""
+Synthetic sweep logs of any size.
+
+Writes gem5 run blocks in the format of the checked-in logs (separator,
+RUNNING header, gem5 banner and warnings, workload output, stat lines,
+blank line) for the points of a sweep, repeating the grid until the log has
+the requested size. Stats are plausible for the point (miss rate falls with
+the predictor size, the BTB hit ratio grows with its entries, ...), and a
+fraction of the runs crashes with gem5's assertion message and a libc
+backtrace, like the BTB points with associativity > numEntries do:
+
+    python -m sweep.synthlog btb /tmp/btb_1g.txt --size 1G --crash-rate 0.1
+    python -m sweep.synthlog local /tmp/local.txt --size 200M --trials 64
+
+The output is deterministic for a given seed, so benchmarks (see
+sweep/bench.py) can regenerate the same input.
+"""
+
+import argparse
+import math
+import random
+import sys
+
+from sweep import grids
+
+SEPARATOR = "#" * 65
+
+BANNER = """\
+Global frequency set at 1000000000000 ticks per second
+src/mem/dram_interface.cc:690: warn: DRAM device capacity (8192 Mbytes) does not match the address range assigned (128 Mbytes)
+src/arch/riscv/isa.cc:279: info: RVV enabled, VLEN = 256 bits, ELEN = 64 bits
+src/base/statistics.hh:279: warn: One of the stats is a legacy stat. Legacy stat is a stat that does not belong to any statistics::Group. Legacy stat is deprecated.
+system.remote_gdb: Listening for connections on port {port}
+gem5 Simulator System.  https://www.gem5.org
+gem5 is copyrighted software; use the --copyright option for details.
+
+gem5 version 24.1.0.2
+gem5 compiled Mar 17 2025 10:51:38
+gem5 started Mar 23 2025 {clock}
+gem5 executing on DESKTOP-64ACR4L, pid {pid}
+command line: /home/teravyte/gem5/build/RISCV/gem5.opt ooo_core.py {options} /home/teravyte/gapbs/rv64_bfs
+
+Beginning simulation!
+src/sim/simulate.cc:199: info: Entering event queue @ 0.  Starting simulation...
+src/sim/syscall_emul.cc:97: warn: ignoring syscall set_robust_list(...)
+      (further warnings will be suppressed)
+src/sim/syscall_emul.hh:1117: warn: readlink() called on '/proc/self/exe' may yield unexpected results in various settings.
+      Returning '/home/teravyte/gapbs/rv64_bfs'
+src/sim/mem_state.cc:448: info: Increasing stack size by one page.
+src/sim/syscall_emul.cc:86: warn: ignoring syscall mprotect(...)
+src/sim/mem_state.cc:448: info: Increasing stack size by one page.
+src/sim/mem_state.cc:448: info: Increasing stack size by one page.
+Generate Time:       {generate:.5f}
+Build Time:          {build:.5f}
+Graph has {nodes} nodes and {edges} undirected edges for degree: 10
+"""
+
+CRASH = """\
+Global frequency set at 1000000000000 ticks per second
+src/mem/dram_interface.cc:690: warn: DRAM device capacity (8192 Mbytes) does not match the address range assigned (128 Mbytes)
+gem5.opt: src/base/intmath.hh:61: constexpr std::enable_if_t<is_integral_v<T>, int> gem5::floorLog2(T) [with T = unsigned int; std::enable_if_t<is_integral_v<T>, int> = int]: Assertion `x > 0' failed.
+Program aborted at tick 0
+--- BEGIN LIBC BACKTRACE ---
+"""
+
+BACKTRACE = [
+    "/home/teravyte/gem5/build/RISCV/gem5.opt(_ZN4gem515print_backtraceEv+0x30)",
+    "/home/teravyte/gem5/build/RISCV/gem5.opt(_ZN4gem512abortHandlerEi+0x4c)",
+    "/lib/x86_64-linux-gnu/libc.so.6(+0x45330)",
+    "/lib/x86_64-linux-gnu/libc.so.6(pthread_kill+0x11c)",
+    "/lib/x86_64-linux-gnu/libc.so.6(gsignal+0x1e)",
+    "/lib/x86_64-linux-gnu/libc.so.6(abort+0xdf)",
+    "/lib/x86_64-linux-gnu/libc.so.6(+0x2881b)",
+    "/lib/x86_64-linux-gnu/libc.so.6(+0x3b517)",
+    "/home/teravyte/gem5/build/RISCV/gem5.opt(+0x17302e5)",
+    "/home/teravyte/gem5/build/RISCV/gem5.opt(_ZNK4gem523BTBSetAssociativeParams6createEv+0x330)",
+    "/home/teravyte/gem5/build/RISCV/gem5.opt(+0x173465e)",
+    "/home/teravyte/gem5/build/RISCV/gem5.opt(+0xe397ee)",
+    "/lib/x86_64-linux-gnu/libpython3.12.so.1.0(+0x1df488)",
+    "/lib/x86_64-linux-gnu/libpython3.12.so.1.0(_PyObject_MakeTpCall+0x8f)",
+    "/lib/x86_64-linux-gnu/libpython3.12.so.1.0(_PyEval_EvalFrameDefault+0x6b5)",
+    "/lib/x86_64-linux-gnu/libpython3.12.so.1.0(PyEval_EvalCode+0x15b)",
+    "/lib/x86_64-linux-gnu/libc.so.6(__libc_start_main+0x8b)",
+    "/home/teravyte/gem5/build/RISCV/gem5.opt(_start+0x25)",
+]
+
+COMMITTED, MISPREDICTED = grids.DIRECT_COND_STATS
+HIT_RATIO = grids.BTB_STATS[0]
+RAS_CORRECT, RAS_USED = grids.RAS_STATS
+
+# sweep -> (points function, header format, names of the header parameters
+# on the gem5 command line)
+SWEEPS = {
+    "local": (grids.local_points, grids.LOCAL_HEADER, {}),
+    "tourney": (grids.tourney_points, grids.TOURNEY_HEADER, {}),
+    "btb": (grids.btb_points, grids.BTB_HEADER, {"btbAssociativity": "associativity",
+                                                 "btbNumEntries": "numEntries"}),
+    "ras": (grids.ras_points, grids.RAS_HEADER, {"rasNumEntries": "numEntries"}),
+}
+
+
+def stat_line(name, value, description):
+    text = f"{value:.6f}" if isinstance(value, float) else str(value)
+    return f"{name:<40} {text:>12}                       # {description}\n"
+
+
+def stat_lines(sweep, point, rng):
+    """
+    Stat lines of a successful run of point, with values shaped like the
+    real sweeps'.
+    """
+    if sweep in ("local", "tourney"):
+        size = point["localPredictorSize"] + point.get("globalPredictorSize", 0)
+        committed = 1770620 + rng.randrange(20)
+        rate = 0.12 + 0.12 / math.log2(size + 2) + rng.uniform(0, 0.01)
+        return [stat_line(COMMITTED, committed, "Number of branches finally committed  (Count)"),
+                stat_line(MISPREDICTED, int(committed * rate),
+                          "Number of committed branches that were mispredicted. (Count)")]
+    if sweep == "btb":
+        ratio = min(0.99, 0.2 + 0.045 * math.log2(point["btbNumEntries"]) + rng.uniform(0, 0.01))
+        return [stat_line(HIT_RATIO, ratio, "BTB Hit Ratio (Ratio)")]
+    used = 32743 + rng.randrange(10)
+    correct = min(used, 24973 + 600 * int(math.log2(point["rasNumEntries"]) + 1))
+    return [stat_line(RAS_CORRECT, correct,
+                      "Number of times the RAS is the provider and the prediction is correct (Count)"),
+            stat_line(RAS_USED, used, "Number of times the RAS is the provider (Count)")]
+
+
+def crashes(sweep, point, rng, crash_rate):
+    if sweep == "btb" and point["btbAssociativity"] > point["btbNumEntries"]:
+        return True
+    return rng.random() < crash_rate
+
+
+def make_block(sweep, point, rng, crash_rate=0.0, trials=6):
+    """
+    Text of one run block.
+    """
+    _, header_fmt, option_names = SWEEPS[sweep]
+    lines = [SEPARATOR + "\n", header_fmt.format(**point) + "\n"]
+    if crashes(sweep, point, rng, crash_rate):
+        lines.append(CRASH)
+        base = rng.randrange(0x550000000000, 0x560000000000)
+        lines += [f"{frame}[{hex(base + i * 0x1f3a)}]\n" for i, frame in enumerate(BACKTRACE)]
+        lines.append("--- END LIBC BACKTRACE ---\n")
+        lines.append("For more info on how to address this issue, please visit "
+                     "https://www.gem5.org/documentation/general_docs/common-errors/ \n\n")
+        return "".join(lines)
+    options = " ".join(f"--{option_names.get(k, k)}={v}" for k, v in point.items() if k != "predictor")
+    nodes = 1 << rng.randrange(10, 16)
+    lines.append(BANNER.format(port=7000 + rng.randrange(100), clock=f"{rng.randrange(24):02d}:"
+                               f"{rng.randrange(60):02d}:{rng.randrange(60):02d}",
+                               pid=rng.randrange(1000, 60000), options=options,
+                               generate=rng.uniform(0.001, 0.01), build=rng.uniform(0.001, 0.005),
+                               nodes=nodes, edges=nodes * 10 + rng.randrange(nodes)))
+    times = [rng.uniform(0.00005, 0.0001) for _ in range(trials)]
+    lines += [f"Trial Time:          {t:.5f}\n" for t in times]
+    lines.append(f"Average Time:        {sum(times) / trials:.5f}\n")
+    lines.append(f"Exiting @ tick {rng.randrange(5000000000, 9000000000)} "
+                 "because exiting with last active thread context\n")
+    lines += stat_lines(sweep, point, rng)
+    lines.append("\n")
+    return "".join(lines)
+
+
+def generate(path, sweep, size, crash_rate=0.0, trials=6, seed=0):
+    """
+    Writes a log of at least size bytes (whole blocks) for sweep to path.
+    Returns (bytes written, runs, crashed runs).
+    """
+    rng = random.Random(seed)
+    points = SWEEPS[sweep][0]()
+    written = runs = crashed = 0
+    with open(path, "w") as f:
+        f.write("\n")
+        written = 1
+        while written < size:
+            for point in points:
+                block = make_block(sweep, point, rng, crash_rate, trials)
+                f.write(block)
+                written += len(block)
+                runs += 1
+                crashed += "BACKTRACE" in block
+                if written >= size:
+                    break
+    return written, runs, crashed
+
+
+def parse_size(text):
+    """
+    "64M" -> 67108864. Accepts K, M and G suffixes (powers of 1024).
+    """
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic sweep log.")
+    parser.add_argument("sweep", choices=sorted(SWEEPS))
+    parser.add_argument("out")
+    parser.add_argument("--size", default="64M", help="log size, e.g. 500K, 64M, 2G. Default: 64M")
+    parser.add_argument("--crash-rate", type=float, default=0.05,
+                        help="fraction of runs that crash (besides the BTB's assoc > entries). Default: 0.05")
+    parser.add_argument("--trials", type=int, default=6, help="workload trial lines per run. Default: 6")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    written, runs, crashed = generate(args.out, args.sweep, parse_size(args.size), args.crash_rate,
+                                      args.trials, args.seed)
+    print(f"{args.out}: {written} bytes, {runs} runs, {crashed} crashed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+Host cost of every sweep run.
+
+The runner waits for each gem5 child with os.wait4, which returns the
+child's resource usage, so every run is recorded with
+
+    wall_seconds   elapsed time
+    cpu_seconds    user + system CPU time of gem5
+    max_rss_kb     peak resident memory of gem5
+    exit_status    exit code, or -signal if gem5 was killed
+
+and, when stats.txt was written, gem5's own hostSeconds, hostInstRate,
+hostTickRate (simulated ticks per host second) and hostMemory. The values
+are kept in the "telemetry" field of the runner results (and so of the
+result cache and results.jsonl) and in the results store as stats named
+telemetry.<name>.
+
+The summary breaks the cost down by the value of every parameter, to show
+which knobs make simulations expensive:
+
+    python -m sweep.telemetry results.jsonl
+    python -m sweep.telemetry results.db --by localCtrBits --metric max_rss_kb
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+PREFIX = "telemetry."
+# gem5 stats copied into the telemetry of a run
+HOST_STATS = ["hostSeconds", "hostInstRate", "hostTickRate", "hostMemory"]
+METRICS = ["wall_seconds", "cpu_seconds", "max_rss_kb", "exit_status"] + HOST_STATS
+
+
+def run_measured(cmd, stdout, cwd):
+    """
+    Runs cmd to completion. Returns (exit status, telemetry), the exit
+    status being negative for a signal as in subprocess.
+    """
+    start = time.monotonic()
+    proc = subprocess.Popen(cmd, stdout=stdout, stderr=subprocess.STDOUT, cwd=cwd)
+    while True:
+        try:
+            _, status, usage = os.wait4(proc.pid, 0)
+            break
+        except InterruptedError:
+            continue
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return proc.returncode, {
+        "wall_seconds": round(time.monotonic() - start, 3),
+        "cpu_seconds": round(usage.ru_utime + usage.ru_stime, 3),
+        "max_rss_kb": usage.ru_maxrss,
+        "exit_status": proc.returncode,
+    }
+
+
+def combine(parts):
+    """
+    Telemetry of several gem5 processes run one after the other for one
+    point (SimPoint checkpoints): times add up, the peak is the largest.
+    """
+    total = {}
+    for part in parts:
+        for name, value in part.items():
+            if name in ("max_rss_kb", "hostMemory"):
+                total[name] = max(total.get(name, 0), value)
+            elif name == "exit_status":
+                total[name] = value if value else total.get(name, 0)
+            elif name == "hostInstRate" or name == "hostTickRate":
+                continue
+            else:
+                total[name] = total.get(name, 0) + value
+    return total
+
+
+def with_host_stats(telemetry, stats):
+    """
+    Adds gem5's host stats (from a run's stats.txt) to its telemetry.
+    """
+    telemetry = dict(telemetry)
+    for name in HOST_STATS:
+        if name in stats:
+            telemetry[name] = stats[name]
+    return telemetry
+
+
+def as_stats(telemetry):
+    """
+    The telemetry as stats for the results store.
+    """
+    return {PREFIX + name: value for name, value in telemetry.items()}
+
+
+def load_runs(path):
+    """
+    [(params, telemetry)] of the runs of a results.jsonl file or a results
+    store (*.db).
+    """
+    if path.endswith(".db"):
+        from sweep.store import ResultStore
+        with ResultStore(path) as store:
+            rows = store.query(stats={name: PREFIX + name for name in METRICS}, failed=True)
+            params = store.params
+        return [({p: row[p] for p in params}, {m: row[m] for m in METRICS if row[m] is not None})
+                for row in rows if row["wall_seconds"] is not None]
+    from sweep.results import read_records
+    return [(r["params"], r["telemetry"]) for r in read_records(path) if r.get("telemetry")]
+
+
+def summarize(runs, by=None, metric="wall_seconds"):
+    """
+    {parameter: [(value, runs, failed, mean metric, max metric)]} for every
+    parameter (or those in by) that takes more than one value, sorted by
+    the parameter value.
+    """
+    names = by or sorted({name for params, _ in runs for name in params})
+    summary = {}
+    for name in names:
+        groups = {}
+        for params, telemetry in runs:
+            if name in params and metric in telemetry:
+                groups.setdefault(params[name], []).append(telemetry)
+        if len(groups) < 2 and not by:
+            continue
+        rows = []
+        for value, group in groups.items():
+            values = [t[metric] for t in group]
+            failed = sum(1 for t in group if t.get("exit_status"))
+            rows.append((value, len(group), failed, sum(values) / len(values), max(values)))
+        summary[name] = sorted(rows, key=lambda r: (not isinstance(r[0], (int, float)), r[0]))
+    return summary
+
+
+def main(argv=None):
+    from sweep.results import RESULTS_FILE
+
+    parser = argparse.ArgumentParser(description="Host cost of the sweep runs, by parameter.")
+    parser.add_argument("results", nargs="?", default=RESULTS_FILE,
+                        help=f"results file or results store (*.db). Default: {RESULTS_FILE}")
+    parser.add_argument("--by", action="append", default=None, help="parameter to break down by (repeatable)")
+    parser.add_argument("--metric", default="wall_seconds", choices=METRICS,
+                        help="metric to summarize. Default: wall_seconds")
+    parser.add_argument("--top", type=int, default=5, help="also list the N most expensive runs. Default: 5")
+    args = parser.parse_args(argv)
+
+    runs = load_runs(args.results)
+    if not runs:
+        print(f"no runs with telemetry in {args.results}")
+        return 1
+    total = sum(t.get("wall_seconds", 0) for _, t in runs)
+    cpu = sum(t.get("cpu_seconds", 0) for _, t in runs)
+    peak = max(t.get("max_rss_kb", 0) for _, t in runs)
+    failed = sum(1 for _, t in runs if t.get("exit_status"))
+    print(f"{len(runs)} runs ({failed} failed): {total:.1f} s wall, {cpu:.1f} s CPU, "
+          f"peak RSS {peak / 1024:.1f} MiB")
+
+    for name, rows in summarize(runs, args.by, args.metric).items():
+        print(f"\n{name:>24} {'runs':>6} {'failed':>6} {'mean ' + args.metric:>20} {'max':>12}")
+        for value, count, fails, mean, top in rows:
+            print(f"{str(value):>24} {count:>6} {fails:>6} {mean:>20.2f} {top:>12.2f}")
+
+    if args.top:
+        print(f"\nmost expensive runs ({args.metric}):")
+        varying = {name for name in {n for params, _ in runs for n in params}
+                   if len({str(params.get(name)) for params, _ in runs}) > 1}
+        ranked = sorted(runs, key=lambda r: r[1].get(args.metric, 0), reverse=True)[:args.top]
+        for params, telemetry in ranked:
+            point = " ".join(f"{k}={v}" for k, v in params.items() if k in varying)
+            print(f"  {telemetry.get(args.metric, 0):>12.2f}  {point}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,349 @@
+"""
+Compact binary branch traces.
+
+A trace file is a 32-byte header followed by fixed-width 9-byte records:
+
+    pc_delta      int32   pc - previous record's pc
+    target_delta  int32   target - pc
+    flags         uint8   bits 0-2: gem5 BranchType, bit 3: taken
+
+Deltas that do not fit in 32 bits are carried by escape records (BranchType
+NoBranch, which never appears as a real branch): their two int32 fields hold
+the low and high halves of a 64-bit value, either the pc delta of the next
+record (flags bit 4 clear) or the absolute target of the next record (bit 4
+set). Escape records are dropped when decoding.
+
+Uncompressed traces are read through a NumPy memmap, so opening one costs
+no copy and no parse. Compressed traces (zlib) store the records in frames
+of up to FRAME_RECORDS records, each prefixed by its compressed and raw
+sizes, and are decoded frame by frame.
+
+Traces are recorded from gem5 with
+
+    gem5.opt ooo_core.py --branchTrace=bfs.btrace ... rv64_bfs
+
+which pipes the committed-instruction trace of the O3 CPU into
+`python -m sweep.trace convert` without writing it to disk. The finished
+trace appears under its final name once the converter has drained the pipe.
+
+    python -m sweep.trace convert exec_trace.txt bfs.btrace --compress
+    python -m sweep.trace info bfs.btrace
+"""
+
+import argparse
+import os
+import re
+import struct
+import sys
+import zlib
+
+import numpy as np
+
+from sweep.replay import BRANCH_TYPES
+
+MAGIC = b"BRTRACE1"
+HEADER = struct.Struct("<8sIQQI")  # magic, flags, records, base pc, reserved
+FRAME = struct.Struct("<II")       # compressed bytes, records
+COMPRESSED = 1
+
+RECORD = np.dtype([("pc_delta", "<i4"), ("target_delta", "<i4"), ("flags", "u1")])
+KIND_MASK = 0x07
+TAKEN = 0x08
+ESC_TARGET = 0x10
+NO_BRANCH = BRANCH_TYPES.index("NoBranch")
+
+FRAME_RECORDS = 1 << 16
+INT32_MIN, INT32_MAX = -(1 << 31), (1 << 31) - 1
+
+
+def split64(value):
+    """
+    Splits a signed 64-bit value into (low, high) int32 halves.
+    """
+    value &= (1 << 64) - 1
+    lo, hi = value & 0xFFFFFFFF, value >> 32
+    return (lo - (1 << 32) if lo >= 1 << 31 else lo,
+            hi - (1 << 32) if hi >= 1 << 31 else hi)
+
+
+class TraceWriter:
+    """Appends branches to a trace file"""
+
+    def __init__(self, path, compress=False):
+        self.path = path
+        self.compress = compress
+        self.f = open(path, "wb")
+        self.f.write(HEADER.pack(MAGIC, COMPRESSED if compress else 0, 0, 0, 0))
+        self.count = 0
+        self.base = None
+        self.last_pc = 0
+        self.buffer = []
+
+    def write(self, pc, target, taken, kind):
+        """
+        Appends one branch. kind is a gem5 BranchType code.
+        """
+        if self.base is None:
+            self.base = self.last_pc = pc
+        delta = pc - self.last_pc
+        if not INT32_MIN <= delta <= INT32_MAX:
+            self.buffer.append((*split64(delta), NO_BRANCH))
+            delta = 0
+        target_delta = target - pc
+        if not INT32_MIN <= target_delta <= INT32_MAX:
+            self.buffer.append((*split64(target), NO_BRANCH | ESC_TARGET))
+            target_delta = 0
+        self.buffer.append((delta, target_delta, kind | (TAKEN if taken else 0)))
+        self.last_pc = pc
+        if len(self.buffer) >= FRAME_RECORDS:
+            self.flush()
+
+    def flush(self):
+        # write() always appends an escape together with its branch, so a
+        # frame never separates the two
+        if not self.buffer:
+            return
+        data = np.array(self.buffer, dtype=RECORD).tobytes()
+        if self.compress:
+            packed = zlib.compress(data, 6)
+            self.f.write(FRAME.pack(len(packed), len(self.buffer)))
+            self.f.write(packed)
+        else:
+            self.f.write(data)
+        self.count += len(self.buffer)
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        self.f.seek(0)
+        self.f.write(HEADER.pack(MAGIC, COMPRESSED if self.compress else 0,
+                                 self.count, self.base or 0, 0))
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TraceReader:
+    """Reads a trace file; uncompressed traces are memory-mapped"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, flags, self.count, self.base, _ = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a branch trace")
+        self.compressed = bool(flags & COMPRESSED)
+        self.records = None
+        if not self.compressed and self.count:
+            # zero-copy view of the raw records
+            self.records = np.memmap(path, dtype=RECORD, mode="r", offset=HEADER.size, shape=(self.count,))
+
+    def raw_chunks(self, size=1 << 20):
+        """
+        Yields raw record arrays of about `size` records (views into the
+        memmap for uncompressed traces). A chunk never ends on a target
+        escape.
+        """
+        if self.records is not None:
+            start = 0
+            while start < self.count:
+                end = min(start + size, self.count)
+                while end < self.count and self.records["flags"][end - 1] == NO_BRANCH | ESC_TARGET:
+                    end += 1
+                yield self.records[start:end]
+                start = end
+            return
+        if not self.compressed:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(HEADER.size)
+            pending = []
+            pending_len = 0
+            while True:
+                head = f.read(FRAME.size)
+                if len(head) < FRAME.size:
+                    break
+                nbytes, nrec = FRAME.unpack(head)
+                pending.append(np.frombuffer(zlib.decompress(f.read(nbytes)), dtype=RECORD, count=nrec))
+                pending_len += nrec
+                if pending_len >= size:
+                    yield np.concatenate(pending) if len(pending) > 1 else pending[0]
+                    pending, pending_len = [], 0
+            if pending:
+                yield np.concatenate(pending) if len(pending) > 1 else pending[0]
+
+    def chunks(self, size=1 << 20):
+        """
+        Yields decoded (pc, taken, kind, target) arrays chunk by chunk.
+        """
+        last_pc = np.int64(self.base)
+        for raw in self.raw_chunks(size):
+            pc, taken, kind, target, last_pc = decode(raw, last_pc)
+            yield pc, taken, kind, target
+
+    def arrays(self):
+        """
+        Returns the whole trace decoded as (pc, taken, kind, target) arrays.
+        """
+        parts = list(self.chunks(max(self.count, 1)))
+        if not parts:
+            empty = np.zeros(0, dtype=np.uint64)
+            return empty, np.zeros(0, dtype=bool), np.zeros(0, dtype=np.uint8), empty
+        if len(parts) == 1:
+            return parts[0]
+        return tuple(np.concatenate(column) for column in zip(*parts))
+
+    def __len__(self):
+        return self.count
+
+
+def decode(raw, last_pc):
+    """
+    Decodes raw records following a record at last_pc. Returns
+    (pc, taken, kind, target, pc of the last record).
+    """
+    flags = raw["flags"]
+    kind = (flags & KIND_MASK).astype(np.uint8)
+    lo = raw["pc_delta"].astype(np.int64)
+    hi = raw["target_delta"].astype(np.int64)
+    escape = kind == NO_BRANCH
+    target_escape = escape & ((flags & ESC_TARGET) != 0)
+
+    delta = lo.copy()
+    if escape.any():
+        wide = (hi << 32) | (lo & 0xFFFFFFFF)
+        delta[escape] = np.where(target_escape[escape], 0, wide[escape])
+    pc = last_pc + np.cumsum(delta)
+    target = pc + hi
+    if target_escape.any():
+        follows = np.flatnonzero(target_escape) + 1
+        target[follows] = ((hi << 32) | (lo & 0xFFFFFFFF))[follows - 1]
+    last = pc[-1] if len(pc) else last_pc
+
+    keep = ~escape
+    return (pc[keep].astype(np.uint64), (flags[keep] & TAKEN) != 0, kind[keep],
+            target[keep].astype(np.uint64), last)
+
+
+def is_trace(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+# ----------------------------------------------------------------------
+# gem5 exec trace -> branch trace
+# ----------------------------------------------------------------------
+
+# "  5000: system.cpu: T0 : 0x10158 @_start+4    :   beq a0, zero, 12 : IntAlu :  ..."
+# gem5's decoder names compressed instructions c_beqz, c_j, ...; objdump c.beqz
+EXEC_RE = re.compile(r"T\d+ : (0x[0-9a-fA-F]+)(?:\.\d+)?\s*(?:@\S*)?\s*:\s+(\S+)\s*([^:]*?)\s*:")
+
+RVC_PREFIXES = ("c_", "c.")
+CONDITIONAL = {"beq", "bne", "blt", "bge", "bltu", "bgeu", "c.beqz", "c.bnez",
+               "beqz", "bnez", "blez", "bgez", "bltz", "bgtz", "bgt", "ble", "bgtu", "bleu"}
+LINK_REGS = ("ra", "t0", "x1", "x5")
+
+
+def classify(mnemonic, operands):
+    """
+    gem5 BranchType of a RISC-V instruction, or None if it is not a branch.
+    """
+    if mnemonic.startswith(RVC_PREFIXES):
+        mnemonic = "c." + mnemonic[2:]
+    ops = [o.strip() for o in operands.split(",")] if operands else []
+    if mnemonic in CONDITIONAL:
+        return BRANCH_TYPES.index("DirectCond")
+    if mnemonic in ("jal", "c.jal"):
+        link = ops[0] if len(ops) > 1 else ("ra" if mnemonic == "c.jal" else "zero")
+        return BRANCH_TYPES.index("CallDirect" if link in LINK_REGS else "DirectUncond")
+    if mnemonic in ("j", "c.j"):
+        return BRANCH_TYPES.index("DirectUncond")
+    if mnemonic == "ret":
+        return BRANCH_TYPES.index("Return")
+    if mnemonic in ("c.jalr",):
+        return BRANCH_TYPES.index("CallIndirect")
+    if mnemonic in ("jalr", "c.jr", "jr"):
+        # gem5 prints "jalr ra, 0(a5)", and "jalr 0(ra)" / "c_jr 0(ra)" without a link
+        link = ops[0] if mnemonic == "jalr" and len(ops) >= 2 else "zero"
+        base = ops[-1].split("(")[-1].rstrip(")") if ops else ""
+        if link in LINK_REGS:
+            return BRANCH_TYPES.index("CallIndirect")
+        if base in LINK_REGS:
+            return BRANCH_TYPES.index("Return")
+        return BRANCH_TYPES.index("IndirectUncond")
+    return None
+
+
+def convert_exec_trace(lines, writer):
+    """
+    Reads gem5 ExeTracer lines (committed instructions) and writes every
+    branch to writer. Whether a branch was taken, and its target, follow
+    from the PC of the next committed instruction. Returns the number of
+    branches written.
+    """
+    pending = None  # (pc, size, kind) of the last branch seen
+    written = 0
+    for line in lines:
+        m = EXEC_RE.search(line)
+        if not m:
+            continue
+        pc = int(m.group(1), 16)
+        if pending is not None:
+            bpc, size, kind = pending
+            writer.write(bpc, pc, pc != bpc + size, kind)
+            written += 1
+            pending = None
+        mnemonic = m.group(2)
+        kind = classify(mnemonic, m.group(3))
+        if kind is not None:
+            pending = (pc, 2 if mnemonic.startswith(RVC_PREFIXES) else 4, kind)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Branch trace conversion and inspection.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("convert", help="gem5 exec trace (file or pipe) -> branch trace")
+    p.add_argument("exec_trace")
+    p.add_argument("out")
+    p.add_argument("--compress", action="store_true", help="zlib-compress the records")
+    p = sub.add_parser("info", help="print a summary of a branch trace")
+    p.add_argument("trace")
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        # write next to the target and rename, so readers never see a partial trace
+        part = args.out + ".part"
+        with open(args.exec_trace, "r", errors="replace") as lines, \
+                TraceWriter(part, compress=args.compress) as writer:
+            written = convert_exec_trace(lines, writer)
+        os.replace(part, args.out)
+        print(f"{written} branches written to {args.out}")
+        return 0
+
+    reader = TraceReader(args.trace)
+    counts = np.zeros(len(BRANCH_TYPES), dtype=np.int64)
+    taken = 0
+    branches = 0
+    for pc, t, kind, _ in reader.chunks():
+        counts += np.bincount(kind, minlength=len(BRANCH_TYPES))
+        taken += int(t.sum())
+        branches += len(pc)
+    size = os.path.getsize(args.trace)
+    print(f"{args.trace}: {branches} branches, {taken} taken, {size} bytes "
+          f"({size / max(branches, 1):.2f} bytes/branch{', compressed' if reader.compressed else ''})")
+    for name, count in zip(BRANCH_TYPES, counts.tolist()):
+        if count:
+            print(f"    {name:<16} {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""
+Follow a sweep log while the sweep is still running.
+
+The extract_* scripts re-read the whole log and block in plt.show(), so they
+are only useful once a sweep has finished. watch polls the log instead and
+parses only the bytes appended since the last poll: the byte offset reached
+is persisted in <log>.watch.json and the runs parsed so far in
+<log>.watch.jsonl, so a restarted watcher (or a --once call from cron) picks
+up where the last one stopped. A poll that finds no new bytes costs one
+stat() call.
+
+Each completed run is printed as soon as it appears, failures with their
+first error line, and the plot (miss rate, BTB hit ratio or RAS hit rate
+against the first parameter of the RUNNING header, one line per value of
+the other parameters) is re-rendered to --plot.
+
+    python -m sweep.watch localBP/log_local_bfs.txt --plot local.png
+    python -m sweep.watch log.txt --once
+
+A run is complete once the next separator line has been written, or once
+its stat lines have been followed by the closing blank line, so partially
+written blocks are never parsed. .runs logs (sweep/logstore.py) are read
+whole frames at a time, each holding a complete block. If the log is
+truncated or replaced (a new sweep cleared it), the watcher starts over.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from sweep.logparse import STAT_RE, RunRecord, iter_runs
+from sweep.logstore import RunLog, is_runlog
+from sweep.replay import COMMITTED, MISPREDICTED
+
+SEPARATOR = b"\n####"
+
+HIT_RATIO = "system.cpu.branchPred.BTBHitRatio"
+RAS_CORRECT = "system.cpu.branchPred.ras.correct"
+RAS_USED = "system.cpu.branchPred.ras.used"
+
+
+def complete_length(data):
+    """
+    Length of the prefix of data (bytes appended to a log, starting at a
+    block boundary) that holds only complete blocks.
+    """
+    cut = data.rfind(SEPARATOR)
+    end = cut + 1 if cut >= 0 else 0
+    # the last block is complete when its stats have been followed by the
+    # blank line, whether or not the next separator is being written
+    tail = data[end:]
+    tail = tail[:tail.rfind(b"\n") + 1]
+    if tail.endswith(b"\n\n") and any(STAT_RE.match(line) for line in
+                                       tail.decode(errors="replace").splitlines()):
+        return end + len(tail)
+    return end
+
+
+class LogTail:
+    """
+    Incremental reader of a growing log with a persisted offset. For a .runs
+    log the offset is that of the next frame, saved with the header and
+    dictionary frame RunLog.follow resumes from.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.state_file = path + ".watch.json"
+        self.records_file = path + ".watch.jsonl"
+        self.offset = 0
+        self.line = 0
+        self.inode = None
+        self.frame = ("", None)
+        if os.path.exists(self.state_file):
+            with open(self.state_file) as f:
+                state = json.load(f)
+            self.offset, self.line, self.inode = state["offset"], state["line"], state["inode"]
+            self.frame = tuple(state.get("frame", self.frame))
+
+    def records(self):
+        """
+        Runs parsed by earlier polls.
+        """
+        if not os.path.exists(self.records_file):
+            return []
+        with open(self.records_file) as f:
+            return [RunRecord(**json.loads(line)) for line in f if line.strip()]
+
+    def reset(self):
+        self.offset, self.line, self.inode = 0, 0, None
+        self.frame = ("", None)
+        open(self.records_file, "w").close()
+        self.save()
+
+    def save(self):
+        tmp = self.state_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"offset": self.offset, "line": self.line, "inode": self.inode, "frame": self.frame}, f)
+        os.replace(tmp, self.state_file)
+
+    def poll(self):
+        """
+        Parses the complete runs appended since the last poll and returns
+        them. Returns (runs, restarted) where restarted is True if the log
+        was truncated or replaced since the last poll.
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return [], False
+        restarted = False
+        if (self.inode is not None and st.st_ino != self.inode) or st.st_size < self.offset:
+            self.reset()
+            restarted = True
+        self.inode = st.st_ino
+        if st.st_size == self.offset:
+            return [], restarted
+
+        if is_runlog(self.path):
+            offset, blocks = self.offset, []
+            for _, block, (offset, header, dictionary) in RunLog(self.path).follow(self.offset or None,
+                                                                                  *self.frame):
+                blocks.append(block)
+                self.frame = (header, dictionary)
+            length, text = offset - self.offset, "".join(blocks)
+        else:
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                data = f.read(st.st_size - self.offset)
+            length = complete_length(data)
+            text = data[:length].decode(errors="replace")
+        if not length:
+            return [], restarted
+        runs = list(iter_runs(text.splitlines(True), start_line=self.line))
+
+        with open(self.records_file, "a") as f:
+            for run in runs:
+                f.write(json.dumps(run._asdict()) + "\n")
+        self.offset += length
+        self.line += text.count("\n")
+        self.save()
+        return runs, restarted
+
+
+def metric(run):
+    """
+    (label, value) of the figure of merit of a run, or None.
+    """
+    stats = run.stats
+    if COMMITTED in stats and MISPREDICTED in stats and stats[COMMITTED]:
+        return "Miss Rate (%)", stats[MISPREDICTED] / stats[COMMITTED] * 100
+    if HIT_RATIO in stats:
+        return "BTB Hit Rate (%)", stats[HIT_RATIO] * 100
+    if RAS_CORRECT in stats and RAS_USED in stats and stats[RAS_USED]:
+        return "RAS Hit Rate (%)", stats[RAS_CORRECT] / stats[RAS_USED] * 100
+    return None
+
+
+def describe(run):
+    if run.failed:
+        return f"{run.header}\n    FAILED: {run.error or 'no stats'}"
+    m = metric(run)
+    return f"{run.header}\n    {m[0]} {m[1]:.4f}" if m else f"{run.header}\n    {len(run.stats)} stats"
+
+
+def series(runs):
+    """
+    Groups successful runs for plotting: returns (x name, y label,
+    {series label: [(x, y)]}) with x the first parameter of the headers.
+    """
+    groups = {}
+    x_name = label = None
+    for run in runs:
+        m = metric(run)
+        if run.failed or m is None or not run.params:
+            continue
+        names = list(run.params)
+        x_name, label = names[0], m[0]
+        key = ", ".join(f"{n}={run.params[n]}" for n in names[1:]) or label
+        groups.setdefault(key, []).append((run.params[names[0]], m[1]))
+    return x_name, label, groups
+
+
+def plot(runs, path, figure=None):
+    """
+    Renders the runs to path (PNG/SVG/...) and, when figure is given
+    (interactive mode), into that figure.
+    """
+    import matplotlib
+    if figure is None:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    x_name, label, groups = series(runs)
+    fig = figure or plt.figure(figsize=(10, 6))
+    fig.clf()
+    ax = fig.add_subplot()
+    for key, points in sorted(groups.items()):
+        points.sort()
+        ax.plot([p[0] for p in points], [p[1] for p in points], marker="o", label=key)
+    if groups:
+        ax.set_xlabel(x_name)
+        ax.set_ylabel(label)
+        if all(isinstance(p[0], int) and p[0] > 0 for pts in groups.values() for p in pts):
+            ax.set_xscale("log", base=2)
+        if len(groups) <= 20:
+            ax.legend(fontsize="small")
+    ax.set_title(f"{sum(len(p) for p in groups.values())} runs")
+    ax.grid(True, which="both", ls="--")
+    if path:
+        fig.savefig(path)
+    if figure is None:
+        plt.close(fig)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Follow a sweep log and plot runs as they finish.")
+    parser.add_argument("log")
+    parser.add_argument("--plot", default=None, help="image re-rendered after every update")
+    parser.add_argument("--show", action="store_true", help="also keep an interactive plot window open")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between polls. Default: 5")
+    parser.add_argument("--once", action="store_true", help="poll once and exit")
+    parser.add_argument("--reset", action="store_true", help="forget the saved offset and re-read the log")
+    args = parser.parse_args(argv)
+
+    tail = LogTail(args.log)
+    if args.reset:
+        tail.reset()
+    runs = tail.records()
+    print(f"{len(runs)} runs already read from {args.log} (offset {tail.offset})")
+
+    figure = None
+    if args.show:
+        import matplotlib.pyplot as plt
+        plt.ion()
+        figure = plt.figure(figsize=(10, 6))
+    if runs and (args.plot or figure):
+        plot(runs, args.plot, figure)
+
+    try:
+        while True:
+            new, restarted = tail.poll()
+            if restarted:
+                print("Log was truncated or replaced, starting over")
+                runs = []
+            if new:
+                runs.extend(new)
+                for run in new:
+                    print(describe(run))
+                failed = sum(1 for r in runs if r.failed)
+                print(f"-- {len(runs)} runs, {failed} failed")
+                if args.plot or figure:
+                    plot(runs, args.plot, figure)
+            if args.once:
+                return 0
+            if figure is not None:
+                plt.pause(args.interval)
+            else:
+                time.sleep(args.interval)
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# stand-in for gem5.opt, see fake_gem5.py
+FAKE_GEM5 = os.path.join(REPO_ROOT, "fake_gem5.py")
+
+# run the tests against this checkout of the sweep package
+sys.path.insert(0, REPO_ROOT)
+
+
+@pytest.fixture
+def sweep_dir(tmp_path, monkeypatch):
+    """
+    Empty working directory for a sweep with a fast fake gem5.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("FAKE_GEM5_SLEEP", "0.05")
+    monkeypatch.delenv("FAKE_GEM5_CRASH", raising=False)
+    return tmp_path
+
+
+@pytest.fixture
+def gem5_paths(tmp_path):
+    """
+    --script and --binary options that pass sweep.preflight's environment
+    checks: a config script importing only gem5 modules, an empty workload.
+    """
+    script = tmp_path / "config.py"
+    script.write_text("import m5\nfrom m5.objects import *\n")
+    binary = tmp_path / "workload"
+    binary.write_text("")
+    return ["--script", str(script), "--binary", str(binary)]
@@ -0,0 +1,28 @@
+import json
+
+from sweep import bench
+
+
+def record(mb_s, commit, **extra):
+    return {"host": "h", "size": 1, "commit": commit, "cases": {"parse:btb": {"mb_s": mb_s, "peak_rss_kb": 1000}},
+            **extra}
+
+
+def test_baseline_median(tmp_path):
+    history = tmp_path / "benchmarks.jsonl"
+    saved = [record(100, "a"), record(40, "b"), record(110, "c"), record(105, "d"), {**record(10, "e"), "size": 2}]
+    history.write_text("".join(json.dumps(r) + "\n" for r in saved))
+    records = bench.history_records(str(history), "h", 1)
+    assert [r["commit"] for r in records] == ["a", "b", "c", "d"]
+    # one slow outlier does not move the baseline
+    assert bench.baseline(records)["parse:btb"]["mb_s"] == 102.5
+    assert bench.baseline(records, runs=2)["parse:btb"]["mb_s"] == 107.5
+
+
+def test_regression_does_not_advance_baseline():
+    records = [record(100, "a"), record(50, "b", regression=True), record(50, "c", regression=True)]
+    slow = {"parse:btb": {"mb_s": 50, "peak_rss_kb": 1000}}
+    assert bench.regressions(slow, bench.baseline(records), 0.15) == [("parse:btb", "100.0 -> 50.0 MB/s")]
+    # an accepted run is part of the baseline
+    records.append(record(50, "d"))
+    assert bench.regressions(slow, bench.baseline(records, runs=1), 0.15) == []
@@ -0,0 +1,40 @@
+import random
+
+import numpy as np
+
+from sweep.btb import btb_lookups, hit_ratio_surface
+from sweep.replay import BRANCH_TYPES, DIRECT_COND, RETURN
+
+
+def lru_hit_ratio(keys, assoc, entries):
+    """
+    Brute-force set-associative LRU cache of entries / assoc sets.
+    """
+    sets = {}
+    hits = 0
+    for key in keys:
+        ways = sets.setdefault(key % (entries // assoc), [])
+        if key in ways:
+            hits += 1
+            ways.remove(key)
+        elif len(ways) == assoc:
+            ways.pop()
+        ways.insert(0, key)
+    return hits / len(keys)
+
+
+def test_surface_matches_lru():
+    rng = random.Random(5)
+    # a hot loop of branches plus a wider, colder set
+    keys = [rng.randrange(24) if rng.random() < 0.7 else rng.randrange(200) for _ in range(4000)]
+    surface = hit_ratio_surface(keys, max_log2=6)
+    assert len(surface) == sum(i + 1 for i in range(7))
+    for (assoc, entries), ratio in surface.items():
+        assert ratio == lru_hit_ratio(keys, assoc, entries), (assoc, entries)
+
+
+def test_lookups_are_taken_non_returns():
+    pc = np.array([0x100, 0x104, 0x108, 0x10c], dtype=np.uint64)
+    taken = np.array([True, False, True, True])
+    kind = np.array([DIRECT_COND, DIRECT_COND, RETURN, BRANCH_TYPES.index("CallDirect")], dtype=np.uint8)
+    assert btb_lookups(pc, taken, kind) == [0x40, 0x43]
@@ -0,0 +1,63 @@
+import pytest
+
+from conftest import FAKE_GEM5
+from sweep import runner
+from sweep.checkpoint import find_checkpoints, weighted_stats
+from sweep.logparse import read_stats_file
+
+
+def simpoint_tree(root, weights, interval=1000, warmup=100):
+    for number, weight in enumerate(weights):
+        cpt = root / (f"cpt.simpoint_{number:02d}_inst_{number * interval}_weight_{weight}"
+                      f"_interval_{interval}_warmup_{warmup}")
+        cpt.mkdir(parents=True)
+        (cpt / "m5.cpt").write_text(f"[root]\nnumber={number}\n")
+    # not checkpoints: no m5.cpt, or a foreign name
+    (root / "cpt.simpoint_09_inst_0_weight_0.5_interval_1000_warmup_100").mkdir()
+    (root / "ckpt.other").mkdir()
+    return root
+
+
+def test_find_simpoint_checkpoints(tmp_path):
+    root = simpoint_tree(tmp_path / "bfs", ["0.25", "0.5", "0.25"] + ["0"] * 8)
+    found = find_checkpoints(str(root))
+    assert len(found) == 11
+    assert [weight for _, weight, _, _ in found[:3]] == [0.25, 0.5, 0.25]
+    assert found[10][0].endswith("cpt.simpoint_10_inst_10000_weight_0_interval_1000_warmup_100")
+    assert all(warmup == 100 and insts == 1000 for _, _, warmup, insts in found)
+
+
+def test_find_single_checkpoint(tmp_path):
+    (tmp_path / "m5.cpt").write_text("")
+    assert find_checkpoints(str(tmp_path), 5000) == [(str(tmp_path), 1.0, 0, 5000)]
+
+
+def test_find_checkpoints_errors(tmp_path):
+    with pytest.raises(ValueError):
+        find_checkpoints(str(tmp_path))
+    with pytest.raises(FileNotFoundError):
+        find_checkpoints(str(tmp_path / "missing"))
+
+
+def test_weighted_stats():
+    stats = weighted_stats([(0.25, {"a": 4, "b": 1}), (0.75, {"a": 8})])
+    assert stats == {"a": 7.0}
+    assert weighted_stats([(1, {"a": 2}), (3, {"a": 6})]) == {"a": 5.0}
+
+
+def test_simpoint_sweep(sweep_dir):
+    root = simpoint_tree(sweep_dir / "ckpt", ["0.25", "0.75"])
+    assert runner.main(["custom", "--param", "rasNumEntries=4", "--gem5", FAKE_GEM5, "--no-preflight",
+                        "--outdir", "out", "--checkpoint", str(root)]) == 0
+    stats, _ = read_stats_file(str(sweep_dir / "out" / "rasNumEntries-4" / "stats.txt"))
+    single, _ = read_stats_file(str(sweep_dir / "out" / "rasNumEntries-4" / "simpoint_00" / "stats.txt"))
+    assert stats["system.cpu.branchPred.ras.correct"] == single["system.cpu.branchPred.ras.correct"]
+
+
+@pytest.mark.parametrize("make", [lambda root: root / "missing", lambda root: root])
+def test_bad_checkpoint_option(sweep_dir, capsys, make):
+    with pytest.raises(SystemExit) as excinfo:
+        runner.main(["custom", "--param", "rasNumEntries=4", "--gem5", FAKE_GEM5, "--no-preflight",
+                     "--checkpoint", str(make(sweep_dir))])
+    assert excinfo.value.code == 2
+    assert "error:" in capsys.readouterr().err
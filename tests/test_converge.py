@@ -0,0 +1,50 @@
+import math
+import random
+
+from sweep.converge import COMMITTED, MISPREDICTED, Tracker, read_intervals
+
+RATE = 0.08
+INTERVAL = 2000
+
+
+def feed(tracker, rng, intervals):
+    """
+    Dumps of cumulative DirectCond counters of a branch stream mispredicting
+    at RATE. Returns the dump at which the tracker converged, or None.
+    """
+    committed = mispredicted = 0
+    for i in range(1, intervals + 1):
+        branches = rng.randint(INTERVAL // 2, INTERVAL)
+        committed += branches
+        mispredicted += sum(rng.random() < RATE for _ in range(branches))
+        if tracker.add({COMMITTED: committed, MISPREDICTED: mispredicted}, i * 10000):
+            return i
+    return None
+
+
+def test_converges(tmp_path):
+    tracker = Tracker("missRate", tolerance=0.02, min_intervals=10)
+    stopped = feed(tracker, random.Random(0), 2000)
+    assert stopped is not None and stopped >= 10
+    estimate, half_width = tracker.estimate()
+    assert half_width <= 0.02 * estimate
+    assert abs(estimate - RATE) < 3 * half_width
+    # the half-width is kept with every interval and in the saved record
+    assert tracker.series[0]["half_width"] is None
+    assert tracker.series[-1]["half_width"] == half_width
+    tracker.save(str(tmp_path / "intervals.json"))
+    saved = read_intervals(str(tmp_path / "intervals.json"))
+    assert saved["converged"] and saved["half_width"] == half_width and len(saved["series"]) == stopped
+
+
+def test_half_width_covers_rate():
+    rng = random.Random(1)
+    covered = 0
+    for _ in range(200):
+        tracker = Tracker("missRate", tolerance=0, min_intervals=10)
+        feed(tracker, rng, 10)
+        estimate, half_width = tracker.estimate()
+        assert 0 < half_width < math.inf
+        covered += abs(estimate - RATE) <= half_width
+    # a 95% interval
+    assert 0.88 <= covered / 200 <= 0.99
@@ -0,0 +1,25 @@
+import sqlite3
+
+import numpy as np
+
+from sweep import cost
+from sweep.store import quote, sql_ceil_log2
+
+
+def test_ceil_log2_exact():
+    n = [1, 2, 3, 4, 5, 1023, 1024, 1025, 2 ** 53 + 1, 2 ** 60, 2 ** 60 + 1, 2 ** 63 - 1]
+    assert cost.ceil_log2(n).tolist() == [(v - 1).bit_length() for v in n]
+    assert [sql_ceil_log2(v) for v in [None, 0, 2 ** 60]] == [None, None, 60]
+
+
+def test_sql_bits_match_bits():
+    rng = np.random.default_rng(0)
+    db = sqlite3.connect(":memory:")
+    db.create_function("ceil_log2", 1, sql_ceil_log2, deterministic=True)
+    for structure, names in cost.PARAMS.items():
+        columns = {name: rng.integers(1, 1 << 16, size=50) for name in names}
+        db.execute(f"CREATE TABLE {structure} ({', '.join(quote(n) for n in names)})")
+        db.executemany(f"INSERT INTO {structure} VALUES ({', '.join('?' * len(names))})",
+                       zip(*(columns[n].tolist() for n in names)))
+        found = [row[0] for row in db.execute(f"SELECT {cost.SQL_BITS[structure]} FROM {structure} ORDER BY rowid")]
+        assert found == cost.storage_bits(structure, columns).tolist(), structure
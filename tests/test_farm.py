@@ -0,0 +1,127 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+from conftest import FAKE_GEM5, REPO_ROOT
+from sweep import farm
+from sweep.logparse import iter_runs
+from sweep.results import read_records
+
+POINTS = ["custom", "--param", "rasNumEntries=1,2,4", "--gem5", FAKE_GEM5, "--store", ""]
+
+
+def farm_command(*args):
+    return [sys.executable, "-m", "sweep.farm", *args]
+
+
+def farm_env(**extra):
+    return {**os.environ, "PYTHONPATH": REPO_ROOT, **extra}
+
+
+def test_spawned_workers(sweep_dir, gem5_paths):
+    assert farm.main(["coordinator", *POINTS, *gem5_paths, "--spawn", "2", "--host", "127.0.0.1", "--port", "0"]) == 0
+    runs = list(iter_runs("log.txt"))
+    assert sorted(run.params["rasNumEntries"] for run in runs) == [1, 2, 4]
+    assert not any(run.failed for run in runs)
+    with sqlite3.connect("farm.db") as db:
+        assert db.execute("SELECT state, COUNT(*) FROM points GROUP BY state").fetchall() == [("done", 3)]
+
+
+def test_lease_expiry(tmp_path):
+    queue = farm.WorkQueue(str(tmp_path / "farm.db"), lease_seconds=0.1, max_attempts=2)
+    queue.add([{"rasNumEntries": 1}], "RUNNING {rasNumEntries}", [])
+    first = queue.lease("a")
+    assert queue.lease("b") is None
+    time.sleep(0.2)
+    # the lease ran out: the point goes to the next worker, and a's renewal fails
+    second = queue.lease("b")
+    assert second["id"] == first["id"] and second["attempt"] == 2
+    assert not queue.renew(first["id"], "a")
+    time.sleep(0.2)
+    assert queue.expire() == 1
+    assert queue.counts()["lost"] == 1
+    (_, result), = queue.unrecorded()
+    assert result["returncode"] == -1
+
+
+def test_dead_worker(sweep_dir, gem5_paths):
+    coordinator = subprocess.Popen(farm_command("coordinator", *POINTS, "--lease", "1", "--host", "127.0.0.1",
+                                                "--port", "0"),
+                                   stdout=subprocess.PIPE, text=True, env=farm_env())
+    try:
+        url = next(line.split()[-1] for line in coordinator.stdout if "listening on" in line)
+        victim = subprocess.Popen(farm_command("worker", url, "--name", "victim", "--gem5", FAKE_GEM5, *gem5_paths),
+                                  stdout=subprocess.DEVNULL, env=farm_env(FAKE_GEM5_SLEEP="60"))
+        deadline = time.time() + 30
+        while "victim:0" not in farm.call(url, "/status")["workers"]:
+            assert time.time() < deadline
+            time.sleep(0.2)
+        victim.kill()
+        victim.wait()
+        rescue = subprocess.run(farm_command("worker", url, "--name", "rescue", "--gem5", FAKE_GEM5, *gem5_paths,
+                                             "--poll", "0.5", "--patience", "5"),
+                                stdout=subprocess.DEVNULL, env=farm_env(), timeout=60)
+        assert rescue.returncode == 0
+        coordinator.communicate(timeout=30)
+    finally:
+        coordinator.kill()
+    assert coordinator.returncode == 0
+    with sqlite3.connect("farm.db") as db:
+        rows = db.execute("SELECT state, attempts, worker FROM points ORDER BY id").fetchall()
+    assert [state for state, _, _ in rows] == ["done"] * 3
+    assert {worker for _, _, worker in rows} == {"rescue:0"}
+    # the victim's point was leased again after its lease expired
+    assert sorted(attempts for _, attempts, _ in rows) == [1, 1, 2]
+    assert not any(run.failed for run in iter_runs("log.txt"))
+
+
+def test_preflight(sweep_dir, gem5_paths, capsys):
+    grid = ["custom", "--param", "btbAssociativity=1,8", "--param", "btbNumEntries=4", "--gem5", FAKE_GEM5,
+            "--store", "", "--host", "127.0.0.1", "--port", "0"]
+    # the default config script needs gem5's configs/common, which is not here
+    assert farm.main(["coordinator", *grid, "--spawn", "1", "--binary", gem5_paths[-1]]) == 1
+    assert "imports common" in capsys.readouterr().err
+    assert farm.main(["coordinator", *grid, *gem5_paths, "--spawn", "1"]) == 0
+    assert "btbAssociativity=N > btbNumEntries=N" in capsys.readouterr().out
+    assert [run.params for run in iter_runs("log.txt")] == [{"btbAssociativity": 1, "btbNumEntries": 4}]
+
+
+def test_fail_fast(sweep_dir, gem5_paths, monkeypatch, capsys):
+    monkeypatch.setenv("FAKE_GEM5_CRASH", "ModuleNotFoundError: No module named 'common'")
+    # slow enough that the coordinator sees the first failures before the last point is leased
+    monkeypatch.setenv("FAKE_GEM5_SLEEP", "0.5")
+    grid = ["custom", "--param", "rasNumEntries=1,2,3,4,5,6,7,8", "--gem5", FAKE_GEM5, *gem5_paths, "--store", "",
+            "--host", "127.0.0.1", "--port", "0", "--spawn", "1", "--fail-fast", "2"]
+    assert farm.main(["coordinator", *grid]) == 1
+    out = capsys.readouterr().out
+    assert "ModuleNotFoundError: No module named 'common'" in out
+    with sqlite3.connect("farm.db") as db:
+        states = dict(db.execute("SELECT state, COUNT(*) FROM points GROUP BY state").fetchall())
+    assert states["done"] >= 2 and states["cancelled"] > 0 and states["done"] + states["cancelled"] == 8
+    # the next run of the same command takes the cancelled points up again
+    monkeypatch.delenv("FAKE_GEM5_CRASH")
+    monkeypatch.setenv("FAKE_GEM5_SLEEP", "0.05")
+    assert farm.main(["coordinator", *grid]) == 0
+    with sqlite3.connect("farm.db") as db:
+        assert db.execute("SELECT COUNT(*) FROM points WHERE state = 'done'").fetchone() == (8,)
+
+
+def test_workload_options(sweep_dir, gem5_paths):
+    (sweep_dir / "ckpt").mkdir()
+    (sweep_dir / "ckpt" / "m5.cpt").write_text("")
+    grid = [*POINTS, *gem5_paths, "--spawn", "1", "--host", "127.0.0.1", "--port", "0", "--results", "results.jsonl"]
+    assert farm.main(["coordinator", *grid]) == 0
+    run = ["--checkpoint", "ckpt", "--max-insts", "1000", "--kernel-args", "-n 2",
+           "--keep-stat", "system.cpu.branchPred."]
+    # another workload of the same points is queued again, not taken as done
+    assert farm.main(["coordinator", *grid, *run, "--no-clear-log"]) == 0
+    with open("log.txt") as f:
+        log = f.read()
+    assert log.count("--workloadArgs=-n 2") == 3 and log.count("--maxInsts=1000") == 3
+    records = read_records("results.jsonl")
+    assert len(records) == 6
+    pruned = [r for r in records if r.get("workload")]
+    assert len(pruned) == 3 and all(r["workload"]["workloadArgs"] == "-n 2" for r in pruned)
+    assert all(not any(name.startswith("sim") for name in r["stats"]) for r in pruned)
@@ -0,0 +1,12 @@
+from sweep.logparse import read_stats_file
+
+
+def test_stat_lines_of_last_dump(tmp_path):
+    dump = ("\n---------- Begin Simulation Statistics ----------\n"
+            "simInsts                                 {0}                       # Number of instructions (Count)\n"
+            "\n---------- End Simulation Statistics   ----------\n")
+    path = tmp_path / "stats.txt"
+    path.write_text(dump.format(100) + dump.format(200) + dump.format(300))
+    stats, lines = read_stats_file(str(path), ["simInsts"])
+    assert stats["simInsts"] == 300
+    assert len(lines) == 1 and lines[0].split()[1] == "300"
@@ -0,0 +1,58 @@
+import os
+
+from sweep import logstore, synthlog
+from sweep.logparse import iter_runs
+from sweep.logstore import DICT, RunLog, RunLogWriter, split_blocks
+from sweep.watch import LogTail
+
+
+def synthetic_blocks(tmp_path, size=60000):
+    path = tmp_path / "log.txt"
+    synthlog.generate(str(path), "btb", size, crash_rate=0.2, seed=3)
+    with open(path) as f:
+        return path, list(split_blocks(f))
+
+
+def test_pack_round_trip(tmp_path):
+    path, _ = synthetic_blocks(tmp_path)
+    packed = tmp_path / "log.runs"
+    assert logstore.main(["pack", str(path), str(packed)]) == 0
+    assert sum(1 for _ in RunLog(str(packed)).frames(kinds=(DICT,))) >= 1
+    assert os.path.getsize(packed) < os.path.getsize(path) / 3
+    unpacked = tmp_path / "unpacked.txt"
+    assert logstore.main(["unpack", str(packed), str(unpacked)]) == 0
+    assert unpacked.read_bytes() == path.read_bytes()
+    assert [r.params for r in iter_runs(str(packed))] == [r.params for r in iter_runs(str(path))]
+
+
+def test_partial_frame(tmp_path):
+    _, blocks = synthetic_blocks(tmp_path)
+    runs = tmp_path / "log.runs"
+    with RunLogWriter(str(runs)) as writer:
+        writer.write("".join(blocks[:-1]))
+    complete = runs.read_bytes()
+    with RunLogWriter(str(runs)) as writer:
+        writer.write(blocks[-1])
+    whole = runs.read_bytes()
+    # the writer was interrupted in the middle of the last frame
+    runs.write_bytes(whole[:len(complete) + (len(whole) - len(complete)) // 2])
+    assert "".join(text for _, text in RunLog(str(runs)).blocks()) == "".join(blocks[:-1])
+    assert [text for _, text, _ in RunLog(str(runs)).follow()] == blocks[:-1]
+
+
+def test_watch_runs_log(tmp_path):
+    path, blocks = synthetic_blocks(tmp_path)
+    runs = str(tmp_path / "log.runs")
+    half = len(blocks) // 2
+    with RunLogWriter(runs) as writer:
+        writer.write("".join(blocks[:half]))
+    first, _ = LogTail(runs).poll()
+    with RunLogWriter(runs) as writer:
+        writer.write("".join(blocks[half:]))
+    # a new watcher resumes from the persisted frame offset
+    tail = LogTail(runs)
+    second, restarted = tail.poll()
+    assert not restarted
+    assert [r.header for r in first + second] == [r.header for r in iter_runs(str(path))]
+    assert len(tail.records()) == len(first + second)
+    assert tail.poll() == ([], False)
@@ -0,0 +1,57 @@
+import random
+
+import numpy as np
+
+from sweep.ras import CALLS, excursion_histogram, hit_rates, matches
+from sweep.replay import BRANCH_TYPES, RETURN
+
+CALL = BRANCH_TYPES.index("CallDirect")
+
+
+def circular_buffer(pc, target, kind, entries):
+    """
+    gem5's RAS: a call writes at tos + 1, a return reads at tos and moves
+    tos down, both wrapping around entries. Returns (correct, used).
+    """
+    slots = [None] * entries
+    tos = correct = used = 0
+    for p, t, k in zip(pc, target, kind):
+        if k in CALLS:
+            tos = (tos + 1) % entries
+            slots[tos] = p
+        elif k == RETURN:
+            used += 1
+            correct += slots[tos] is not None and matches(slots[tos], t)
+            tos = (tos - 1) % entries
+    return correct, used
+
+
+def random_trace(n=3000, seed=2):
+    """
+    Calls and returns of a few call sites with recursion, starting inside a
+    few frames no call of the trace pushed.
+    """
+    rng = random.Random(seed)
+    sites = [0x2000 + 8 * i for i in range(6)]
+    stack = [rng.choice(sites) for _ in range(3)]
+    pc, target, kind = [], [], []
+    for _ in range(n):
+        if stack and (rng.random() < 0.45 or len(stack) > 40):
+            pc.append(0x9000)
+            target.append(stack.pop() + rng.choice([2, 4]))
+            kind.append(RETURN)
+        else:
+            site = stack[-1] if stack and rng.random() < 0.3 else rng.choice(sites)
+            pc.append(site)
+            target.append(0x5000)
+            kind.append(CALL)
+            stack.append(site)
+    return np.array(pc), np.array(target), np.array(kind)
+
+
+def test_rates_match_circular_buffer():
+    pc, target, kind = random_trace()
+    hist, extra, returns, max_depth = excursion_histogram(pc, target, kind)
+    assert max_depth > 8
+    for n, correct, used in hit_rates(hist, extra, returns, max_depth + 2):
+        assert (correct, used) == circular_buffer(pc.tolist(), target.tolist(), kind.tolist(), n), n
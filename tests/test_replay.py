@@ -0,0 +1,131 @@
+import random
+
+import numpy as np
+
+from sweep.replay import (BRANCH_TYPES, DIRECT_COND, UNCONDITIONAL, load_trace, replay_local,
+                          replay_tournament)
+
+LOCAL_CONFIGS = [(16, 2), (64, 2), (64, 4), (256, 8), (48, 2), (16, 9)]
+TOURNEY_CONFIGS = [
+    {"localPredictorSize": 64, "localCtrBits": 2, "globalPredictorSize": 256, "globalCtrBits": 2,
+     "choicePredictorSize": 256, "choiceCtrBits": 2, "localHistoryTableSize": 64},
+    {"localPredictorSize": 16, "localCtrBits": 3, "globalPredictorSize": 64, "globalCtrBits": 4,
+     "choicePredictorSize": 1024, "choiceCtrBits": 1, "localHistoryTableSize": 8},
+    {"localPredictorSize": 256, "localCtrBits": 4, "globalPredictorSize": 32, "globalCtrBits": 2,
+     "choicePredictorSize": 16, "choiceCtrBits": 3, "localHistoryTableSize": 128},
+    {"localPredictorSize": 100, "localCtrBits": 2, "globalPredictorSize": 256, "globalCtrBits": 2,
+     "choicePredictorSize": 256, "choiceCtrBits": 2, "localHistoryTableSize": 64},
+]
+
+
+def random_trace(n=3000, seed=1):
+    """
+    Branches of a few dozen PCs, each biased its own way, with calls, jumps
+    and returns in between.
+    """
+    rng = random.Random(seed)
+    pcs = [0x10000 + 4 * rng.randrange(512) for _ in range(40)]
+    bias = {pc: rng.random() for pc in pcs}
+    pc, taken, kind = [], [], []
+    for _ in range(n):
+        p = rng.choice(pcs)
+        k = DIRECT_COND if rng.random() < 0.7 else rng.choice(UNCONDITIONAL + [BRANCH_TYPES.index("IndirectCond")])
+        pc.append(p)
+        taken.append(k in UNCONDITIONAL or rng.random() < bias[p])
+        kind.append(k)
+    return np.array(pc, dtype=np.uint64), np.array(taken, dtype=bool), np.array(kind, dtype=np.uint8)
+
+
+def ceil_log2(n):
+    bits = 0
+    while (1 << bits) < n:
+        bits += 1
+    return bits
+
+
+def reference_local(pc, taken, kind, size, bits):
+    """
+    LocalBP of 2bit_local.cc, one branch at a time.
+    """
+    sets = size // bits
+    counters = [0] * sets
+    misses = 0
+    for p, t, k in zip(pc.tolist(), taken.tolist(), kind.tolist()):
+        if k != DIRECT_COND:
+            continue
+        i = (p >> 2) & (sets - 1)
+        misses += (counters[i] >> (bits - 1)) != t
+        counters[i] = min(counters[i] + 1, (1 << bits) - 1) if t else max(counters[i] - 1, 0)
+    return misses
+
+
+def reference_tournament(pc, taken, kind, config):
+    """
+    TournamentBP of tournament.cc, one branch at a time: conditional branches
+    are predicted and trained, every branch shifts the global history.
+    """
+    local_size, global_size = config["localPredictorSize"], config["globalPredictorSize"]
+    choice_size, lht_size = config["choicePredictorSize"], config["localHistoryTableSize"]
+    local_bits, global_bits = config["localCtrBits"], config["globalCtrBits"]
+    choice_bits = config["choiceCtrBits"]
+    local_ctrs, global_ctrs = [0] * local_size, [0] * global_size
+    choice_ctrs, local_hist = [0] * choice_size, [0] * lht_size
+    local_hist_mask = (1 << ceil_log2(local_size)) - 1
+    global_hist_mask = (1 << ceil_log2(max(global_size, choice_size))) - 1
+    history = 0
+    misses = 0
+
+    def train(ctrs, i, t, bits):
+        ctrs[i] = min(ctrs[i] + 1, (1 << bits) - 1) if t else max(ctrs[i] - 1, 0)
+
+    for p, t, k in zip(pc.tolist(), taken.tolist(), kind.tolist()):
+        if k == DIRECT_COND:
+            lht = (p >> 2) & (lht_size - 1)
+            local_i = local_hist[lht] & (local_size - 1)
+            global_i, choice_i = history & (global_size - 1), history & (choice_size - 1)
+            local_pred = local_ctrs[local_i] > (1 << (local_bits - 1)) - 1
+            global_pred = global_ctrs[global_i] > (1 << (global_bits - 1)) - 1
+            use_global = choice_ctrs[choice_i] > (1 << (choice_bits - 1)) - 1
+            misses += (global_pred if use_global else local_pred) != t
+            if local_pred != global_pred:
+                train(choice_ctrs, choice_i, global_pred == t, choice_bits)
+            train(global_ctrs, global_i, t, global_bits)
+            train(local_ctrs, local_i, t, local_bits)
+            local_hist[lht] = ((local_hist[lht] << 1) | t) & local_hist_mask
+        history = ((history << 1) | t) & global_hist_mask
+    return misses
+
+
+def test_replay_local_matches_reference():
+    pc, taken, kind = random_trace()
+    misses = replay_local(pc, taken, LOCAL_CONFIGS, kind)
+    for (size, bits), miss in zip(LOCAL_CONFIGS, misses):
+        if (size, bits) in [(48, 2), (16, 9)]:
+            assert miss is None
+        else:
+            assert miss == reference_local(pc, taken, kind, size, bits)
+
+
+def test_replay_tournament_matches_reference():
+    pc, taken, kind = random_trace()
+    misses = replay_tournament(pc, taken, TOURNEY_CONFIGS, kind)
+    assert misses[3] is None
+    for config, miss in zip(TOURNEY_CONFIGS[:3], misses):
+        assert miss == reference_tournament(pc, taken, kind, config)
+
+
+def test_unconditional_branches_shift_global_history():
+    pc, taken, kind = random_trace()
+    cond = kind == DIRECT_COND
+    with_history = replay_tournament(pc, taken, TOURNEY_CONFIGS[:1], kind)
+    without = replay_tournament(pc[cond], taken[cond], TOURNEY_CONFIGS[:1])
+    assert with_history != without
+
+
+def test_load_trace_marks_unconditional_taken(tmp_path):
+    path = tmp_path / "trace.txt"
+    path.write_text("0x100 1 DirectCond\n0x104 0 CallDirect\n0x108 0 IndirectCond\n0x10c 1 NoBranch\n")
+    pc, taken, kind = load_trace(str(path))
+    assert pc.tolist() == [0x100, 0x104, 0x108]
+    assert taken.tolist() == [True, True, False]
+    assert [BRANCH_TYPES[k] for k in kind] == ["DirectCond", "CallDirect", "IndirectCond"]
@@ -0,0 +1,97 @@
+import time
+
+from conftest import FAKE_GEM5
+from sweep import runner
+from sweep.logparse import iter_runs
+from sweep.results import read_records
+from sweep.store import ResultStore
+
+SWEEP = ["custom", "--param", "rasNumEntries=1,2,4", "--gem5", FAKE_GEM5, "--no-preflight", "--jobs", "2"]
+
+
+def test_sweep(sweep_dir):
+    assert runner.main(SWEEP) == 0
+    runs = list(iter_runs("log.txt"))
+    assert sorted(run.params["rasNumEntries"] for run in runs) == [1, 2, 4]
+    assert not any(run.failed for run in runs)
+    assert len(read_records("results.jsonl")) == 3
+    with ResultStore("results.db") as store:
+        assert len(store.query()) == 3
+
+
+def test_cached_rerun(sweep_dir, monkeypatch, capsys):
+    assert runner.main(SWEEP) == 0
+    capsys.readouterr()
+    # a gem5 run now would fail, so every point must come from the cache
+    monkeypatch.setenv("FAKE_GEM5_CRASH", "fatal: gem5 must not run")
+    assert runner.main(SWEEP) == 0
+    assert capsys.readouterr().out.count("(cached)") == 3
+    assert not any(run.failed for run in iter_runs("log.txt"))
+
+
+def test_crash(sweep_dir, monkeypatch):
+    monkeypatch.setenv("FAKE_GEM5_CRASH", "ModuleNotFoundError: No module named 'common'")
+    assert runner.main(SWEEP + ["--no-cache"]) == 1
+    runs = list(iter_runs("log.txt"))
+    assert runs and all(run.failed for run in runs)
+    assert runs[0].error == "ModuleNotFoundError: No module named 'common'"
+
+
+def test_per_process_group(sweep_dir):
+    assert runner.main(SWEEP + ["--per-process", "3", "--no-cache"]) == 0
+    assert sorted(run.params["rasNumEntries"] for run in iter_runs("log.txt")) == [1, 2, 4]
+    records = {r["params"]["rasNumEntries"]: r for r in read_records("results.jsonl")}
+    correct = runner.grids.RAS_STATS[0]
+    assert records[1]["stats"][correct] < records[4]["stats"][correct]
+    # each point's own instructions, not the sum over the group's systems
+    assert records[1]["stats"]["simInsts"] == 9046553
+
+
+
+def test_mem_budget_without_history(sweep_dir, monkeypatch, capsys):
+    monkeypatch.setenv("FAKE_GEM5_SLEEP", "0.3")
+    start = time.monotonic()
+    # room for one point of the default size at a time
+    assert runner.main(SWEEP + ["--jobs", "3", "--mem-budget", "3", "--no-cache", "--schedule", "fifo"]) == 0
+    assert time.monotonic() - start >= 0.9
+    assert "every point counts as 2 GiB" in capsys.readouterr().out
+
+
+def test_runs_log(sweep_dir):
+    assert runner.main(SWEEP + ["--log", "log.runs", "--per-process", "2"]) == 0
+    runs = list(iter_runs("log.runs"))
+    assert sorted(run.params["rasNumEntries"] for run in runs) == [1, 2, 4]
+    assert not any(run.failed for run in runs)
+
+
+def test_workloads_recorded_apart(sweep_dir):
+    assert runner.main(SWEEP) == 0
+    assert runner.main(SWEEP + ["--kernel-args", "-n 4"]) == 0
+    records = read_records("results.jsonl")
+    assert len(records) == 6
+    assert sorted(r.get("workload", {}).get("workloadArgs", "") for r in records) == [""] * 3 + ["-n 4"] * 3
+
+
+def test_pruned_stats_cached_apart(sweep_dir, capsys):
+    assert runner.main(SWEEP + ["--keep-stat", "system.cpu.branchPred.ras"]) == 0
+    capsys.readouterr()
+    assert runner.main(SWEEP) == 0
+    assert "(cached)" not in capsys.readouterr().out
+    assert not any(run.failed for run in iter_runs("log.txt"))
+    assert all("system.cpu.numCycles" in r["stats"] for r in read_records("results.jsonl"))
+    assert runner.main(SWEEP + ["--keep-stat", "system.cpu.branchPred.ras"]) == 0
+    assert capsys.readouterr().out.count("(cached)") == 3
+
+
+def test_parallel_points_own_outdirs(sweep_dir, monkeypatch):
+    monkeypatch.setenv("FAKE_GEM5_SLEEP", "0.4")
+    points = ["custom", "--param", "rasNumEntries=1,2,4,8", "--gem5", FAKE_GEM5, "--no-preflight", "--no-cache"]
+    start = time.monotonic()
+    assert runner.main(points + ["--jobs", "2", "--outdir", "out"]) == 0
+    elapsed = time.monotonic() - start
+    # two at a time: two rounds of 0.4 s, not one and not four
+    assert 0.8 <= elapsed < 1.6
+    for size in (1, 2, 4, 8):
+        assert (sweep_dir / "out" / f"rasNumEntries-{size}" / "stats.txt").exists()
+    with open("log.txt") as f:
+        assert f.read().count(runner.SEPARATOR) == 4
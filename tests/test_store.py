@@ -0,0 +1,26 @@
+from sweep import cost
+from sweep.store import ResultStore
+
+
+def test_derived_bytes(tmp_path):
+    points = [{"predictor": "tournament", "localPredictorSize": size, "localCtrBits": bits,
+               "globalPredictorSize": 4096, "choicePredictorSize": 1024, "localHistoryTableSize": 1000}
+              for size in (64, 100, 4096) for bits in (1, 2)]
+    with ResultStore(str(tmp_path / "results.db")) as store:
+        for point in points:
+            store.add(point, {"simInsts": 1})
+        rows = store.query("tourney_bytes < ?", args=(2100,), order_by="tourney_bytes")
+    expected = sorted(b for b in (cost.point_bytes("tournament", {**store.defaults, **p}) for p in points) if b < 2100)
+    assert expected and [row["tourney_bytes"] for row in rows] == expected
+    assert all(row["local_bytes"] == row["localPredictorSize"] * row["localCtrBits"] / 8 for row in rows)
+
+
+def test_workloads_stored_apart(tmp_path):
+    point = {"predictor": "local", "localPredictorSize": 1024, "localCtrBits": 2}
+    with ResultStore(str(tmp_path / "results.db")) as store:
+        store.add(point, {"simInsts": 1})
+        store.add(point, {"simInsts": 2}, workload={"graph": "abc123", "checkpoint": "def456:1:0:0"})
+        store.add(point, {"simInsts": 3}, workload={"graph": "abc123", "checkpoint": "def456:1:0:0"})
+        rows = store.query(stats=["simInsts"], order_by="simInsts")
+    assert [(row["graph"], row["checkpoint"], row["simInsts"]) for row in rows] == [
+        ("", None, 1), ("abc123", "def456:1:0:0", 3)]
@@ -0,0 +1,67 @@
+from sweep.replay import BRANCH_TYPES
+from sweep.trace import TraceReader, TraceWriter, classify, convert_exec_trace
+
+# ExeTracer output of an rv64gc binary (--debug-flags=ExecAll), compressed
+# instructions as gem5's decoder names them
+EXEC_TRACE = """\
+ 100000: system.cpu: T0 : 0x100fe @main+2      :   c_addi sp, -16       : IntAlu :  D=0x000000000007fff0  flags=(IsInteger|IsCompressed)
+ 100500: system.cpu: T0 : 0x10100 @main+4      :   c_beqz a0, 8         : IntAlu :   flags=(IsInteger|IsControl|IsDirectControl|IsCondControl|IsCompressed)
+ 101000: system.cpu: T0 : 0x10108 @main+12     :   c_bnez a1, 20        : IntAlu :   flags=(IsInteger|IsControl|IsDirectControl|IsCondControl|IsCompressed)
+ 101500: system.cpu: T0 : 0x1010a @main+14     :   c_j 6                : IntAlu :   flags=(IsInteger|IsControl|IsDirectControl|IsUncondControl|IsCompressed)
+ 102000: system.cpu: T0 : 0x10110 @main+20     :   jal ra, 100          : IntAlu :  D=0x0000000000010114  flags=(IsInteger|IsControl|IsDirectControl|IsUncondControl|IsCall)
+ 102500: system.cpu: T0 : 0x10174 @foo         :   c_jr 0(ra)           : IntAlu :   flags=(IsInteger|IsControl|IsIndirectControl|IsUncondControl|IsReturn|IsCompressed)
+ 103000: system.cpu: T0 : 0x10114 @main+24     :   bne a0, zero, 16     : IntAlu :   flags=(IsInteger|IsControl|IsDirectControl|IsCondControl)
+ 103500: system.cpu: T0 : 0x10118 @main+28     :   c_jalr 0(a5)         : IntAlu :  D=0x000000000001011a  flags=(IsInteger|IsControl|IsIndirectControl|IsUncondControl|IsCall|IsCompressed)
+ 104000: system.cpu: T0 : 0x10200 @bar         :   c_li a0, 0           : IntAlu :  D=0x0000000000000000  flags=(IsInteger|IsCompressed)
+"""
+
+
+class Recorder:
+    def __init__(self):
+        self.branches = []
+
+    def write(self, pc, target, taken, kind):
+        self.branches.append((pc, target, taken, BRANCH_TYPES[kind]))
+
+
+def test_classify_compressed():
+    assert BRANCH_TYPES[classify("c_beqz", "a0, 8")] == "DirectCond"
+    assert BRANCH_TYPES[classify("c_bnez", "a1, 20")] == "DirectCond"
+    assert BRANCH_TYPES[classify("c_j", "6")] == "DirectUncond"
+    assert BRANCH_TYPES[classify("c_jal", "100")] == "CallDirect"
+    assert BRANCH_TYPES[classify("c_jr", "0(ra)")] == "Return"
+    assert BRANCH_TYPES[classify("c_jr", "0(a5)")] == "IndirectUncond"
+    assert BRANCH_TYPES[classify("c_jalr", "0(a5)")] == "CallIndirect"
+    assert classify("c_addi", "sp, -16") is None
+
+
+def test_classify_full_size():
+    assert BRANCH_TYPES[classify("jal", "ra, 100")] == "CallDirect"
+    assert BRANCH_TYPES[classify("jal", "zero, 100")] == "DirectUncond"
+    assert BRANCH_TYPES[classify("jalr", "ra, 0(a5)")] == "CallIndirect"
+    assert BRANCH_TYPES[classify("jalr", "0(ra)")] == "Return"
+
+
+def test_convert_exec_trace():
+    recorder = Recorder()
+    assert convert_exec_trace(EXEC_TRACE.splitlines(), recorder) == 7
+    assert recorder.branches == [
+        (0x10100, 0x10108, True, "DirectCond"),
+        # a 2-byte branch falling through is not taken
+        (0x10108, 0x1010a, False, "DirectCond"),
+        (0x1010a, 0x10110, True, "DirectUncond"),
+        (0x10110, 0x10174, True, "CallDirect"),
+        (0x10174, 0x10114, True, "Return"),
+        (0x10114, 0x10118, False, "DirectCond"),
+        (0x10118, 0x10200, True, "CallIndirect"),
+    ]
+
+
+def test_trace_round_trip(tmp_path):
+    path = str(tmp_path / "branches.trace")
+    with TraceWriter(path, compress=True) as writer:
+        convert_exec_trace(EXEC_TRACE.splitlines(), writer)
+    pc, taken, kind, target = TraceReader(path).arrays()
+    assert [int(p) for p in pc] == [0x10100, 0x10108, 0x1010a, 0x10110, 0x10174, 0x10114, 0x10118]
+    assert [bool(t) for t in taken] == [True, False, True, True, True, False, True]
+    assert int(target[-1]) == 0x10200
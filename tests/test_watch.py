@@ -0,0 +1,59 @@
+from sweep import synthlog
+from sweep.logparse import iter_runs
+from sweep.logstore import split_blocks
+from sweep.watch import LogTail, complete_length
+
+
+def log_blocks(tmp_path, sweep, size=6000):
+    path = tmp_path / f"{sweep}.txt"
+    synthlog.generate(str(path), sweep, size, crash_rate=0.3, seed=4)
+    with open(path) as f:
+        return [block.encode() for block in split_blocks(f)]
+
+
+def parse(data):
+    return list(iter_runs(data.decode().splitlines(True)))
+
+
+def complete_prefix(blocks, cut):
+    """
+    Length of the whole blocks in the first cut bytes: a block is complete
+    once the next separator is there, or once its stats have been followed
+    by the blank line.
+    """
+    end = length = 0
+    for i, block in enumerate(blocks):
+        end += len(block)
+        if end > cut:
+            break
+        finished = block.endswith(b"\n\n") and any(not run.failed for run in parse(block))
+        if finished or (i + 1 < len(blocks) and cut >= end + len(b"####")):
+            length = end
+    return length
+
+
+def test_partial_blocks_skipped(tmp_path):
+    for sweep in ("btb", "tourney"):
+        blocks = log_blocks(tmp_path, sweep)
+        data = b"".join(blocks)
+        runs = parse(data)
+        for cut in range(len(data) + 1):
+            length = complete_length(data[:cut])
+            assert length == complete_prefix(blocks, cut), (sweep, cut)
+            # the runs of the complete prefix are those of the whole log
+            parsed = parse(data[:length])
+            assert parsed == runs[:len(parsed)], (sweep, cut)
+
+
+def test_tail_waits_for_block_end(tmp_path):
+    blocks = log_blocks(tmp_path, "btb")
+    path = tmp_path / "log.txt"
+    tail = LogTail(str(path))
+    written, found = b"", []
+    for block in blocks:
+        # every block arrives in two writes, the first one cut inside it
+        for part in (block[:len(block) // 3], block[len(block) // 3:]):
+            written += part
+            path.write_bytes(written)
+            found.extend(tail.poll()[0])
+    assert [r.header for r in found] == [r.header for r in iter_runs(str(path))]
@@ -1,11 +1,10 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
+import os
+import sys
 
-# 1) Read Sheet2 from the Excel file
-#    If your file is named differently, change "tourney.xlsx" accordingly.
-#    If the first row is indeed the header row, use header=0.
-df = pd.read_excel("salvaaa.xlsx", sheet_name="Sheet1", header=0)
+# make the shared sweep package (repository root) importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from sweep.report import finish_figure
+from sweep.store import COMMITTED, MISPREDICTED, STORE_FILE, ResultStore
 
 # 2) If the columns in your sheet differ from these,
 #    either rename them here or update the code below accordingly.
@@ -34,36 +33,97 @@ expected_cols = [
 # }
 # df.rename(columns=rename_map, inplace=True)
 
-print("Columns found in Excel:", df.columns.tolist())
+TOURNEY_PARAMS = expected_cols[:7]
 
-# 3) Drop any completely empty rows (just in case)
-df.dropna(how="all", inplace=True)
+# the spreadsheet the plots were made from before the results store
+SHEET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "salvaaa.xlsx")
 
-# 4) Convert the relevant columns to numeric
-for col in expected_cols:
-    if col in df.columns:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
+def load_runs(path=STORE_FILE, verbose=False):
+    """
+    Tournament runs of the results store (see sweep/store.py) with equal
+    local, global and choice predictor sizes, sorted by total size, with the
+    columns of the old spreadsheet.
+    """
+    import pandas as pd
 
-# Drop Columns where localPredictorSize is different than globalPredictorSize or choicePredictorSize
-df = df[df["localPredictorSize"] == df["globalPredictorSize"]]
-df = df[df["localPredictorSize"] == df["choicePredictorSize"]]
+    # opening a missing store would create an empty one and plot nothing
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"no results store {path}; run a sweep with sweep.runner or import the old "
+                                f"spreadsheet with: python -m sweep.store --store {path} "
+                                f"import-sheet tournamentBP/salvaaa.xlsx")
+    with ResultStore(path) as store:
+        rows = store.query("predictor = 'tournament' AND localPredictorSize = globalPredictorSize"
+                           " AND localPredictorSize = choicePredictorSize",
+                           stats={"COMMITED": COMMITTED, "MISS": MISPREDICTED},
+                           order_by="tourney_bytes")
+    df = pd.DataFrame([{**{c: row[c] for c in TOURNEY_PARAMS}, "COMMITED": row["COMMITED"], "MISS": row["MISS"],
+                        "Total Size (Bytes)": row["tourney_bytes"]}
+                       for row in rows if row["COMMITED"] and row["MISS"] is not None],
+                      columns=TOURNEY_PARAMS + ["COMMITED", "MISS", "Total Size (Bytes)"])
+    df["MISS Rate"] = df["MISS"] / df["COMMITED"] * 100
+    if verbose:
+        print(f"{len(df)} tournament runs in {path}")
+    return df
 
-# 5) Remove rows that are missing essential data for plotting
-df.dropna(subset=["MISS Rate", "Total Size (Bytes)"], inplace=True)
+def load_table(path):
+    """
+    load_runs for a results store, load_sheet for an old .xlsx spreadsheet.
+    """
+    return load_sheet(path) if path.endswith(".xlsx") else load_runs(path)
 
-# Sort the DataFrame by Total Size for better plotting
-df.sort_values("Total Size (Bytes)", inplace=True)
+def load_sheet(path="salvaaa.xlsx", verbose=False):
+    import pandas as pd
+
+    # 1) Read Sheet1 from the Excel file
+    #    If your file is named differently, change "salvaaa.xlsx" accordingly.
+    #    If the first row is indeed the header row, use header=0.
+    df = pd.read_excel(path, sheet_name="Sheet1", header=0)
+    if verbose:
+        print("Columns found in Excel:", df.columns.tolist())
+
+    # 3) Drop any completely empty rows (just in case)
+    df.dropna(how="all", inplace=True)
+
+    # 4) Convert the relevant columns to numeric
+    for col in expected_cols:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+
+    # Drop Columns where localPredictorSize is different than globalPredictorSize or choicePredictorSize
+    df = df[df["localPredictorSize"] == df["globalPredictorSize"]]
+    df = df[df["localPredictorSize"] == df["choicePredictorSize"]]
+
+    # 5) Remove rows that are missing essential data for plotting
+    df = df.dropna(subset=["MISS Rate", "Total Size (Bytes)"])
+
+    # Sort the DataFrame by Total Size for better plotting
+    return df.sort_values("Total Size (Bytes)")
 
 # 7) Plot MISS Rate vs. log2(Total Size)
-plt.figure(figsize=(8, 6))
-plt.plot(df["Total Size (Bytes)"], df["MISS Rate"], color='blue', marker='o')
-plt.xlabel("Total Size (Bytes)")
-plt.xscale('log', base=2)
-plt.ylabel("MISS Rate")
-plt.title("MISS Rate vs. Total Size (Bytes)")
-plt.grid(True, which="both", ls="--")
-plt.show()
-
-# 8) Print a quick summary to confirm the data loaded properly
-print(f"Number of rows in final DataFrame: {len(df)}")
-print(df.head(10))
+def plot_miss_rate(df, out=None):
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(8, 6))
+    plt.plot(df["Total Size (Bytes)"], df["MISS Rate"], color='blue', marker='o')
+    plt.xlabel("Total Size (Bytes)")
+    plt.xscale('log', base=2)
+    plt.ylabel("MISS Rate")
+    plt.title("MISS Rate vs. Total Size (Bytes)")
+    plt.grid(True, which="both", ls="--")
+    finish_figure(plt, out)
+
+if __name__ == "__main__":
+    # Runs come from the results store; an old spreadsheet can still be given
+    # (or imported once with: python -m sweep.store import-sheet salvaaa.xlsx).
+    # Without a store in the current directory, the sheet next to this script
+    # is plotted as before.
+    path = sys.argv[1] if len(sys.argv) > 1 else (STORE_FILE if os.path.exists(STORE_FILE) else SHEET_FILE)
+    try:
+        df = load_sheet(path, verbose=True) if path.endswith(".xlsx") else load_runs(path, verbose=True)
+    except FileNotFoundError as e:
+        sys.exit(str(e))
+    plot_miss_rate(df)
+
+    # 8) Print a quick summary to confirm the data loaded properly
+    print(f"Number of rows in final DataFrame: {len(df)}")
+    print(df.head(10))